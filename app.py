@@ -16,8 +16,9 @@ class Base(DeclarativeBase):
     pass
 
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
+# Configure logging; DEBUG also logs every upstream HTTP exchange
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+logging.basicConfig(level=LOG_LEVEL)
 
 # Initialize SQLAlchemy with base class
 db = SQLAlchemy(model_class=Base)
@@ -53,8 +54,21 @@ with app.app_context():
     # Import models to ensure they're registered with SQLAlchemy
     import models
     db.create_all()
+    
+    # Bring databases created by older versions up to date
+    from migrations import run_migrations
+    run_migrations(db.engine)
+
+# Keep the local news store filled in the background
+from services.news_ingestion import start_news_ingestion
+start_news_ingestion()
+
+# Run AI analysis jobs on a local worker pool
+from services.ai_jobs import start_ai_jobs
+start_ai_jobs()
 
 @login_manager.user_loader
 def load_user(user_id):
-    from models import User
-    return User.query.get(int(user_id))
+    # Served from a short-lived identity cache instead of a query per request
+    from services.auth_service import load_identity
+    return load_identity(int(user_id))
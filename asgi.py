@@ -0,0 +1,259 @@
+import io
+import os
+import sys
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict
+
+from flask import Flask
+from flask_login import current_user
+from werkzeug.exceptions import HTTPException
+from werkzeug.routing import RequestRedirect
+
+from app import app, db
+from async_routes import ASYNC_VIEWS
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Threads running the regular (sync) Flask views; matches the gunicorn gthread setup
+ASGI_WSGI_THREADS = int(os.environ.get("ASGI_WSGI_THREADS", "32"))
+
+Scope = Dict[str, Any]
+Receive = Callable[[], Awaitable[Dict[str, Any]]]
+Send = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+def _environ(scope: Scope, body: bytes) -> Dict[str, Any]:
+    """Build a WSGI environ for an ASGI HTTP request."""
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+        "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": client[0],
+        "REMOTE_PORT": str(client[1]),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    for name, value in scope.get("headers", []):
+        name, value = name.decode("latin-1"), value.decode("latin-1")
+        if name == "content-type":
+            key = "CONTENT_TYPE"
+        elif name == "content-length":
+            key = "CONTENT_LENGTH"
+        else:
+            key = "HTTP_" + name.upper().replace("-", "_")
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+def _encode_headers(headers) -> list:
+    return [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers]
+
+
+async def _read_body(receive: Receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            break
+    return b"".join(chunks)
+
+
+def _load_session_user():
+    """
+    Load the logged-in user for the current request.
+
+    The session is closed afterwards, so the login lookup's connection goes
+    back to the pool while the view waits on upstream; the view opens a new
+    one if it needs to.
+    """
+    try:
+        return current_user._get_current_object()
+    finally:
+        db.session.close()
+
+
+class FlaskASGI:
+    """
+    Serves the Flask app over ASGI, running upstream-bound endpoints as coroutines.
+
+    Requests routed to an endpoint in async_views are handled on the event
+    loop, so a request waiting on Alpha Vantage or Tavily holds no thread and
+    one process can keep hundreds of upstream calls in flight. They get the
+    same Flask request context, before/after-request hooks, CSRF check, login
+    check and error handlers as the sync views, and may stream by returning
+    a Response over an async generator. Every other request runs the
+    regular Flask app on a thread pool; streamed responses are forwarded
+    chunk by chunk and closed when the client disconnects.
+
+    Run with: uvicorn asgi:application --host 0.0.0.0 --port 5000
+    """
+
+    def __init__(self, flask_app: Flask, async_views: Dict[str, Callable[..., Awaitable[Any]]],
+                 threads: int = ASGI_WSGI_THREADS):
+        self.flask_app = flask_app
+        self.async_views = async_views
+        self._executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="wsgi")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            raise RuntimeError(f"Unsupported ASGI scope type: {scope['type']}")
+
+        environ = _environ(scope, await _read_body(receive))
+        try:
+            endpoint, view_args = self.flask_app.url_map.bind_to_environ(environ).match()
+        except (HTTPException, RequestRedirect):
+            endpoint, view_args = None, {}
+
+        view = self.async_views.get(endpoint)
+        if view is not None:
+            await self._run_async_view(view, environ, view_args, receive, send)
+        else:
+            await self._run_wsgi(environ, receive, send)
+
+    @staticmethod
+    async def _lifespan(receive: Receive, send: Send) -> None:
+        # The Flask app starts its background workers on import
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _run_async_view(self, view: Callable[..., Awaitable[Any]], environ: Dict[str, Any],
+                              view_args: Dict[str, Any], receive: Receive, send: Send) -> None:
+        flask_app = self.flask_app
+        # Mirrors Flask.full_dispatch_request with an awaited view
+        with flask_app.request_context(environ):
+            try:
+                try:
+                    rv = flask_app.preprocess_request()
+                    if rv is None:
+                        # Loading the session user may query the database; keep it off the loop
+                        user = await asyncio.to_thread(_load_session_user)
+                        if not user.is_authenticated:
+                            rv = flask_app.login_manager.unauthorized()
+                        else:
+                            rv = await view(**view_args)
+                except Exception as e:
+                    rv = flask_app.handle_user_exception(e)
+                response = flask_app.finalize_request(rv)
+            except Exception as e:
+                response = flask_app.handle_exception(e)
+            # Async views stream by returning a Response over an async generator
+            streamed = hasattr(response.response, "__aiter__")
+            body = b"" if streamed else response.get_data()
+
+        await send({
+            "type": "http.response.start",
+            "status": response.status_code,
+            "headers": _encode_headers(response.headers.items()),
+        })
+        if streamed:
+            await self._send_stream(response.response, receive, send)
+        else:
+            await send({"type": "http.response.body", "body": body})
+
+    @staticmethod
+    async def _send_stream(chunks, receive: Receive, send: Send) -> None:
+        """Forward an async response body until it ends or the client disconnects."""
+        async def forward():
+            async for chunk in chunks:
+                if isinstance(chunk, str):
+                    chunk = chunk.encode("utf-8")
+                if chunk:
+                    await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            await send({"type": "http.response.body", "body": b""})
+
+        async def watch_disconnect():
+            while (await receive())["type"] != "http.disconnect":
+                pass
+
+        forwarding = asyncio.ensure_future(forward())
+        watcher = asyncio.ensure_future(watch_disconnect())
+        try:
+            done, _ = await asyncio.wait({forwarding, watcher}, return_when=asyncio.FIRST_COMPLETED)
+            if forwarding in done:
+                forwarding.result()
+        finally:
+            watcher.cancel()
+            forwarding.cancel()
+            await asyncio.gather(forwarding, return_exceptions=True)
+            # Runs the body's cleanup (e.g. stream unsubscribe)
+            await chunks.aclose()
+
+    async def _run_wsgi(self, environ: Dict[str, Any], receive: Receive, send: Send) -> None:
+        loop = asyncio.get_running_loop()
+        disconnected = threading.Event()
+
+        async def watch_disconnect():
+            while (await receive())["type"] != "http.disconnect":
+                pass
+            disconnected.set()
+
+        def send_from_thread(message: Dict[str, Any]) -> None:
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        def run() -> None:
+            started = {}
+
+            def start_response(status, headers, exc_info=None):
+                started["status"] = int(status.split(" ", 1)[0])
+                started["headers"] = _encode_headers(headers)
+
+            def send_start():
+                send_from_thread({"type": "http.response.start", **started})
+
+            chunks = self.flask_app(environ, start_response)
+            try:
+                headers_sent = False
+                for chunk in chunks:
+                    if disconnected.is_set():
+                        # Closing the iterator runs the view's cleanup (e.g. stream unsubscribe)
+                        return
+                    if not headers_sent:
+                        send_start()
+                        headers_sent = True
+                    if chunk:
+                        send_from_thread({"type": "http.response.body", "body": chunk, "more_body": True})
+                if not headers_sent:
+                    send_start()
+                send_from_thread({"type": "http.response.body", "body": b""})
+            finally:
+                if hasattr(chunks, "close"):
+                    chunks.close()
+
+        watcher = asyncio.ensure_future(watch_disconnect())
+        try:
+            await loop.run_in_executor(self._executor, run)
+        except Exception as e:
+            if not disconnected.is_set():
+                raise
+            logger.debug(f"Client went away during {environ['PATH_INFO']}: {str(e)}")
+        finally:
+            watcher.cancel()
+
+
+application = FlaskASGI(app, ASYNC_VIEWS)
@@ -0,0 +1,80 @@
+import asyncio
+
+from flask import jsonify, Response
+from flask_login import current_user
+from routes import (news_request_args, stored_news_for_request, fetched_news_response, news_error_response,
+                    sse_event, requested_stream_symbols, quote_stream_symbols, follow_user_symbols,
+                    MAX_BATCH_SYMBOLS)
+from services.financial_service import get_stock_data_async, get_market_summary_async
+from services.news_service import get_latest_news_async, search_news_async, news_for_response
+from services.quote_stream import quote_broadcaster, QUOTE_STREAM_HEARTBEAT
+
+
+# Coroutine versions of the routes.py views that wait on upstream APIs, keyed
+# by Flask endpoint name. asgi.py serves these on the event loop; they run
+# inside a Flask request context, after the login check.
+
+async def stock_data(symbol):
+    """Async variant of routes.stock_data"""
+    data = await get_stock_data_async(symbol.upper())
+    return jsonify(data)
+
+
+async def market_summary():
+    """Async variant of routes.market_summary"""
+    summary = await get_market_summary_async()
+    return jsonify(summary)
+
+
+async def get_news():
+    """Async variant of routes.get_news"""
+    try:
+        query, limit, symbol, since = news_request_args()
+        # Database reads stay synchronous; run them off the event loop
+        news_items, enough = await asyncio.to_thread(stored_news_for_request, query, limit, symbol, since)
+
+        if len(news_items) >= enough:
+            return jsonify(news_for_response(news_items))
+        if query or symbol:
+            return fetched_news_response(await search_news_async(query or symbol, max_results=limit), limit)
+        return fetched_news_response(await get_latest_news_async(max_results=limit), limit)
+    except Exception as e:
+        return news_error_response(e)
+
+
+async def quote_stream():
+    """Async variant of routes.quote_stream; an open stream waits on the event loop and holds no thread"""
+    requested = requested_stream_symbols()
+    user_id = current_user.id
+    symbols = await asyncio.to_thread(quote_stream_symbols, user_id, requested)
+
+    if len(symbols) > MAX_BATCH_SYMBOLS:
+        return jsonify({'error': f'At most {MAX_BATCH_SYMBOLS} symbols can be streamed at once'}), 400
+
+    async def generate():
+        # Subscribed on the first read, so a body that is never read leaves nothing behind
+        subscription = quote_broadcaster.subscribe(symbols)
+        try:
+            yield sse_event({'symbols': sorted(symbols)}, event='subscribed')
+            while True:
+                updates = await subscription.wait_async(QUOTE_STREAM_HEARTBEAT)
+                if updates:
+                    yield sse_event(updates, event='quotes')
+                else:
+                    yield ": keep-alive\n\n"
+                    await asyncio.to_thread(follow_user_symbols, subscription, user_id, requested)
+        finally:
+            quote_broadcaster.unsubscribe(subscription)
+
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+
+ASYNC_VIEWS = {
+    'stock_data': stock_data,
+    'market_summary': market_summary,
+    'get_news': get_news,
+    'quote_stream': quote_stream,
+}
@@ -0,0 +1,83 @@
+"""
+Benchmark per-request overhead of the AI analysis path with a local fake LLM.
+
+Replaces the model with LangChain's FakeListChatModel, so only client,
+chain and prompt handling is timed. Compares the previous per-request setup
+(a new ChatGroq client plus an LLMChain with verbose logging and a fresh
+ConversationBufferMemory) against ai_service.get_ai_analysis, which reuses
+one shared chain.
+
+Usage: python benchmarks/bench_ai_overhead.py [--requests 300]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# The market context lookup imports the app; keep it off the real database
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from app import app  # noqa: E402,F401
+from langchain.chains import LLMChain  # noqa: E402
+from langchain.memory import ConversationBufferMemory  # noqa: E402
+from langchain_core.language_models.fake_chat_models import FakeListChatModel  # noqa: E402
+from langchain_groq import ChatGroq  # noqa: E402
+
+from services import ai_service  # noqa: E402
+
+QUERY = "Is it a good time to rebalance a 60/40 portfolio?"
+ANSWER = "Rebalancing on a fixed schedule keeps risk in line with your targets."
+
+
+def fake_llm():
+    return FakeListChatModel(responses=[ANSWER])
+
+
+def old_request() -> str:
+    # What get_ai_analysis did before: a client, memory and verbose chain per call
+    ChatGroq(api_key="bench", model_name="llama3-70b-8192", temperature=0.2, max_tokens=2048)
+    memory = ConversationBufferMemory(input_key="input", memory_key="history")
+    chain = LLMChain(llm=fake_llm(), prompt=ai_service.financial_prompt, verbose=True, memory=memory)
+    return chain.run(input=QUERY, market_context="No market data for this question.")
+
+
+def new_request() -> str:
+    return ai_service.get_ai_analysis(QUERY)
+
+
+def timed(request, count: int) -> float:
+    """Average milliseconds per request; verbose chain output is discarded."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        request()  # Warm up imports and shared objects
+        started = time.perf_counter()
+        for _ in range(count):
+            request()
+        return (time.perf_counter() - started) * 1000 / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=300)
+    args = parser.parse_args()
+
+    # The shared chain is built from the fake model instead of ChatGroq
+    ai_service.GROQ_API_KEY = "bench"
+    ai_service._llm = FakeListChatModel(responses=[ANSWER])
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")  # LLMChain and ConversationBufferMemory are deprecated
+        old = timed(old_request, args.requests)
+    new = timed(new_request, args.requests)
+
+    print(f"{'variant':<46}{'ms/request':>12}")
+    print(f"{'old (ChatGroq + LLMChain + memory per call)':<46}{old:>12.3f}")
+    print(f"{'new (shared chain)':<46}{new:>12.3f}")
+    print(f"Overhead removed: {old - new:.3f} ms/request ({old / new:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
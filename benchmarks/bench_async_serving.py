@@ -0,0 +1,179 @@
+"""
+Load-test the sync (gunicorn gthread) and async (uvicorn ASGI) serving modes.
+
+Starts a local stand-in for Alpha Vantage that answers every quote after a
+fixed latency, then runs the app both ways against it: gunicorn with one
+gthread worker and 32 threads (the .replit setup) and uvicorn asgi:application
+with one worker. Each mode gets the same number of concurrent logged-in
+clients requesting /api/stock/<symbol> with a new symbol every time, so
+every request waits on the upstream instead of the quote cache. The load
+generator and the stand-in run in this process, so give it spare cores.
+
+Usage: python benchmarks/bench_async_serving.py [--requests 2000] [--concurrency 200] [--latency 0.2]
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import httpx
+import uvicorn
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+DB_PATH = os.path.join(tempfile.gettempdir(), "bench_async_serving.db")
+# The servers and this script share one throwaway database
+os.environ["DATABASE_URL"] = f"sqlite:///{DB_PATH}"
+os.environ.setdefault("SESSION_SECRET", "bench-secret")
+
+USERNAME = "bench"
+PASSWORD = "bench-password"
+
+
+def serve_fake_upstream(port: int, latency: float) -> uvicorn.Server:
+    """Run an Alpha Vantage stand-in on a background thread."""
+    async def app(scope, receive, send):
+        if scope["type"] != "http":
+            return
+        await asyncio.sleep(latency)
+        body = json.dumps({"Global Quote": {
+            "05. price": "100.00", "09. change": "1.00", "10. change percent": "1.0%", "06. volume": "1000",
+        }}).encode()
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": body})
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning",
+                                           lifespan="off", backlog=4096))
+    threading.Thread(target=server.run, daemon=True).start()
+    wait_for_port(port)
+    return server
+
+
+def create_user() -> None:
+    if os.path.exists(DB_PATH):
+        os.remove(DB_PATH)
+    from app import app, db
+    from models import User
+
+    with app.app_context():
+        user = User(username=USERNAME, email="bench@example.com")
+        user.set_password(PASSWORD)
+        db.session.add(user)
+        db.session.commit()
+
+
+def wait_for_port(port: int, timeout: float = 30) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        with socket.socket() as sock:
+            if sock.connect_ex(("127.0.0.1", port)) == 0:
+                return
+        time.sleep(0.1)
+    raise RuntimeError(f"Nothing is listening on port {port}")
+
+
+def login(base_url: str) -> httpx.Cookies:
+    with httpx.Client(base_url=base_url) as client:
+        page = client.get("/login").text
+        token = re.search(r'name="csrf_token" value="([^"]+)"', page).group(1)
+        response = client.post("/login", data={"username": USERNAME, "password": PASSWORD, "csrf_token": token})
+        if response.status_code != 302:
+            raise RuntimeError(f"Login failed with status {response.status_code}")
+        return client.cookies
+
+
+async def run_load(base_url: str, cookies: httpx.Cookies, prefix: str, requests: int, concurrency: int):
+    """Return (elapsed seconds, per-request latencies, failed request count)."""
+    latencies = []
+    failures = 0
+    next_request = iter(range(requests))
+
+    async def worker(client):
+        nonlocal failures
+        for i in next_request:
+            started = time.perf_counter()
+            try:
+                response = await client.get(f"/api/stock/{prefix}{i:05d}")
+                if response.status_code != 200 or "error" in response.json():
+                    failures += 1
+            except httpx.HTTPError:
+                failures += 1
+            latencies.append(time.perf_counter() - started)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, cookies=cookies, limits=limits, timeout=120) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        return time.perf_counter() - started, latencies, failures
+
+
+def benchmark_mode(command, port: int, prefix: str, args, env) -> dict:
+    server = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for_port(port)
+        base_url = f"http://127.0.0.1:{port}"
+        cookies = login(base_url)
+        # Warm up connection pools and imports
+        asyncio.run(run_load(base_url, cookies, f"W{prefix}", min(args.concurrency, 50), min(args.concurrency, 50)))
+        elapsed, latencies, failures = asyncio.run(
+            run_load(base_url, cookies, prefix, args.requests, args.concurrency))
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    latencies.sort()
+    return {
+        "throughput": args.requests / elapsed,
+        "p50": statistics.median(latencies) * 1000,
+        "p95": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        "failures": failures,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds the fake upstream takes per quote")
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument("--upstream-port", type=int, default=5056)
+    args = parser.parse_args()
+
+    serve_fake_upstream(args.upstream_port, args.latency)
+    create_user()
+    env = dict(os.environ, ALPHA_VANTAGE_API_KEY="bench",
+               ALPHA_VANTAGE_URL=f"http://127.0.0.1:{args.upstream_port}/query", TAVILY_API_KEY="")
+
+    port = str(args.port)
+    modes = {
+        "gunicorn gthread (1 worker, 32 threads)": [
+            sys.executable, "-m", "gunicorn", "--bind", f"127.0.0.1:{port}", "--worker-class", "gthread",
+            "--threads", "32", "--backlog", "4096", "main:app"],
+        "uvicorn ASGI (1 worker)": [
+            sys.executable, "-m", "uvicorn", "asgi:application", "--host", "127.0.0.1", "--port", port,
+            "--backlog", "4096", "--log-level", "warning"],
+    }
+    results = {}
+    for i, (name, command) in enumerate(modes.items()):
+        results[name] = benchmark_mode(command, args.port, f"Q{i}", args, env)
+
+    print(f"{args.requests} requests, {args.concurrency} concurrent clients, "
+          f"{args.latency * 1000:.0f} ms upstream latency")
+    print(f"{'mode':<42}{'req/s':>10}{'p50 (ms)':>12}{'p95 (ms)':>12}{'failed':>9}")
+    for name, result in results.items():
+        print(f"{name:<42}{result['throughput']:>10.1f}{result['p50']:>12.0f}{result['p95']:>12.0f}"
+              f"{result['failures']:>9}")
+
+    os.remove(DB_PATH)
+
+
+if __name__ == "__main__":
+    main()
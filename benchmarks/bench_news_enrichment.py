@@ -0,0 +1,109 @@
+"""
+Benchmark news enrichment over synthetic articles.
+
+Generates articles from a fixed vocabulary, with a share of them planted as
+near copies (a few words changed) of earlier ones, then times the previous
+per-article loop (split for $tickers plus 16 substring sentiment scans)
+against news_enrichment.enrich_text, times near-duplicate removal and
+reports how many planted copies were caught.
+
+Usage: python benchmarks/bench_news_enrichment.py [--articles 100000] [--copies 1000] [--words 60]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# news_enrichment imports the app lazily; keep it off the real database anyway
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from services.news_enrichment import SENTIMENT_LEXICON, drop_near_duplicates, enrich_text  # noqa: E402
+
+KNOWN_SYMBOLS = {"AAPL", "MSFT", "GOOGL", "AMZN", "NVDA", "TSLA", "META", "JPM"}
+# Letters only: the tokenizer splits words on digits
+_rng = random.Random(42)
+VOCABULARY = ["".join(_rng.choices("abcdefghijklmnopqrstuvwxyz", k=_rng.randint(3, 10))) for _ in range(5000)]
+VOCABULARY += list(SENTIMENT_LEXICON) + [
+    "support", "update", "upgrade", "download", "profitability", "AAPL", "NVDA", "$MSFT", "$TSLA",
+]
+
+# The lexicon the old loop matched as substrings
+OLD_POSITIVE = ["gain", "rise", "up", "increase", "profit", "bull", "growth", "positive"]
+OLD_NEGATIVE = ["loss", "fall", "down", "decrease", "deficit", "bear", "recession", "negative"]
+
+
+def make_articles(count: int, copies: int, words: int):
+    """Return article texts and the indexes of planted near copies."""
+    rng = random.Random(0)
+    articles = []
+    planted = set(rng.sample(range(count // 2, count), copies))
+    for i in range(count):
+        if i in planted:
+            # Copy an earlier article and change two words
+            text = articles[rng.randrange(count // 2)].split()
+            for position in rng.sample(range(len(text)), 2):
+                text[position] = rng.choice(VOCABULARY)
+            articles.append(" ".join(text))
+        else:
+            articles.append(" ".join(rng.choice(VOCABULARY) for _ in range(words)))
+    return articles, planted
+
+
+def old_enrichment(content: str):
+    symbols = []
+    for word in content.split():
+        if word.startswith('$') and len(word) > 1 and word[1:].isalpha():
+            symbols.append(word[1:])
+
+    sentiment = "neutral"
+    content_lower = content.lower()
+    positive_count = sum(1 for word in OLD_POSITIVE if word in content_lower)
+    negative_count = sum(1 for word in OLD_NEGATIVE if word in content_lower)
+    if positive_count > negative_count:
+        sentiment = "positive"
+    elif negative_count > positive_count:
+        sentiment = "negative"
+    return {"symbols": list(set(symbols)), "sentiment": sentiment}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--articles", type=int, default=100000)
+    parser.add_argument("--copies", type=int, default=1000)
+    parser.add_argument("--words", type=int, default=60)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    articles, planted = make_articles(args.articles, args.copies, args.words)
+    print(f"Generated {args.articles} articles ({args.copies} near copies) in {time.perf_counter() - started:.1f}s")
+
+    started = time.perf_counter()
+    old = [old_enrichment(article) for article in articles]
+    old_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    items = [dict(enrich_text(article, KNOWN_SYMBOLS), index=i) for i, article in enumerate(articles)]
+    new_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    unique = drop_near_duplicates(items)
+    dedupe_seconds = time.perf_counter() - started
+
+    kept = {item["index"] for item in unique}
+    caught = len(planted - kept)
+    false_drops = args.articles - len(kept) - caught
+    changed = sum(1 for before, after in zip(old, items) if before["sentiment"] != after["sentiment"])
+
+    print(f"{'stage':<34}{'total (s)':>12}{'per article (us)':>20}")
+    for name, seconds in [("old loop (tickers + sentiment)", old_seconds),
+                          ("enrich_text (+ SimHash)", new_seconds),
+                          ("drop_near_duplicates", dedupe_seconds)]:
+        print(f"{name:<34}{seconds:>12.2f}{seconds * 1e6 / args.articles:>20.1f}")
+    print(f"Near copies caught: {caught}/{len(planted)}, other articles dropped: {false_drops}")
+    print(f"Sentiment changed by word-boundary matching: {changed} articles")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Benchmark the news hot paths before and after the schema migrations.
+
+Builds a SQLite database with the pre-migration news schema (no URL, date
+or symbol indexes; symbols only as a comma-separated column), fills it with
+synthetic news, times the hot queries, applies migrations.run_migrations
+and times them again.
+
+Usage: python benchmarks/bench_news_indexes.py [--rows 1000000] [--path /tmp/bench_news.db]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, text
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# The models import the app; keep it off the real database
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from app import db  # noqa: E402
+import models  # noqa: E402,F401
+from migrations import run_migrations  # noqa: E402
+
+SYMBOLS = [f"T{i:03d}" for i in range(500)] + ["AAPL", "MSFT", "GOOGL", "AMZN", "NVDA"]
+
+# Indexes the migrations add; dropped first to recreate the old schema
+MIGRATED_INDEXES = [
+    "ix_portfolio_user_id", "ix_holding_portfolio_id", "ix_watchlist_user_id",
+    "ix_watchlist_item_watchlist_id", "ix_financial_news_published_at",
+    "ix_ai_analysis_user_id_created_at", "uq_financial_news_url", "ix_news_symbol_symbol",
+]
+
+
+def build_old_schema(engine, rows: int) -> None:
+    db.metadata.create_all(engine)
+    with engine.begin() as conn:
+        for name in MIGRATED_INDEXES:
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+        conn.execute(text("DROP TABLE IF EXISTS schema_migrations"))
+
+    rng = random.Random(0)
+    start = datetime(2020, 1, 1)
+    batch = []
+    with engine.begin() as conn:
+        for i in range(rows):
+            batch.append({
+                "title": f"Headline {i}",
+                "url": f"https://news.example.com/{i}",
+                "source": "bench",
+                "published_at": start + timedelta(minutes=i),
+                "summary": f"Summary for article {i}",
+                "symbols": ",".join(rng.sample(SYMBOLS, rng.randint(0, 3))),
+            })
+            if len(batch) == 50000:
+                conn.execute(text(
+                    "INSERT INTO financial_news (title, url, source, published_at, summary, symbols) "
+                    "VALUES (:title, :url, :source, :published_at, :summary, :symbols)"), batch)
+                batch = []
+        if batch:
+            conn.execute(text(
+                "INSERT INTO financial_news (title, url, source, published_at, summary, symbols) "
+                "VALUES (:title, :url, :source, :published_at, :summary, :symbols)"), batch)
+
+
+def timed(engine, sql: str, params_list) -> float:
+    """Average milliseconds per execution."""
+    with engine.connect() as conn:
+        started = time.perf_counter()
+        for params in params_list:
+            conn.execute(text(sql), params).fetchall()
+        return (time.perf_counter() - started) * 1000 / len(params_list)
+
+
+def run_queries(engine, rows: int, symbol_query: str):
+    rng = random.Random(1)
+    urls = [{"url": f"https://news.example.com/{rng.randrange(rows)}"} for _ in range(20)]
+    return {
+        "news by url (ingest dedupe)": timed(engine, "SELECT id FROM financial_news WHERE url = :url", urls),
+        "latest 20 news": timed(
+            engine, "SELECT id, title FROM financial_news ORDER BY published_at DESC LIMIT 20", [{}] * 5),
+        "latest 20 for AAPL": timed(engine, symbol_query, [{"symbol": "AAPL"}] * 5),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--path", default=os.path.join(tempfile.gettempdir(), "bench_news.db"))
+    args = parser.parse_args()
+
+    if os.path.exists(args.path):
+        os.remove(args.path)
+    engine = create_engine(f"sqlite:///{args.path}")
+
+    started = time.perf_counter()
+    build_old_schema(engine, args.rows)
+    print(f"Loaded {args.rows} news rows in {time.perf_counter() - started:.1f}s")
+
+    before = run_queries(engine, args.rows, (
+        "SELECT id, title FROM financial_news WHERE ',' || symbols || ',' LIKE '%,' || :symbol || ',%' "
+        "ORDER BY published_at DESC LIMIT 20"))
+
+    started = time.perf_counter()
+    run_migrations(engine)
+    print(f"Migrations applied in {time.perf_counter() - started:.1f}s")
+
+    after = run_queries(engine, args.rows, (
+        "SELECT n.id, n.title FROM financial_news n JOIN news_symbol s ON s.news_id = n.id "
+        "WHERE s.symbol = :symbol ORDER BY n.published_at DESC LIMIT 20"))
+
+    print(f"{'query':<30}{'before (ms)':>14}{'after (ms)':>14}")
+    for name in before:
+        print(f"{name:<30}{before[name]:>14.3f}{after[name]:>14.3f}")
+
+    engine.dispose()
+    os.remove(args.path)
+
+
+if __name__ == "__main__":
+    main()
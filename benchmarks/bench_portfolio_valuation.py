@@ -0,0 +1,72 @@
+"""
+Benchmark portfolio valuation: vectorized value_holdings vs a per-holding loop.
+
+Uses synthetic holdings only (no database or quotes), so it measures the
+valuation math itself.
+
+Usage: python benchmarks/bench_portfolio_valuation.py [--holdings 10000] [--portfolios 50]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# The services import the app; keep it off the real database
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import app  # noqa: E402,F401
+from services.portfolio_analytics import value_holdings  # noqa: E402
+
+
+def loop_valuation(portfolio_index, quantities, purchase_prices, prices, changes, portfolio_count):
+    """The per-holding loop /api/portfolios used before the NumPy engine."""
+    totals = [{"value": 0.0, "cost": 0.0, "pnl": 0.0, "day_change": 0.0} for _ in range(portfolio_count)]
+    holdings = []
+    for i in range(len(quantities)):
+        value = quantities[i] * prices[i]
+        cost = quantities[i] * purchase_prices[i]
+        pnl = value - cost
+        holdings.append({
+            "value": value,
+            "cost_basis": cost,
+            "profit_loss": pnl,
+            "return_percent": pnl / cost * 100 if cost else None,
+            "day_change": quantities[i] * changes[i],
+        })
+        total = totals[portfolio_index[i]]
+        total["value"] += value
+        total["cost"] += cost
+        total["pnl"] += pnl
+        total["day_change"] += quantities[i] * changes[i]
+    for i, holding in enumerate(holdings):
+        portfolio_value = totals[portfolio_index[i]]["value"]
+        holding["weight"] = holding["value"] / portfolio_value if portfolio_value else None
+    return holdings, totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--holdings", type=int, default=10000)
+    parser.add_argument("--portfolios", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    portfolio_index = rng.integers(0, args.portfolios, args.holdings).astype(np.intp)
+    quantities = rng.uniform(1, 500, args.holdings)
+    purchase_prices = rng.uniform(5, 500, args.holdings)
+    prices = purchase_prices * rng.uniform(0.5, 1.5, args.holdings)
+    changes = prices * rng.normal(0, 0.02, args.holdings)
+    arrays = (portfolio_index, quantities, purchase_prices, prices, changes, args.portfolios)
+    lists = tuple(a.tolist() if isinstance(a, np.ndarray) else a for a in arrays)
+
+    for name, run in (("numpy", lambda: value_holdings(*arrays)), ("loop", lambda: loop_valuation(*lists))):
+        best = min(timeit.repeat(run, number=1, repeat=args.repeat))
+        print(f"{name:>6}: {best * 1000:8.2f} ms for {args.holdings} holdings in {args.portfolios} portfolios")
+
+
+if __name__ == "__main__":
+    main()
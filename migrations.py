@@ -0,0 +1,197 @@
+# Versioned schema upgrades for databases created before a model change.
+#
+# db.create_all() only creates missing tables, so indexes, columns and data
+# fixes for existing tables are applied here. Each migration runs once, in
+# order, and is recorded in schema_migrations. Migrations must be idempotent
+# because a fresh database already has the latest schema from create_all().
+import os
+import time
+import logging
+from datetime import datetime
+
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+logger = logging.getLogger(__name__)
+
+# Seconds to keep retrying while another worker holds the database lock
+# (SQLite's "database is locked" when several workers start together)
+MIGRATION_LOCK_TIMEOUT = float(os.environ.get("MIGRATION_LOCK_TIMEOUT", "120"))
+
+
+def _add_hot_path_indexes(conn):
+    """Index foreign keys and news columns used by the dashboard and API."""
+    statements = [
+        "CREATE INDEX IF NOT EXISTS ix_portfolio_user_id ON portfolio (user_id)",
+        "CREATE INDEX IF NOT EXISTS ix_holding_portfolio_id ON holding (portfolio_id)",
+        "CREATE INDEX IF NOT EXISTS ix_watchlist_user_id ON watchlist (user_id)",
+        "CREATE INDEX IF NOT EXISTS ix_watchlist_item_watchlist_id ON watchlist_item (watchlist_id)",
+        "CREATE INDEX IF NOT EXISTS ix_financial_news_published_at ON financial_news (published_at)",
+        "CREATE INDEX IF NOT EXISTS ix_ai_analysis_user_id_created_at ON ai_analysis (user_id, created_at)",
+    ]
+    for statement in statements:
+        conn.execute(text(statement))
+
+
+def _unique_news_url(conn):
+    """Drop duplicate news rows (keeping the oldest) and make url unique."""
+    conn.execute(text(
+        "DELETE FROM financial_news WHERE id NOT IN "
+        "(SELECT MIN(id) FROM financial_news GROUP BY url)"
+    ))
+    conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS uq_financial_news_url ON financial_news (url)"))
+
+
+def _backfill_news_symbols(conn):
+    """Copy the comma-separated FinancialNews.symbols into the news_symbol table."""
+    rows = conn.execute(text(
+        "SELECT id, symbols FROM financial_news "
+        "WHERE symbols IS NOT NULL AND symbols != '' "
+        "AND id NOT IN (SELECT news_id FROM news_symbol)"
+    )).fetchall()
+
+    links = []
+    for news_id, symbols in rows:
+        for symbol in {s.strip().upper() for s in symbols.split(',') if s.strip()}:
+            links.append({"news_id": news_id, "symbol": symbol[:10]})
+
+    if links:
+        conn.execute(text("INSERT INTO news_symbol (news_id, symbol) VALUES (:news_id, :symbol)"), links)
+    logger.info(f"Backfilled {len(links)} news symbol links")
+
+
+def _news_full_text_index(conn):
+    """Full-text index over news titles and summaries (FTS5 on SQLite, GIN tsvector on PostgreSQL)."""
+    if conn.dialect.name == "sqlite":
+        try:
+            conn.execute(text(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS financial_news_fts USING fts5("
+                "title, summary, content='financial_news', content_rowid='id', tokenize='porter unicode61')"
+            ))
+        except OperationalError as e:
+            logger.warning(f"SQLite FTS5 is unavailable, news search will use LIKE: {str(e)}")
+            return
+        conn.execute(text(
+            "CREATE TRIGGER IF NOT EXISTS financial_news_fts_insert AFTER INSERT ON financial_news BEGIN "
+            "INSERT INTO financial_news_fts(rowid, title, summary) VALUES (new.id, new.title, new.summary); END"
+        ))
+        conn.execute(text(
+            "CREATE TRIGGER IF NOT EXISTS financial_news_fts_delete AFTER DELETE ON financial_news BEGIN "
+            "INSERT INTO financial_news_fts(financial_news_fts, rowid, title, summary) "
+            "VALUES ('delete', old.id, old.title, old.summary); END"
+        ))
+        conn.execute(text(
+            "CREATE TRIGGER IF NOT EXISTS financial_news_fts_update AFTER UPDATE ON financial_news BEGIN "
+            "INSERT INTO financial_news_fts(financial_news_fts, rowid, title, summary) "
+            "VALUES ('delete', old.id, old.title, old.summary); "
+            "INSERT INTO financial_news_fts(rowid, title, summary) VALUES (new.id, new.title, new.summary); END"
+        ))
+        conn.execute(text("INSERT INTO financial_news_fts(financial_news_fts) VALUES ('rebuild')"))
+    elif conn.dialect.name == "postgresql":
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_financial_news_fts ON financial_news USING GIN "
+            "(to_tsvector('english', coalesce(title, '') || ' ' || coalesce(summary, '')))"
+        ))
+
+
+def _news_simhash_column(conn):
+    """Store each news item's SimHash fingerprint for near-duplicate detection."""
+    columns = {column["name"] for column in inspect(conn).get_columns("financial_news")}
+    if "simhash" not in columns:
+        conn.execute(text("ALTER TABLE financial_news ADD COLUMN simhash BIGINT"))
+
+
+def _ai_analysis_status_column(conn):
+    """Track background AI analysis jobs; existing rows are finished analyses."""
+    columns = {column["name"] for column in inspect(conn).get_columns("ai_analysis")}
+    if "status" not in columns:
+        conn.execute(text(
+            "ALTER TABLE ai_analysis ADD COLUMN status VARCHAR(16) NOT NULL DEFAULT 'completed'"
+        ))
+
+
+def _ai_analysis_started_at_column(conn):
+    """Record when a worker claimed each AI analysis job, for detecting lost jobs."""
+    columns = {column["name"] for column in inspect(conn).get_columns("ai_analysis")}
+    if "started_at" not in columns:
+        conn.execute(text("ALTER TABLE ai_analysis ADD COLUMN started_at TIMESTAMP"))
+
+
+# (version, description, function) in the order they must be applied
+MIGRATIONS = [
+    (1, "Add indexes for hot query paths", _add_hot_path_indexes),
+    (2, "Unique constraint on financial_news.url", _unique_news_url),
+    (3, "Normalize news symbols into news_symbol", _backfill_news_symbols),
+    (4, "Full-text index on financial_news", _news_full_text_index),
+    (5, "Add financial_news.simhash", _news_simhash_column),
+    (6, "Add ai_analysis.status", _ai_analysis_status_column),
+    (7, "Add ai_analysis.started_at", _ai_analysis_started_at_column),
+]
+
+
+def _is_locked(error: OperationalError) -> bool:
+    return "locked" in str(error.orig).lower()
+
+
+def _retry_while_locked(action, what: str):
+    """Run action(), retrying with backoff while the database is locked by another worker."""
+    deadline = time.monotonic() + MIGRATION_LOCK_TIMEOUT
+    delay = 0.1
+    while True:
+        try:
+            return action()
+        except OperationalError as e:
+            if not _is_locked(e) or time.monotonic() + delay > deadline:
+                raise
+            logger.info(f"Database is locked while {what}, retrying in {delay:.1f}s")
+            time.sleep(delay)
+            delay = min(delay * 2, 5.0)
+
+
+def _applied_versions(engine):
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_migrations "
+            "(version INTEGER PRIMARY KEY, description VARCHAR(256), applied_at TIMESTAMP)"
+        ))
+        return {row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+
+
+def _apply(engine, version, description, migrate):
+    with engine.begin() as conn:
+        # Re-check inside the transaction: another worker may have applied it while we waited
+        if conn.execute(text("SELECT 1 FROM schema_migrations WHERE version = :version"),
+                        {"version": version}).first():
+            logger.info(f"Migration {version} was already applied by another process")
+            return
+        migrate(conn)
+        conn.execute(
+            text("INSERT INTO schema_migrations (version, description, applied_at) "
+                 "VALUES (:version, :description, :applied_at)"),
+            {"version": version, "description": description, "applied_at": datetime.utcnow()}
+        )
+    logger.info(f"Applied migration {version}: {description}")
+
+
+def run_migrations(engine):
+    """
+    Apply every migration that hasn't been recorded yet.
+
+    Safe to run from several workers starting at once: a migration another
+    worker applied first is skipped, and lock errors are retried for up to
+    MIGRATION_LOCK_TIMEOUT seconds.
+
+    Args:
+        engine: The SQLAlchemy engine of the application database
+    """
+    applied = _retry_while_locked(lambda: _applied_versions(engine), "reading schema_migrations")
+
+    for version, description, migrate in MIGRATIONS:
+        if version in applied:
+            continue
+        try:
+            _retry_while_locked(lambda: _apply(engine, version, description, migrate),
+                                f"applying migration {version}")
+        except IntegrityError:
+            # Another worker applied the same migration concurrently
+            logger.info(f"Migration {version} was already applied by another process")
@@ -1,7 +1,8 @@
 from datetime import datetime
 from app import db
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.security import check_password_hash
+from services.passwords import hash_password, needs_rehash
 
 
 class User(UserMixin, db.Model):
@@ -20,10 +21,19 @@ class User(UserMixin, db.Model):
     watchlists = db.relationship('Watchlist', backref='owner', lazy='dynamic')
     
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
         
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        """
+        Check a password, upgrading its stored hash to the current policy on success.
+        
+        The caller commits the session to save an upgraded hash.
+        """
+        if not check_password_hash(self.password_hash, password):
+            return False
+        if needs_rehash(self.password_hash):
+            self.set_password(password)
+        return True
     
     def __repr__(self):
         return f'<User {self.username}>'
@@ -34,10 +44,10 @@ class Portfolio(db.Model):
     name = db.Column(db.String(64), nullable=False)
     description = db.Column(db.String(256))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
     
     # Relationships
-    holdings = db.relationship('Holding', backref='portfolio', lazy='dynamic', cascade='all, delete-orphan')
+    holdings = db.relationship('Holding', backref='portfolio', lazy='select', order_by='Holding.id', cascade='all, delete-orphan')
     
     def __repr__(self):
         return f'<Portfolio {self.name}>'
@@ -49,7 +59,7 @@ class Holding(db.Model):
     quantity = db.Column(db.Float, nullable=False, default=0)
     purchase_price = db.Column(db.Float)
     purchase_date = db.Column(db.DateTime, default=datetime.utcnow)
-    portfolio_id = db.Column(db.Integer, db.ForeignKey('portfolio.id'), nullable=False)
+    portfolio_id = db.Column(db.Integer, db.ForeignKey('portfolio.id'), nullable=False, index=True)
     
     def __repr__(self):
         return f'<Holding {self.symbol}: {self.quantity}>'
@@ -59,10 +69,10 @@ class Watchlist(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(64), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
     
     # Relationships
-    stocks = db.relationship('WatchlistItem', backref='watchlist', lazy='dynamic', cascade='all, delete-orphan')
+    stocks = db.relationship('WatchlistItem', backref='watchlist', lazy='select', order_by='WatchlistItem.id', cascade='all, delete-orphan')
     
     def __repr__(self):
         return f'<Watchlist {self.name}>'
@@ -73,32 +83,107 @@ class WatchlistItem(db.Model):
     symbol = db.Column(db.String(10), nullable=False)
     added_at = db.Column(db.DateTime, default=datetime.utcnow)
     notes = db.Column(db.String(256))
-    watchlist_id = db.Column(db.Integer, db.ForeignKey('watchlist.id'), nullable=False)
+    watchlist_id = db.Column(db.Integer, db.ForeignKey('watchlist.id'), nullable=False, index=True)
     
     def __repr__(self):
         return f'<WatchlistItem {self.symbol}>'
 
 
 class FinancialNews(db.Model):
+    __table_args__ = (
+        db.Index('uq_financial_news_url', 'url', unique=True),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(256), nullable=False)
     url = db.Column(db.String(512), nullable=False)
     source = db.Column(db.String(128))
-    published_at = db.Column(db.DateTime)
+    published_at = db.Column(db.DateTime, index=True)
     summary = db.Column(db.Text)
     sentiment = db.Column(db.String(20))  # positive, negative, neutral
-    symbols = db.Column(db.String(256))  # Comma-separated stock symbols related to the news
+    symbols = db.Column(db.String(256))  # Comma-separated copy of symbol_links, kept for display
+    simhash = db.Column(db.BigInteger)  # Signed 64-bit SimHash of title and content, for near-duplicate checks
+    
+    # Relationships
+    symbol_links = db.relationship('NewsSymbol', backref='news', lazy='select', cascade='all, delete-orphan')
+    
+    def to_dict(self):
+        return {
+            'title': self.title,
+            'url': self.url,
+            'source': self.source,
+            'published_at': self.published_at,
+            'summary': self.summary,
+            'sentiment': self.sentiment,
+            'symbols': self.symbols.split(',') if self.symbols else []
+        }
     
     def __repr__(self):
         return f'<FinancialNews {self.title}>'
 
 
+class NewsSymbol(db.Model):
+    """Stock symbol mentioned in a news item, indexed for per-ticker lookups"""
+    news_id = db.Column(db.Integer, db.ForeignKey('financial_news.id', ondelete='CASCADE'), primary_key=True)
+    symbol = db.Column(db.String(10), primary_key=True, index=True)
+    
+    def __repr__(self):
+        return f'<NewsSymbol {self.symbol}: {self.news_id}>'
+
+
 class AIAnalysis(db.Model):
+    __table_args__ = (
+        db.Index('ix_ai_analysis_user_id_created_at', 'user_id', 'created_at'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     query = db.Column(db.Text, nullable=False)
     response = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    # queued -> running -> completed / failed when run as a background job
+    status = db.Column(db.String(16), nullable=False, default='completed', server_default='completed')
+    started_at = db.Column(db.DateTime)  # When a worker claimed the job
     
     def __repr__(self):
         return f'<AIAnalysis {self.id}>'
+
+
+class ConversationSummary(db.Model):
+    """Rolling summary of a user's AI conversation turns that no longer fit the prompt"""
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    summary = db.Column(db.Text, nullable=False, default='')
+    covered_until = db.Column(db.DateTime, nullable=False)  # created_at of the newest summarized turn
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<ConversationSummary {self.user_id}>'
+
+
+class PriceBar(db.Model):
+    """Daily OHLCV bar, persisted so history is only downloaded once"""
+    __table_args__ = (
+        db.UniqueConstraint('symbol', 'date', name='uq_price_bar_symbol_date'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    symbol = db.Column(db.String(10), nullable=False)
+    date = db.Column(db.Date, nullable=False)
+    open = db.Column(db.Float, nullable=False)
+    high = db.Column(db.Float, nullable=False)
+    low = db.Column(db.Float, nullable=False)
+    close = db.Column(db.Float, nullable=False)
+    volume = db.Column(db.BigInteger, nullable=False, default=0)
+    
+    def to_dict(self):
+        return {
+            'date': self.date.isoformat(),
+            'open': self.open,
+            'high': self.high,
+            'low': self.low,
+            'close': self.close,
+            'volume': self.volume
+        }
+    
+    def __repr__(self):
+        return f'<PriceBar {self.symbol} {self.date}>'
@@ -1,12 +1,42 @@
-from flask import render_template, redirect, url_for, flash, request, jsonify, session
+from flask import render_template, redirect, url_for, flash, request, jsonify, Response, stream_with_context, abort
 from flask_login import login_user, logout_user, login_required, current_user
 from app import app, db
-from models import User, Portfolio, Holding, Watchlist, WatchlistItem, FinancialNews, AIAnalysis
-from werkzeug.security import generate_password_hash
-from services.ai_service import get_ai_analysis
-from services.news_service import get_latest_news, search_news
-from services.financial_service import get_stock_data, get_market_summary
+from models import User, Portfolio, Holding, Watchlist, AIAnalysis
+from services.ai_service import stream_ai_analysis
+from services.semantic_cache import lookup_ai_analysis, remember_ai_analysis
+from services.conversation_memory import build_history
+from services.ai_jobs import ai_job_queue, QueueFullError, PRIORITIES
+from services.news_service import get_latest_news, search_news, news_for_response
+from services.financial_service import get_stock_data, get_stock_data_batch, get_market_summary, MARKET_INDEX_SYMBOLS
+from services.data_access import get_user_portfolios, get_user_watchlists
+from services.news_store import get_stored_news, search_stored_news, submit_news_ingestion
+from services.portfolio_analytics import get_portfolio_report
+from services.risk_analytics import get_portfolio_risk
+from services.quote_stream import quote_broadcaster, QUOTE_STREAM_HEARTBEAT, QUOTE_STREAM_INTERVAL, QUOTE_STREAM_MAX_THREADS
+from services.auth_service import login_throttle
+from services.metrics import registry
+from services.request_metrics import start_request, finish_request
+from services.profiler import start_request_profile, finish_request_profile
+import os
+import json
+import math
 import logging
+import threading
+from datetime import datetime, timedelta
+
+# Upper bound on symbols accepted by /api/quotes in one request
+MAX_BATCH_SYMBOLS = 100
+
+# Quote streams this process may serve from worker threads at once
+quote_stream_slots = threading.BoundedSemaphore(QUOTE_STREAM_MAX_THREADS)
+
+# Local news search hits needed before skipping the paid Tavily search
+NEWS_SEARCH_MIN_LOCAL_RESULTS = int(os.environ.get("NEWS_SEARCH_MIN_LOCAL_RESULTS", "3"))
+
+# Bearer token required by /metrics; the endpoint answers 404 until one is set
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+# Send each response's database query count and time as X-DB-* headers, for spotting N+1 regressions in development
+DB_STATS_HEADERS = os.environ.get("DB_STATS_HEADERS", "false").lower() == "true"
 
 
 @app.route('/')
@@ -21,23 +51,9 @@ def index():
 @login_required
 def dashboard():
     """Main dashboard for authenticated users"""
-    # Get user portfolios
-    portfolios = Portfolio.query.filter_by(user_id=current_user.id).all()
-    
-    # Get watchlists
-    watchlists = Watchlist.query.filter_by(user_id=current_user.id).all()
-    
-    # Get latest news
-    news = FinancialNews.query.order_by(FinancialNews.published_at.desc()).limit(5).all()
-    
-    # Get market summary
-    market_summary = get_market_summary()
-    
-    return render_template('dashboard.html', 
-                           portfolios=portfolios, 
-                           watchlists=watchlists,
-                           news=news,
-                           market_summary=market_summary)
+    # The page only greets the user; dashboard.js loads portfolios, watchlists,
+    # news and the market summary from the API, so nothing else is loaded here
+    return render_template('dashboard.html')
 
 
 @app.route('/login', methods=['GET', 'POST'])
@@ -50,13 +66,22 @@ def login():
         username = request.form.get('username')
         password = request.form.get('password')
         
+        retry_after = login_throttle.retry_after(request.remote_addr, username)
+        if retry_after:
+            flash(f'Too many failed login attempts. Please try again in {math.ceil(retry_after / 60)} minute(s).')
+            return render_template('login.html'), 429
+        
         user = User.query.filter_by(username=username).first()
         
         if user and user.check_password(password):
+            # Saves the password hash if check_password upgraded it
+            db.session.commit()
+            login_throttle.reset(request.remote_addr, username)
             login_user(user)
             next_page = request.args.get('next')
             return redirect(next_page or url_for('dashboard'))
         
+        login_throttle.record_failure(request.remote_addr, username)
         flash('Invalid username or password')
     
     return render_template('login.html')
@@ -105,31 +130,8 @@ def logout():
 def portfolios():
     """API endpoint for managing portfolios"""
     if request.method == 'GET':
-        user_portfolios = Portfolio.query.filter_by(user_id=current_user.id).all()
-        result = []
-        for portfolio in user_portfolios:
-            holdings = []
-            for holding in portfolio.holdings:
-                stock_data = get_stock_data(holding.symbol)
-                current_price = stock_data.get('price', 0)
-                holdings.append({
-                    'id': holding.id,
-                    'symbol': holding.symbol,
-                    'quantity': holding.quantity,
-                    'purchase_price': holding.purchase_price,
-                    'current_price': current_price,
-                    'value': holding.quantity * current_price,
-                    'profit_loss': (current_price - holding.purchase_price) * holding.quantity
-                })
-            
-            result.append({
-                'id': portfolio.id,
-                'name': portfolio.name,
-                'description': portfolio.description,
-                'holdings': holdings
-            })
-        
-        return jsonify(result)
+        report = get_portfolio_report(current_user.id)
+        return jsonify(report['portfolios'])
     
     elif request.method == 'POST':
         data = request.json
@@ -145,6 +147,17 @@ def portfolios():
         return jsonify({'id': new_portfolio.id, 'name': new_portfolio.name, 'message': 'Portfolio created successfully'})
 
 
+@app.route('/api/portfolios/summary', methods=['GET'])
+@login_required
+def portfolios_summary():
+    """API endpoint for aggregate valuation across all of the user's portfolios"""
+    report = get_portfolio_report(current_user.id)
+    return jsonify({
+        'totals': report['totals'],
+        'portfolios': [{'id': p['id'], 'name': p['name'], **p['summary']} for p in report['portfolios']]
+    })
+
+
 @app.route('/api/portfolios/<int:portfolio_id>', methods=['PUT', 'DELETE'])
 @login_required
 def manage_portfolio(portfolio_id):
@@ -165,6 +178,19 @@ def manage_portfolio(portfolio_id):
         return jsonify({'message': 'Portfolio deleted successfully'})
 
 
+@app.route('/api/portfolios/<int:portfolio_id>/risk', methods=['GET'])
+@login_required
+def portfolio_risk(portfolio_id):
+    """API endpoint for risk metrics of a specific portfolio"""
+    portfolio = Portfolio.query.filter_by(id=portfolio_id, user_id=current_user.id).first_or_404()
+    
+    try:
+        return jsonify(get_portfolio_risk(portfolio.id))
+    except Exception as e:
+        logging.error(f"Error computing portfolio risk: {str(e)}")
+        return jsonify({'error': 'An error occurred while computing portfolio risk', 'details': str(e)}), 500
+
+
 @app.route('/api/portfolios/<int:portfolio_id>/holdings', methods=['POST'])
 @login_required
 def add_holding(portfolio_id):
@@ -214,12 +240,14 @@ def manage_holding(holding_id):
 def watchlists():
     """API endpoint for managing watchlists"""
     if request.method == 'GET':
-        user_watchlists = Watchlist.query.filter_by(user_id=current_user.id).all()
+        user_watchlists = get_user_watchlists(current_user.id)
+        quotes = get_stock_data_batch(item.symbol for watchlist in user_watchlists for item in watchlist.stocks)
+        
         result = []
         for watchlist in user_watchlists:
             items = []
             for item in watchlist.stocks:
-                stock_data = get_stock_data(item.symbol)
+                stock_data = quotes.get(item.symbol.upper(), {})
                 items.append({
                     'id': item.id,
                     'symbol': item.symbol,
@@ -250,78 +278,217 @@ def watchlists():
         return jsonify({'id': new_watchlist.id, 'name': new_watchlist.name, 'message': 'Watchlist created successfully'})
 
 
+def news_request_args():
+    """
+    Read the /api/news query arguments.
+    
+    Returns:
+        tuple: query, limit, symbol, and the earliest publication time (None for any)
+    """
+    query = request.args.get('query', '')
+    limit = int(request.args.get('limit', 5))  # Default to 5 news items
+    symbol = request.args.get('symbol')
+    days = request.args.get('days', type=int)
+    since = datetime.now() - timedelta(days=days) if days else None
+    return query, limit, symbol, since
+
+
+def stored_news_for_request(query, limit, symbol, since):
+    """
+    Answer a news request from the local store, which the background ingestion worker keeps current.
+    
+    Returns:
+        tuple: The stored news items, and how many are needed to skip the Tavily search
+    """
+    if query:
+        news_items = search_stored_news(query, limit=limit, symbol=symbol, since=since)
+        return news_items, min(limit, NEWS_SEARCH_MIN_LOCAL_RESULTS)
+    return get_stored_news(limit=limit, symbol=symbol), limit
+
+
+def fetched_news_response(news_items, limit):
+    """Respond with news fetched from Tavily, and store it for later requests"""
+    news_items = news_items[:limit]
+    
+    # Store in database for future reference without holding up the response
+    submit_news_ingestion(news_items)
+    
+    return jsonify(news_for_response(news_items))
+
+
+def news_error_response(error):
+    """Log a failed news request and describe the error to the client"""
+    logging.error(f"Error retrieving news: {str(error)}")
+    return jsonify({'error': 'An error occurred while getting news', 'details': str(error)}), 500
+
+
 @app.route('/api/news', methods=['GET'])
 @login_required
 def get_news():
     """API endpoint for getting financial news"""
-    query = request.args.get('query', '')
-    limit = int(request.args.get('limit', 5))  # Default to 5 news items
-    
     try:
-        if query:
-            news_items = search_news(query, max_results=limit)
-        else:
-            news_items = get_latest_news(max_results=limit)
+        query, limit, symbol, since = news_request_args()
+        news_items, enough = stored_news_for_request(query, limit, symbol, since)
         
-        # Limit to top 5 regardless of what's returned
-        news_items = news_items[:limit]
-        
-        # Store in database for future reference
-        for news in news_items:
-            existing_news = FinancialNews.query.filter_by(url=news['url']).first()
-            if not existing_news:
-                new_news = FinancialNews(
-                    title=news['title'],
-                    url=news['url'],
-                    source=news['source'],
-                    published_at=news['published_at'],
-                    summary=news['summary'],
-                    sentiment=news.get('sentiment', 'neutral'),
-                    symbols=','.join(news.get('symbols', []) if isinstance(news.get('symbols', []), list) else [])
-                )
-                db.session.add(new_news)
-        
-        db.session.commit()
-        
-        return jsonify(news_items)
+        if len(news_items) >= enough:
+            return jsonify(news_for_response(news_items))
+        if query or symbol:
+            return fetched_news_response(search_news(query or symbol, max_results=limit), limit)
+        return fetched_news_response(get_latest_news(max_results=limit), limit)
     except Exception as e:
-        logging.error(f"Error retrieving news: {str(e)}")
-        return jsonify({'error': 'An error occurred while getting news', 'details': str(e)}), 500
+        return news_error_response(e)
 
 
 @app.route('/api/ai-analysis', methods=['POST'])
 @login_required
 def ai_analysis():
-    """API endpoint for getting AI analysis"""
+    """API endpoint queueing an AI analysis job; poll its status and result endpoints"""
     if request.is_json:
         data = request.json
         query = data.get('query', '')
+        priority = data.get('priority', 'normal')
     else:
         # Handle form data for CSRF protection
         query = request.form.get('query', '')
+        priority = request.form.get('priority', 'normal')
     
     if not query:
         return jsonify({'error': 'Query is required'}), 400
+    if priority not in PRIORITIES:
+        return jsonify({'error': f"Priority must be one of: {', '.join(PRIORITIES)}"}), 400
     
     try:
-        # Get AI analysis
-        result = get_ai_analysis(query)
-        
-        # Save to database
-        analysis = AIAnalysis(
-            query=query,
-            response=result,
-            user_id=current_user.id
-        )
-        db.session.add(analysis)
-        db.session.commit()
-        
-        return jsonify({'response': result})
+        job_id, deduplicated = ai_job_queue.submit(current_user.id, query, priority)
+        return jsonify({
+            'job_id': job_id,
+            'status': 'queued',
+            'deduplicated': deduplicated,
+            'status_url': url_for('ai_analysis_status', job_id=job_id),
+            'result_url': url_for('ai_analysis_result', job_id=job_id)
+        }), 202
+    except QueueFullError as e:
+        return jsonify({'error': str(e)}), 429
     except Exception as e:
+        db.session.rollback()
         logging.error(f"AI analysis error: {str(e)}")
         return jsonify({'error': 'An error occurred while getting AI analysis', 'details': str(e)}), 500
 
 
+def _get_user_analysis(job_id):
+    return db.session.query(AIAnalysis).filter_by(id=job_id, user_id=current_user.id).first()
+
+
+@app.route('/api/ai-analysis/<int:job_id>', methods=['GET'])
+@login_required
+def ai_analysis_status(job_id):
+    """API endpoint for the status of an AI analysis job"""
+    analysis = _get_user_analysis(job_id)
+    if not analysis:
+        return jsonify({'error': 'Analysis not found'}), 404
+    
+    return jsonify({
+        'job_id': analysis.id,
+        'status': analysis.status,
+        'created_at': analysis.created_at.isoformat() if analysis.created_at else None,
+        'position': ai_job_queue.position(analysis.id) if analysis.status == 'queued' else None
+    })
+
+
+@app.route('/api/ai-analysis/<int:job_id>/result', methods=['GET'])
+@login_required
+def ai_analysis_result(job_id):
+    """API endpoint for the result of an AI analysis job"""
+    analysis = _get_user_analysis(job_id)
+    if not analysis:
+        return jsonify({'error': 'Analysis not found'}), 404
+    
+    if analysis.status == 'completed':
+        return jsonify({'job_id': analysis.id, 'status': analysis.status, 'response': analysis.response})
+    if analysis.status == 'failed':
+        return jsonify({'job_id': analysis.id, 'status': analysis.status,
+                        'error': 'An error occurred while getting AI analysis', 'details': analysis.response})
+    
+    # Still queued or running
+    return jsonify({'job_id': analysis.id, 'status': analysis.status}), 202
+
+
+def sse_event(data, event=None):
+    """Format one Server-Sent Events message."""
+    message = f"event: {event}\n" if event else ""
+    return message + f"data: {json.dumps(data)}\n\n"
+
+
+@app.route('/api/ai-analysis/stream', methods=['POST'])
+@login_required
+def ai_analysis_stream():
+    """API endpoint streaming AI analysis tokens as Server-Sent Events"""
+    if request.is_json:
+        data = request.json
+        query = data.get('query', '')
+    else:
+        query = request.form.get('query', '')
+    
+    if not query:
+        return jsonify({'error': 'Query is required'}), 400
+    
+    user_id = current_user.id
+    # Set when the client goes away, so the upstream stream stops at the next token
+    cancel_event = threading.Event()
+    
+    def generate():
+        # Sent before the history is built (which may call the LLM to
+        # summarize), so the client sees the stream open straight away
+        yield ": started\n\n"
+        history = build_history(user_id)
+        
+        cached = lookup_ai_analysis(query) if not history else None
+        if cached is not None:
+            parts = [cached]
+            yield sse_event({'token': cached, 'cached': True})
+        else:
+            parts = yield from stream_tokens(history)
+            if parts is None:
+                return
+        
+        try:
+            analysis = AIAnalysis(query=query, response="".join(parts), user_id=user_id)
+            db.session.add(analysis)
+            db.session.commit()
+            yield sse_event({'id': analysis.id}, event='done')
+        except Exception as e:
+            db.session.rollback()
+            logging.error(f"Error saving streamed AI analysis: {str(e)}")
+            yield sse_event({'error': 'Could not save AI analysis', 'details': str(e)}, event='error')
+    
+    def stream_tokens(history):
+        """Relay generated tokens; returns them all, or None if generation failed."""
+        parts = []
+        tokens = stream_ai_analysis(query, history, cancel_event=cancel_event)
+        try:
+            # A write to a disconnected client raises GeneratorExit at this
+            # yield, which cancels the token stream and the upstream request
+            for token in tokens:
+                parts.append(token)
+                yield sse_event({'token': token})
+        except GeneratorExit:
+            logging.info(f"Client disconnected from AI analysis stream for user {user_id}")
+            cancel_event.set()
+            tokens.close()
+            raise
+        except Exception as e:
+            logging.error(f"AI analysis stream error: {str(e)}")
+            yield sse_event({'error': 'An error occurred while getting AI analysis', 'details': str(e)}, event='error')
+            return None
+        if not history:
+            remember_ai_analysis(query, "".join(parts))
+        return parts
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # Stop nginx from buffering the stream
+    })
+
+
 @app.route('/api/stock/<symbol>', methods=['GET'])
 @login_required
 def stock_data(symbol):
@@ -330,6 +497,99 @@ def stock_data(symbol):
     return jsonify(data)
 
 
+@app.route('/api/quotes', methods=['GET'])
+@login_required
+def batch_quotes():
+    """API endpoint for getting stock data for several symbols at once"""
+    symbols = [s for s in request.args.get('symbols', '').split(',') if s.strip()]
+    
+    if not symbols:
+        return jsonify({'error': 'At least one symbol is required'}), 400
+    if len(symbols) > MAX_BATCH_SYMBOLS:
+        return jsonify({'error': f'At most {MAX_BATCH_SYMBOLS} symbols can be requested at once'}), 400
+    
+    return jsonify(get_stock_data_batch(symbols))
+
+
+def requested_stream_symbols():
+    """Extra symbols a quote stream was asked for in its query string"""
+    return {s.strip().upper() for s in request.args.get('symbols', '').split(',') if s.strip()}
+
+
+def quote_stream_symbols(user_id, requested):
+    """Symbols a user's quote stream follows: the indices, their holdings and watchlists, and any requested"""
+    symbols = set(MARKET_INDEX_SYMBOLS) | set(requested)
+    for portfolio in get_user_portfolios(user_id):
+        symbols.update(holding.symbol.upper() for holding in portfolio.holdings)
+    for watchlist in get_user_watchlists(user_id):
+        symbols.update(item.symbol.upper() for item in watchlist.stocks)
+    return symbols
+
+
+def follow_user_symbols(subscription, user_id, requested):
+    """
+    Re-read the symbols an open quote stream follows, so holdings and watchlist
+    items added since it connected are streamed without a reconnect. Called on
+    each heartbeat, outside any request.
+    """
+    try:
+        with app.app_context():
+            symbols = quote_stream_symbols(user_id, requested)
+    except Exception as e:
+        logging.error(f"Error refreshing quote stream symbols for user {user_id}: {str(e)}")
+        return
+    if len(symbols) <= MAX_BATCH_SYMBOLS:
+        quote_broadcaster.update(subscription, symbols)
+
+
+def quote_streams_full():
+    """503 response telling the client to poll /api/quotes instead of streaming"""
+    response = jsonify({'error': 'Too many open quote streams', 'details': 'Poll /api/quotes instead'})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(int(QUOTE_STREAM_INTERVAL))
+    return response
+
+
+@app.route('/api/quotes/stream', methods=['GET'])
+@login_required
+def quote_stream():
+    """Server-Sent Events stream of quote changes for the user's holdings, watchlists and indices"""
+    requested = requested_stream_symbols()
+    symbols = quote_stream_symbols(current_user.id, requested)
+    
+    if len(symbols) > MAX_BATCH_SYMBOLS:
+        return jsonify({'error': f'At most {MAX_BATCH_SYMBOLS} symbols can be streamed at once'}), 400
+    # Each open stream holds a worker thread; keep enough threads for everything else
+    if not quote_stream_slots.acquire(blocking=False):
+        return quote_streams_full()
+    
+    user_id = current_user.id
+    subscription = quote_broadcaster.subscribe(symbols)
+    
+    def generate():
+        yield sse_event({'symbols': sorted(symbols)}, event='subscribed')
+        while True:
+            updates = subscription.wait(QUOTE_STREAM_HEARTBEAT)
+            if updates:
+                yield sse_event(updates, event='quotes')
+            else:
+                # Keeps proxies from closing the connection and notices disconnects
+                yield ": keep-alive\n\n"
+                follow_user_symbols(subscription, user_id, requested)
+    
+    def close():
+        quote_broadcaster.unsubscribe(subscription)
+        quote_stream_slots.release()
+    
+    response = Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+    # Runs when the server closes the response, even if the stream never started
+    response.call_on_close(close)
+    return response
+
+
 @app.route('/api/market-summary', methods=['GET'])
 @login_required
 def market_summary():
@@ -338,6 +598,41 @@ def market_summary():
     return jsonify(summary)
 
 
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus metrics for this process"""
+    if not METRICS_TOKEN:
+        abort(404)
+    if request.headers.get('Authorization') != f'Bearer {METRICS_TOKEN}':
+        return jsonify({'error': 'Unauthorized'}), 401
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+
+@app.before_request
+def start_request_timing():
+    start_request()
+    start_request_profile()
+
+
+@app.after_request
+def record_request_timing(response):
+    """Record per-endpoint metrics and expose database usage for spotting N+1 regressions"""
+    profile_path = finish_request_profile()
+    if profile_path:
+        response.headers['X-Profile-Output'] = os.path.basename(profile_path)
+    stats = finish_request(response.status_code)
+    if DB_STATS_HEADERS:
+        response.headers['X-DB-Query-Count'] = str(stats['db']['count'])
+        response.headers['X-DB-Query-Time'] = f"{stats['db']['time'] * 1000:.1f}ms"
+    return response
+
+
+@app.teardown_request
+def stop_request_profile(error=None):
+    # Requests that raised skip after_request; don't leave their thread being sampled
+    finish_request_profile()
+
+
 # Error handlers
 @app.errorhandler(404)
 def not_found_error(error):
@@ -0,0 +1,253 @@
+import os
+import logging
+import threading
+from datetime import datetime, timedelta
+from itertools import count
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+
+from app import app, db
+from models import AIAnalysis
+from services.ai_service import is_error_response
+from services.conversation_memory import build_history
+from services.profiler import profile
+from services.semantic_cache import get_cached_ai_analysis
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Queue settings
+AI_JOB_WORKERS = int(os.environ.get("AI_JOB_WORKERS", "4"))
+AI_JOB_MAX_PER_USER = int(os.environ.get("AI_JOB_MAX_PER_USER", "1"))  # Jobs running at once per user
+AI_JOB_MAX_QUEUED_PER_USER = int(os.environ.get("AI_JOB_MAX_QUEUED_PER_USER", "10"))
+AI_JOB_STALE_AFTER = float(os.environ.get("AI_JOB_STALE_AFTER", "600"))  # Seconds after its claim before a running job is presumed lost
+
+# Lower runs first
+PRIORITIES = {"high": 0, "normal": 5, "low": 9}
+
+
+class QueueFullError(Exception):
+    """Raised when a user already has too many jobs waiting."""
+
+
+def _dedupe_key(user_id: int, query: str) -> Tuple[int, str]:
+    return user_id, " ".join(query.lower().split())
+
+
+class _Job:
+    def __init__(self, job_id: int, user_id: int, query: str, priority: int, sequence: int):
+        self.id = job_id
+        self.user_id = user_id
+        self.query = query
+        self.priority = priority
+        self.sequence = sequence
+
+    @property
+    def sort_key(self) -> Tuple[int, int]:
+        return self.priority, self.sequence
+
+
+class AIJobQueue:
+    """
+    In-process priority queue for AI analysis jobs, run by a pool of worker threads.
+
+    Jobs are AIAnalysis rows: the row is created with status "queued" and
+    updated with the response when a worker finishes, so any process can
+    report on a job and unfinished jobs survive a restart. Workers take the
+    highest-priority job whose user is below the per-user concurrency cap, and
+    an identical query from the same user joins the job already in flight.
+    """
+
+    def __init__(self, workers: int = AI_JOB_WORKERS, max_per_user: int = AI_JOB_MAX_PER_USER):
+        self.workers = workers
+        self.max_per_user = max_per_user
+        self._pending: List[_Job] = []
+        self._running: Dict[int, int] = {}  # user_id -> running jobs
+        self._inflight: Dict[Tuple[int, str], int] = {}  # (user_id, query) -> job id
+        self._sequence = count()
+        self._condition = threading.Condition()
+        self._threads: List[threading.Thread] = []
+
+    def start(self) -> None:
+        with self._condition:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f"ai-job-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, user_id: int, query: str, priority: str = "normal") -> Tuple[int, bool]:
+        """
+        Queue an analysis. Must be called inside an app context.
+
+        Args:
+            user_id (int): The requesting user
+            query (str): The financial query
+            priority (str): "high", "normal" or "low"
+
+        Returns:
+            Tuple[int, bool]: The job ID and whether an in-flight job was reused
+
+        Raises:
+            QueueFullError: If the user already has AI_JOB_MAX_QUEUED_PER_USER jobs waiting
+        """
+        key = _dedupe_key(user_id, query)
+        with self._condition:
+            job_id = self._inflight.get(key)
+            if job_id is not None:
+                return job_id, True
+            waiting = sum(1 for job in self._pending if job.user_id == user_id)
+            if waiting >= AI_JOB_MAX_QUEUED_PER_USER:
+                raise QueueFullError(f"Too many queued analyses (limit {AI_JOB_MAX_QUEUED_PER_USER})")
+
+        # The insert runs without the lock so a slow commit doesn't hold up the workers
+        analysis = AIAnalysis(query=query, response="", user_id=user_id, status="queued")
+        db.session.add(analysis)
+        db.session.commit()
+
+        with self._condition:
+            job_id = self._inflight.get(key)
+            if job_id is None:
+                self._inflight[key] = analysis.id
+                self._enqueue(analysis.id, user_id, query, PRIORITIES.get(priority, PRIORITIES["normal"]))
+                return analysis.id, False
+
+        # An identical request was queued while this one committed; join it instead
+        db.session.delete(analysis)
+        db.session.commit()
+        return job_id, True
+
+    def recover(self) -> int:
+        """
+        Requeue jobs left unfinished by a previous process. Must be called inside an app context.
+
+        Returns:
+            int: Number of jobs requeued
+        """
+        # Jobs claimed recently may still be running in another live process; leave them
+        # alone. Rows claimed before started_at existed fall back to their creation time.
+        stale = datetime.utcnow() - timedelta(seconds=AI_JOB_STALE_AFTER)
+        db.session.query(AIAnalysis).filter(
+            AIAnalysis.status == "running",
+            func.coalesce(AIAnalysis.started_at, AIAnalysis.created_at) < stale
+        ).update({"status": "queued"}, synchronize_session=False)
+        db.session.commit()
+
+        rows = (db.session.query(AIAnalysis.id, AIAnalysis.user_id, AIAnalysis.query)
+                .filter(AIAnalysis.status == "queued")
+                .order_by(AIAnalysis.id)
+                .all())
+        with self._condition:
+            for job_id, user_id, query in rows:
+                self._inflight[_dedupe_key(user_id, query)] = job_id
+                self._enqueue(job_id, user_id, query, PRIORITIES["low"])
+        return len(rows)
+
+    def position(self, job_id: int) -> Optional[int]:
+        """1-based place of a waiting job in this process's queue, or None."""
+        with self._condition:
+            ordered = sorted(self._pending, key=lambda job: job.sort_key)
+            for index, job in enumerate(ordered):
+                if job.id == job_id:
+                    return index + 1
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._condition:
+            return {
+                "workers": len(self._threads),
+                "pending": len(self._pending),
+                "running": sum(self._running.values()),
+            }
+
+    def _enqueue(self, job_id: int, user_id: int, query: str, priority: int) -> None:
+        self._pending.append(_Job(job_id, user_id, query, priority, next(self._sequence)))
+        self._condition.notify()
+
+    def _next_job(self) -> _Job:
+        """Block until a job is runnable, then take it. Caller holds the condition."""
+        while True:
+            runnable = [job for job in self._pending
+                        if self._running.get(job.user_id, 0) < self.max_per_user]
+            if runnable:
+                job = min(runnable, key=lambda job: job.sort_key)
+                self._pending.remove(job)
+                self._running[job.user_id] = self._running.get(job.user_id, 0) + 1
+                return job
+            self._condition.wait()
+
+    def _work(self) -> None:
+        while True:
+            with self._condition:
+                job = self._next_job()
+            try:
+                with app.app_context(), profile("ai_analysis_job"):
+                    self._run(job)
+            except Exception as e:
+                logger.error(f"Error running AI analysis job {job.id}: {str(e)}")
+            finally:
+                with self._condition:
+                    self._running[job.user_id] -= 1
+                    if not self._running[job.user_id]:
+                        del self._running[job.user_id]
+                    self._inflight.pop(_dedupe_key(job.user_id, job.query), None)
+                    # A slot for this user may unblock one of their waiting jobs
+                    self._condition.notify_all()
+
+    @staticmethod
+    def _run(job: _Job) -> None:
+        # Claim the row so another process recovering the same job skips it
+        started_at = datetime.utcnow()
+        try:
+            claimed = db.session.query(AIAnalysis).filter(
+                AIAnalysis.id == job.id, AIAnalysis.status == "queued"
+            ).update({"status": "running", "started_at": started_at}, synchronize_session=False)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Could not claim AI analysis job {job.id}: {str(e)}")
+            # Don't leave it queued until the next restart
+            db.session.query(AIAnalysis).filter(
+                AIAnalysis.id == job.id, AIAnalysis.status == "queued"
+            ).update({"response": f"An error occurred while processing your request: {str(e)}",
+                      "status": "failed"}, synchronize_session=False)
+            db.session.commit()
+            return
+        if not claimed:
+            return
+
+        try:
+            history = build_history(job.user_id)
+            response, _ = get_cached_ai_analysis(job.query, history)
+            status = "failed" if is_error_response(response) else "completed"
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"AI analysis job {job.id} failed: {str(e)}")
+            response, status = f"An error occurred while processing your request: {str(e)}", "failed"
+
+        # Only if the job is still ours: a recovering process may have requeued and rerun it
+        finished = db.session.query(AIAnalysis).filter(
+            AIAnalysis.id == job.id, AIAnalysis.status == "running", AIAnalysis.started_at == started_at
+        ).update({"response": response, "status": status}, synchronize_session=False)
+        db.session.commit()
+        if not finished:
+            logger.warning(f"AI analysis job {job.id} was taken over by another worker; discarding this result")
+
+
+ai_job_queue = AIJobQueue()
+
+
+def start_ai_jobs() -> None:
+    """Start the worker pool and pick up jobs left unfinished by a previous run."""
+    ai_job_queue.start()
+    with app.app_context():
+        try:
+            recovered = ai_job_queue.recover()
+            if recovered:
+                logger.info(f"Requeued {recovered} unfinished AI analysis jobs")
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error recovering AI analysis jobs: {str(e)}")
+    logger.info(f"Started {ai_job_queue.workers} AI analysis workers")
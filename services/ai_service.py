@@ -1,9 +1,12 @@
 import os
 import logging
-from langchain.chains import LLMChain
+import threading
+from typing import Iterator, Optional
 from langchain.prompts import PromptTemplate
+from langchain_core.output_parsers import StrOutputParser
 from langchain_groq import ChatGroq
-from langchain.memory import ConversationBufferMemory
+from services.http_client import get_httpx_client
+from services.market_context import get_market_context
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -13,12 +16,15 @@ GROQ_API_KEY = os.environ.get("GROQ_API_KEY", "")
 
 # Financial analysis prompt template
 financial_prompt = PromptTemplate(
-    input_variables=["input", "history"],
+    input_variables=["input", "history", "market_context"],
     template="""
     You are a professional financial analyst with deep expertise in stock markets, economy, and investment strategies.
     
     Provide detailed, accurate analysis based on facts. If you're uncertain about specific data points, acknowledge the limitations.
     
+    Current market data (use these figures instead of estimating prices; they may be delayed):
+    {market_context}
+    
     Previous conversation:
     {history}
     
@@ -29,42 +35,130 @@ financial_prompt = PromptTemplate(
     """
 )
 
-# Memory initialization function to ensure fresh memory for each request
-def get_memory():
-    return ConversationBufferMemory(input_key="input", memory_key="history")
+# Model used to fold old conversation turns into a short summary
+AI_SUMMARY_MODEL = os.environ.get("AI_SUMMARY_MODEL", "llama3-8b-8192")
+
+# Prompt for incrementally updating a conversation summary
+summary_prompt = PromptTemplate(
+    input_variables=["summary", "turns", "max_words"],
+    template="""
+    Update the summary of a conversation between a user and a financial analyst.
+    Keep the securities, figures, goals and conclusions that later questions may refer to.
+    Reply with the updated summary only, in at most {max_words} words.
+    
+    Current summary:
+    {summary}
+    
+    New conversation turns:
+    {turns}
+    """
+)
+
+_llm = None
+_summary_chain = None
+_financial_chain = None
+_init_lock = threading.Lock()
 
 # LLM initialization function to avoid initializing at import time
 def get_llm():
+    """
+    Get the shared ChatGroq client.
+    
+    The client is created once per process and holds no per-request state;
+    calls from different threads share its keep-alive connection pool.
+    """
+    global _llm
     if not GROQ_API_KEY:
         logger.warning("GROQ_API_KEY is not set in environment variables")
         return None
-        
-    return ChatGroq(
-        api_key=GROQ_API_KEY,
-        model_name="llama3-70b-8192",  # Using Llama 3 70B model for superior financial analysis
-        temperature=0.2,  # Low temperature for more factual responses
-        max_tokens=2048
-    )
+    
+    if _llm is None:
+        with _init_lock:
+            if _llm is None:
+                _llm = ChatGroq(
+                    api_key=GROQ_API_KEY,
+                    model_name="llama3-70b-8192",  # Using Llama 3 70B model for superior financial analysis
+                    temperature=0.2,  # Low temperature for more factual responses
+                    max_tokens=2048,
+                    http_client=get_httpx_client()  # Shared keep-alive connection pool
+                )
+    return _llm
 
 # Chain creation function
 def get_financial_chain():
-    llm = get_llm()
-    if not llm:
+    """
+    Get the shared prompt -> LLM -> text pipeline.
+    
+    Conversation history is passed in with each call instead of living in a
+    memory object, so one chain can serve concurrent requests.
+    """
+    global _financial_chain
+    if _financial_chain is None:
+        llm = get_llm()
+        if not llm:
+            return None
+        with _init_lock:
+            if _financial_chain is None:
+                _financial_chain = financial_prompt | llm | StrOutputParser()
+    return _financial_chain
+
+def get_summary_chain():
+    """Get the shared pipeline that folds conversation turns into a summary."""
+    global _summary_chain
+    if not GROQ_API_KEY:
         return None
+    if _summary_chain is None:
+        with _init_lock:
+            if _summary_chain is None:
+                llm = ChatGroq(
+                    api_key=GROQ_API_KEY,
+                    model_name=AI_SUMMARY_MODEL,  # A small model is enough for summaries
+                    temperature=0,
+                    max_tokens=512,
+                    http_client=get_httpx_client()
+                )
+                _summary_chain = summary_prompt | llm | StrOutputParser()
+    return _summary_chain
+
+def summarize_conversation(summary, turns, max_words=200):
+    """
+    Fold conversation turns into an existing summary.
+    
+    Args:
+        summary (str): The current summary, possibly empty
+        turns (str): Formatted turns to add to it
+        max_words (int, optional): Length limit for the new summary
+        
+    Returns:
+        str: The updated summary
         
-    return LLMChain(
-        llm=llm,
-        prompt=financial_prompt,
-        verbose=True,
-        memory=get_memory()
-    )
+    Raises:
+        RuntimeError: If the LLM is not configured
+    """
+    chain = get_summary_chain()
+    if not chain:
+        raise RuntimeError("API key not configured. Please set the GROQ_API_KEY environment variable.")
+    return chain.invoke({"summary": summary or "(none)", "turns": turns, "max_words": max_words}).strip()
+
+def is_error_response(response):
+    """Whether get_ai_analysis returned an error message instead of an analysis."""
+    return not response or response.startswith(("Error:", "An error occurred"))
 
-def get_ai_analysis(query):
+def _prompt_inputs(query, history):
+    """Per-request prompt inputs; market data comes from shared per-symbol snapshots."""
+    return {
+        "input": query,
+        "history": history,
+        "market_context": get_market_context(query) or "No market data for this question."
+    }
+
+def get_ai_analysis(query, history=""):
     """
     Get financial analysis using LangChain and Groq.
     
     Args:
         query (str): The financial query to analyze
+        history (str, optional): Earlier conversation to include in the prompt
         
     Returns:
         str: The AI-generated financial analysis
@@ -74,15 +168,53 @@ def get_ai_analysis(query):
             logger.error("GROQ_API_KEY is not set in environment variables")
             return "Error: API key not configured. Please set the GROQ_API_KEY environment variable."
         
-        # Get a new chain for this request
+        # Shared chain; only the inputs are per request
         financial_chain = get_financial_chain()
         if not financial_chain:
             return "Error: Could not initialize LLM. Please check your API key configuration."
             
         # Run the chain
-        response = financial_chain.run(input=query)
+        response = financial_chain.invoke(_prompt_inputs(query, history))
         
         return response
     except Exception as e:
         logger.error(f"Error getting AI analysis: {str(e)}")
         return f"An error occurred while processing your request: {str(e)}"
+
+
+def stream_ai_analysis(query: str, history: str = "",
+                       cancel_event: Optional[threading.Event] = None) -> Iterator[str]:
+    """
+    Stream a financial analysis token by token.
+    
+    Closing the returned generator (e.g. when the client disconnects) closes
+    the upstream Groq stream, which stops generation. Setting cancel_event has
+    the same effect at the next token.
+    
+    Args:
+        query (str): The financial query to analyze
+        history (str, optional): Earlier conversation to include in the prompt
+        cancel_event (threading.Event, optional): Stops the stream when set
+        
+    Yields:
+        str: Response text chunks as they are generated
+        
+    Raises:
+        RuntimeError: If the LLM is not configured
+    """
+    llm = get_llm()
+    if not llm:
+        raise RuntimeError("API key not configured. Please set the GROQ_API_KEY environment variable.")
+    
+    prompt = financial_prompt.format(**_prompt_inputs(query, history))
+    chunks = llm.stream(prompt)
+    try:
+        for chunk in chunks:
+            if cancel_event is not None and cancel_event.is_set():
+                logger.info("AI analysis stream cancelled")
+                break
+            if chunk.content:
+                yield chunk.content
+    finally:
+        # Closes the HTTP response so Groq stops generating
+        chunks.close()
@@ -0,0 +1,186 @@
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from flask_login import UserMixin
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from app import db
+from models import User
+from services.cache import TTLCache, make_backend
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Identity cache settings (seconds / entries)
+USER_CACHE_TTL = float(os.environ.get("USER_CACHE_TTL", "60"))
+USER_CACHE_MAX_ENTRIES = int(os.environ.get("USER_CACHE_MAX_ENTRIES", "4096"))
+
+# Login throttling: failed attempts allowed per client IP and username, and
+# per client IP across all usernames, within the window (seconds)
+LOGIN_MAX_FAILURES = int(os.environ.get("LOGIN_MAX_FAILURES", "5"))
+LOGIN_MAX_FAILURES_PER_IP = int(os.environ.get("LOGIN_MAX_FAILURES_PER_IP", "50"))
+LOGIN_FAILURE_WINDOW = float(os.environ.get("LOGIN_FAILURE_WINDOW", "300"))
+LOGIN_THROTTLE_MAX_ENTRIES = 10000
+
+# Profile fields kept for the logged-in user; a plain dict so a shared backend can store it
+_IDENTITY_FIELDS = ("id", "username", "email", "first_name", "last_name")
+
+# Logged-in users by ID; entries are dropped when the user row is updated or deleted
+user_cache = TTLCache(
+    name="users",
+    ttl=USER_CACHE_TTL,
+    backend=make_backend("users", max_entries=USER_CACHE_MAX_ENTRIES),
+    should_cache=lambda identity: identity is not None
+)
+
+
+class CachedUser(UserMixin):
+    """
+    The logged-in user as loaded from the identity cache.
+
+    Carries the profile fields only and isn't attached to a database
+    session; query by current_user.id for anything else.
+    """
+
+    def __init__(self, id: int, username: str, email: str,
+                 first_name: Optional[str] = None, last_name: Optional[str] = None):
+        self.id = id
+        self.username = username
+        self.email = email
+        self.first_name = first_name
+        self.last_name = last_name
+
+    def __repr__(self):
+        return f'<User {self.username}>'
+
+
+def _load_identity(user_id: int) -> Optional[Dict[str, Any]]:
+    user = db.session.get(User, user_id)
+    if user is None:
+        return None
+    return {field: getattr(user, field) for field in _IDENTITY_FIELDS}
+
+
+def load_identity(user_id: int) -> Optional[CachedUser]:
+    """
+    Load the user for a session, from the identity cache when possible.
+
+    Authenticated requests then skip the user query for USER_CACHE_TTL
+    seconds. Profile changes and deletions committed through SQLAlchemy drop
+    the entry at once (in every process when the cache is shared through
+    Redis; otherwise other processes catch up within the TTL).
+
+    Args:
+        user_id (int): The ID stored in the session
+
+    Returns:
+        Optional[CachedUser]: The user, or None if it no longer exists
+    """
+    identity = user_cache.get(str(user_id), lambda: _load_identity(user_id))
+    return CachedUser(**identity) if identity is not None else None
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _remember_changed_user(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("changed_user_ids", set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_users(session):
+    # Dropped only once committed, so a concurrent reload can't cache the old row again
+    for user_id in session.info.pop("changed_user_ids", ()):
+        user_cache.invalidate(str(user_id))
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changed_users(session):
+    session.info.pop("changed_user_ids", None)
+
+
+class LoginThrottle:
+    """
+    Limits failed logins over a sliding window.
+
+    Failures are counted per (client IP, username), so someone guessing at an
+    account can't lock its owner out from another address, and per client IP,
+    so one address can't spray guesses across many usernames. A throttled
+    attempt is rejected before the password is hashed, so guessing can't be
+    used to burn CPU on the login path either.
+    """
+
+    def __init__(self, max_failures: int = LOGIN_MAX_FAILURES,
+                 max_failures_per_ip: int = LOGIN_MAX_FAILURES_PER_IP, window: float = LOGIN_FAILURE_WINDOW,
+                 max_entries: int = LOGIN_THROTTLE_MAX_ENTRIES):
+        self.max_failures = max_failures
+        self.max_failures_per_ip = max_failures_per_ip
+        self.window = window
+        self.max_entries = max_entries
+        self._failures: "OrderedDict[Tuple[str, ...], Deque[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _keys(ip: str, username: str) -> List[Tuple[Tuple[str, ...], str]]:
+        """(key, limit attribute) pairs that a login attempt counts against."""
+        ip = ip or ""
+        return [
+            (("user", ip, (username or "").strip().lower()), "max_failures"),
+            (("ip", ip), "max_failures_per_ip"),
+        ]
+
+    def _recent(self, key: Tuple[str, ...], now: float) -> Deque[float]:
+        """Failures for key still inside the window. Caller holds the lock."""
+        failures = self._failures.get(key)
+        if failures is None:
+            return deque()
+        while failures and now - failures[0] >= self.window:
+            failures.popleft()
+        if not failures:
+            del self._failures[key]
+        return failures
+
+    def retry_after(self, ip: str, username: str) -> float:
+        """Seconds until this client may try this username again; 0 if it isn't throttled."""
+        now = time.time()
+        wait = 0.0
+        with self._lock:
+            for key, limit in self._keys(ip, username):
+                failures = self._recent(key, now)
+                if len(failures) >= getattr(self, limit):
+                    # The oldest failures that keep the count at the limit have to expire
+                    wait = max(wait, failures[-getattr(self, limit)] + self.window - now)
+        return wait
+
+    def record_failure(self, ip: str, username: str) -> None:
+        now = time.time()
+        with self._lock:
+            for key, limit in self._keys(ip, username):
+                failures = self._recent(key, now)
+                failures.append(now)
+                self._failures[key] = failures
+                self._failures.move_to_end(key)
+                if len(failures) == getattr(self, limit):
+                    logger.warning(f"Throttling logins for {key!r} after {len(failures)} failures")
+            while len(self._failures) > self.max_entries:
+                self._failures.popitem(last=False)
+
+    def reset(self, ip: str, username: str) -> None:
+        """
+        Forget failures for this client and username after a successful login.
+
+        The per-IP count is kept, so logging in to one account doesn't
+        unlock guessing at others from the same address.
+        """
+        key, _ = self._keys(ip, username)[0]
+        with self._lock:
+            self._failures.pop(key, None)
+
+
+login_throttle = LoginThrottle()
@@ -0,0 +1,384 @@
+import os
+import json
+import time
+import asyncio
+import logging
+import threading
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+
+from services.metrics import registry
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Optional shared backend so every gunicorn worker sees the same entries
+CACHE_REDIS_URL = os.environ.get("CACHE_REDIS_URL", "")
+# Threads refreshing stale entries, shared by every cache
+CACHE_REFRESH_WORKERS = int(os.environ.get("CACHE_REFRESH_WORKERS", "4"))
+
+# Metrics, labelled with the cache name
+cache_lookups = registry.counter(
+    "cache_lookups_total", "Cache lookups by result (hit, stale or miss)", ("cache", "result"))
+cache_loads = registry.counter(
+    "cache_loads_total", "Loader calls made on cache misses and refreshes", ("cache",))
+cache_load_errors = registry.counter(
+    "cache_load_errors_total", "Loader calls that raised", ("cache",))
+cache_coalesced = registry.counter(
+    "cache_coalesced_total", "Misses that waited on another caller's load", ("cache",))
+cache_hit_ratio = registry.gauge(
+    "cache_hit_ratio", "Share of lookups answered from the cache, fresh or stale, since start", ("cache",))
+
+_LOOKUP_RESULTS = {"hits": "hit", "stale_hits": "stale", "misses": "miss"}
+_EVENT_COUNTERS = {"loads": cache_loads, "errors": cache_load_errors, "coalesced": cache_coalesced}
+
+# Bounded, so a burst of expiring entries queues refreshes instead of starting a thread each
+_refresh_executor = ThreadPoolExecutor(max_workers=CACHE_REFRESH_WORKERS, thread_name_prefix="cache-refresh")
+
+# Every TTLCache, for the hit ratio gauge
+_caches: "weakref.WeakSet[TTLCache]" = weakref.WeakSet()
+
+
+def _collect_hit_ratios() -> None:
+    for cache in list(_caches):
+        cache_hit_ratio.set(cache.stats()["hit_ratio"], cache=cache.name)
+
+
+registry.on_collect(_collect_hit_ratios)
+
+
+class InMemoryBackend:
+    """
+    Process-local cache store with LRU eviction.
+
+    Entries are kept as (value, stored_at) pairs; freshness is decided by
+    TTLCache, the backend only bounds the number of entries.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, value: Any, stored_at: float, expire_in: float) -> None:
+        with self._lock:
+            self._entries[key] = (value, stored_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RedisBackend:
+    """
+    Cache store shared between processes through Redis.
+
+    Values must be JSON serializable. Keys expire once they are too old to be
+    served even as stale data; LRU eviction is left to the server's
+    maxmemory-policy (e.g. allkeys-lru).
+    """
+
+    def __init__(self, url: str, namespace: str):
+        import redis  # Only needed when a shared backend is configured
+
+        self.namespace = namespace
+        self._client = redis.Redis.from_url(url)
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        raw = self._client.get(self._key(key))
+        if raw is None:
+            return None
+        entry = json.loads(raw)
+        return entry["value"], entry["stored_at"]
+
+    def set(self, key: str, value: Any, stored_at: float, expire_in: float) -> None:
+        payload = json.dumps({"value": value, "stored_at": stored_at}, default=str)
+        self._client.set(self._key(key), payload, ex=max(1, int(expire_in)))
+
+    def delete(self, key: str) -> None:
+        self._client.delete(self._key(key))
+
+    def clear(self) -> None:
+        for key in self._client.scan_iter(match=self._key("*")):
+            self._client.delete(key)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self._client.scan_iter(match=self._key("*")))
+
+
+def make_backend(namespace: str, max_entries: int = 1024):
+    """
+    Build the configured cache backend.
+
+    Uses Redis when CACHE_REDIS_URL is set, otherwise a process-local LRU.
+
+    Args:
+        namespace (str): Key prefix for shared backends
+        max_entries (int): Entry limit for the in-process backend
+
+    Returns:
+        The cache backend instance
+    """
+    if CACHE_REDIS_URL:
+        try:
+            return RedisBackend(CACHE_REDIS_URL, namespace)
+        except Exception as e:
+            logger.warning(f"Could not use Redis cache backend, falling back to in-process cache: {str(e)}")
+    return InMemoryBackend(max_entries=max_entries)
+
+
+class _Call:
+    """An in-flight load that concurrent callers for the same key wait on."""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class TTLCache:
+    """
+    Read-through cache with TTL, single-flight loading and stale-while-revalidate.
+
+    Fresh entries (younger than ttl) are returned directly. Entries younger than
+    ttl + stale_ttl are returned immediately while a background refresh runs.
+    Anything older is loaded synchronously, and concurrent misses for the same
+    key share a single loader call. get_async does the same for coroutine
+    loaders; its misses are shared between coroutines on the same event loop.
+    """
+
+    def __init__(self, name: str, ttl: float, stale_ttl: float = 0, backend=None,
+                 should_cache: Optional[Callable[[Any], bool]] = None):
+        self.name = name
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.backend = backend if backend is not None else InMemoryBackend()
+        self._should_cache = should_cache or (lambda value: True)
+        self._inflight: Dict[str, _Call] = {}
+        # Keys with a background refresh queued or running
+        self._refreshing: Set[str] = set()
+        self._async_inflight: Dict[Tuple[asyncio.AbstractEventLoop, str], "asyncio.Task"] = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "stale_hits": 0, "misses": 0, "loads": 0, "coalesced": 0, "errors": 0}
+        _caches.add(self)
+
+    def get(self, key: str, loader: Callable[[], Any], ttl: Optional[float] = None) -> Any:
+        """
+        Get a value from the cache, calling loader when it is missing or expired.
+
+        Args:
+            key (str): The cache key
+            loader (Callable[[], Any]): Produces the value on a miss
+            ttl (float, optional): Freshness for this entry, overriding the cache default
+
+        Returns:
+            Any: The cached or freshly loaded value
+        """
+        ttl = self.ttl if ttl is None else ttl
+        state, value = self._lookup(key, ttl)
+        if state == "fresh":
+            return value
+        if state == "stale":
+            self._refresh_in_background(key, loader, ttl)
+            return value
+        return self._load(key, loader, ttl)
+
+    async def get_async(self, key: str, loader: Callable[[], Awaitable[Any]],
+                        ttl: Optional[float] = None) -> Any:
+        """
+        Get a value from the cache, awaiting loader when it is missing or expired.
+
+        The load runs as its own task, so a caller that is cancelled or times
+        out doesn't cancel it for the other waiters, and the result is still cached.
+
+        Args:
+            key (str): The cache key
+            loader (Callable[[], Awaitable[Any]]): Coroutine function producing the value on a miss
+            ttl (float, optional): Freshness for this entry, overriding the cache default
+
+        Returns:
+            Any: The cached or freshly loaded value
+        """
+        ttl = self.ttl if ttl is None else ttl
+        state, value = self._lookup(key, ttl)
+        if state == "fresh":
+            return value
+        if state == "stale":
+            self._async_load_task(key, loader, ttl)
+            return value
+        task, started = self._async_load_task(key, loader, ttl)
+        if not started:
+            self._count("coalesced")
+        return await asyncio.shield(task)
+
+    def get_cached(self, key: str, loader: Callable[[], Any], ttl: Optional[float] = None) -> Optional[Any]:
+        """
+        Get a fresh or stale value without loading on a miss.
+
+        A stale value is returned and refreshed in the background, as get() does.
+        Misses are not counted, since the caller goes on to load them with get().
+
+        Args:
+            key (str): The cache key
+            loader (Callable[[], Any]): Refreshes a stale entry
+            ttl (float, optional): Freshness for this entry, overriding the cache default
+
+        Returns:
+            Optional[Any]: The cached value, or None on a miss
+        """
+        ttl = self.ttl if ttl is None else ttl
+        state, value = self._lookup(key, ttl, count_miss=False)
+        if state == "stale":
+            self._refresh_in_background(key, loader, ttl)
+        return value
+
+    def invalidate(self, key: str) -> None:
+        self.backend.delete(key)
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["stale_hits"] + stats["misses"]
+        stats["hit_ratio"] = (stats["hits"] + stats["stale_hits"]) / lookups if lookups else 0.0
+        return stats
+
+    def _count(self, stat: str) -> None:
+        with self._lock:
+            self._stats[stat] += 1
+        if stat in _LOOKUP_RESULTS:
+            cache_lookups.inc(cache=self.name, result=_LOOKUP_RESULTS[stat])
+        else:
+            _EVENT_COUNTERS[stat].inc(cache=self.name)
+
+    def _lookup(self, key: str, ttl: float, count_miss: bool = True) -> Tuple[str, Any]:
+        """Classify the stored entry as "fresh", "stale" or "miss" and count the lookup."""
+        try:
+            entry = self.backend.get(key)
+        except Exception as e:
+            logger.error(f"Error reading {self.name} cache: {str(e)}")
+            entry = None
+
+        if entry is not None:
+            value, stored_at = entry
+            age = time.time() - stored_at
+            if age < ttl:
+                self._count("hits")
+                return "fresh", value
+            if age < ttl + self.stale_ttl:
+                self._count("stale_hits")
+                return "stale", value
+
+        if count_miss:
+            self._count("misses")
+        return "miss", None
+
+    def _store(self, key: str, value: Any, ttl: Optional[float]) -> None:
+        if not self._should_cache(value):
+            return
+        try:
+            expire_in = (self.ttl if ttl is None else ttl) + self.stale_ttl
+            self.backend.set(key, value, time.time(), expire_in)
+        except Exception as e:
+            logger.error(f"Error writing {self.name} cache: {str(e)}")
+
+    def _load(self, key: str, loader: Callable[[], Any], ttl: Optional[float] = None) -> Any:
+        with self._lock:
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._inflight[key] = call
+
+        if not leader:
+            self._count("coalesced")
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            self._count("loads")
+            value = loader()
+            self._store(key, value, ttl)
+            call.value = value
+            return value
+        except Exception as e:
+            self._count("errors")
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            call.event.set()
+
+    def _async_load_task(self, key: str, loader: Callable[[], Awaitable[Any]],
+                         ttl: float) -> Tuple["asyncio.Task", bool]:
+        """The running loop's in-flight load for key, and whether this call started it."""
+        inflight_key = (asyncio.get_running_loop(), key)
+        task = self._async_inflight.get(inflight_key)
+        if task is not None:
+            return task, False
+
+        async def load():
+            self._count("loads")
+            try:
+                value = await loader()
+            except Exception as e:
+                self._count("errors")
+                logger.error(f"Error loading {self.name} cache entry {key}: {str(e)}")
+                raise
+            self._store(key, value, ttl)
+            return value
+
+        def forget(done: "asyncio.Task") -> None:
+            self._async_inflight.pop(inflight_key, None)
+            # Background refreshes have nobody awaiting them; don't warn about their errors
+            if not done.cancelled():
+                done.exception()
+
+        task = asyncio.ensure_future(load())
+        task.add_done_callback(forget)
+        self._async_inflight[inflight_key] = task
+        return task, True
+
+    def _refresh_in_background(self, key: str, loader: Callable[[], Any], ttl: float) -> None:
+        with self._lock:
+            if key in self._inflight or key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                self._load(key, loader, ttl)
+            except Exception as e:
+                logger.error(f"Error refreshing {self.name} cache entry {key}: {str(e)}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        _refresh_executor.submit(refresh)
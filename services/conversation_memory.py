@@ -0,0 +1,139 @@
+import os
+import logging
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+from app import db
+from models import AIAnalysis, ConversationSummary
+from services.ai_service import summarize_conversation
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Prompt budget for conversation history (approximate tokens)
+AI_HISTORY_TOKEN_BUDGET = int(os.environ.get("AI_HISTORY_TOKEN_BUDGET", "1500"))
+AI_HISTORY_SUMMARY_WORDS = int(os.environ.get("AI_HISTORY_SUMMARY_WORDS", "200"))
+AI_HISTORY_ANSWER_TOKENS = int(os.environ.get("AI_HISTORY_ANSWER_TOKENS", "300"))  # Per remembered answer
+AI_HISTORY_MAX_TURNS = int(os.environ.get("AI_HISTORY_MAX_TURNS", "20"))  # Rows read per request
+AI_SESSION_IDLE_TIMEOUT = float(os.environ.get("AI_SESSION_IDLE_TIMEOUT", "1800"))  # Seconds between sessions
+
+Turn = Tuple[str, str, datetime]
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token for English text)."""
+    return (len(text) + 3) // 4
+
+
+def _truncate(text: str, max_tokens: int) -> str:
+    max_chars = max_tokens * 4
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars].rsplit(" ", 1)[0] + " ..."
+
+
+def format_turns(turns: List[Turn]) -> str:
+    """Format (query, response, created_at) turns, oldest first, for the prompt."""
+    return "\n\n".join(
+        f"User: {query}\nAnalyst: {_truncate(response, AI_HISTORY_ANSWER_TOKENS)}"
+        for query, response, _ in turns
+    )
+
+
+def _session_turns(user_id: int, since: Optional[datetime]) -> List[Turn]:
+    """
+    Recent turns of the user's current session, oldest first.
+
+    Reads at most AI_HISTORY_MAX_TURNS rows through the (user_id, created_at)
+    index and stops at the first idle gap longer than AI_SESSION_IDLE_TIMEOUT.
+    """
+    query = db.session.query(AIAnalysis.query, AIAnalysis.response, AIAnalysis.created_at).filter(
+        AIAnalysis.user_id == user_id, AIAnalysis.status == "completed")
+    if since is not None:
+        query = query.filter(AIAnalysis.created_at > since)
+    rows = query.order_by(AIAnalysis.created_at.desc()).limit(AI_HISTORY_MAX_TURNS).all()
+
+    gap = timedelta(seconds=AI_SESSION_IDLE_TIMEOUT)
+    turns: List[Turn] = []
+    previous = datetime.utcnow()
+    for query_text, response, created_at in rows:
+        if created_at is None or previous - created_at > gap:
+            break
+        turns.append((query_text, response, created_at))
+        previous = created_at
+    turns.reverse()
+    return turns
+
+
+def _fold_into_summary(record: Optional[ConversationSummary], user_id: int,
+                       summary: str, evicted: List[Turn]) -> str:
+    """Summarize evicted turns into the stored summary, once per turn."""
+    try:
+        summary = summarize_conversation(summary, format_turns(evicted), max_words=AI_HISTORY_SUMMARY_WORDS)
+    except Exception as e:
+        # Without a summary the turns are dropped; the recent window is still kept
+        logger.warning(f"Could not summarize conversation for user {user_id}: {str(e)}")
+    summary = _truncate(summary, AI_HISTORY_SUMMARY_WORDS * 2)
+
+    if record is None:
+        record = ConversationSummary(user_id=user_id)
+        db.session.add(record)
+    record.summary = summary
+    record.covered_until = evicted[-1][2]
+    db.session.commit()
+    return summary
+
+
+def build_history(user_id: int) -> str:
+    """
+    Build the conversation history to include in the user's next prompt.
+
+    Turns of the current session are kept verbatim while they fit
+    AI_HISTORY_TOKEN_BUDGET. Older turns are folded into a rolling summary
+    stored in ConversationSummary, so each turn is summarized only once and
+    prompt size stays flat however long the conversation gets. A new session
+    (after AI_SESSION_IDLE_TIMEOUT of inactivity) starts with no history.
+
+    Args:
+        user_id (int): The user's ID
+
+    Returns:
+        str: History text for the prompt's {history} slot, possibly empty
+    """
+    try:
+        record = db.session.get(ConversationSummary, user_id)
+        since = record.covered_until if record is not None else None
+        turns = _session_turns(user_id, since)
+        if not turns:
+            return ""
+
+        # The summary only belongs to this session if nothing idle separates them
+        summary = ""
+        if record is not None and record.summary and \
+                turns[0][2] - record.covered_until <= timedelta(seconds=AI_SESSION_IDLE_TIMEOUT):
+            summary = record.summary
+
+        # Keep every turn while they fit next to the summary. On overflow, fold
+        # the oldest ones until the rest use half the budget, so summaries are
+        # written every few turns rather than on every request.
+        budget = AI_HISTORY_TOKEN_BUDGET - estimate_tokens(summary)
+        start = 0
+        if estimate_tokens(format_turns(turns)) > budget:
+            start = len(turns)
+            while start > 0 and estimate_tokens(format_turns(turns[start - 1:])) <= budget // 2:
+                start -= 1
+        evicted, recent = turns[:start], turns[start:]
+
+        if evicted:
+            summary = _fold_into_summary(record, user_id, summary, evicted)
+
+        parts = []
+        if summary:
+            parts.append(f"Summary of earlier conversation: {summary}")
+        if recent:
+            parts.append(format_turns(recent))
+        return "\n\n".join(parts)
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error loading conversation history for user {user_id}: {str(e)}")
+        return ""
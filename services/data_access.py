@@ -0,0 +1,114 @@
+import time
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import selectinload
+
+from models import Portfolio, Watchlist
+
+# Per-request statement counters. A context variable rather than a thread
+# local, so async requests sharing the event loop thread are counted apart
+# and work handed to asyncio.to_thread is counted for its request.
+_query_stats: ContextVar[Optional[Dict[str, float]]] = ContextVar("query_stats", default=None)
+_stats_lock = threading.Lock()
+
+
+def _stats() -> Dict[str, float]:
+    stats = _query_stats.get()
+    if stats is None:
+        stats = {"count": 0, "time": 0.0}
+        _query_stats.set(stats)
+    return stats
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    stats = _stats()
+    # Work a request fans out to other threads adds to the same totals
+    with _stats_lock:
+        stats["count"] += 1
+        stats["time"] += elapsed
+
+
+def reset_query_stats() -> None:
+    """Start counting statements for the current request from zero."""
+    _query_stats.set({"count": 0, "time": 0.0})
+
+
+def get_query_stats() -> Dict[str, float]:
+    """Statements executed for the current request since the last reset, and their total time."""
+    stats = _stats()
+    with _stats_lock:
+        return dict(stats)
+
+
+@contextmanager
+def count_queries():
+    """
+    Count the SQL statements executed inside the block for the current context.
+
+    Statements from threads or tasks the block hands work to with a copy of
+    its context (as the quote batch executor does) are included;
+    statements from other requests on the same thread are not.
+
+    Yields:
+        Dict[str, float]: Filled with "count" and "time" when the block exits
+    """
+    before = get_query_stats()
+    result = {"count": 0, "time": 0.0}
+    try:
+        yield result
+    finally:
+        after = get_query_stats()
+        result["count"] = after["count"] - before["count"]
+        result["time"] = after["time"] - before["time"]
+
+
+def get_user_portfolios(user_id: int) -> List[Portfolio]:
+    """
+    Load a user's portfolios with their holdings.
+
+    Always issues two queries (portfolios, then all of their holdings),
+    however many portfolios the user has.
+
+    Args:
+        user_id (int): The owner of the portfolios
+
+    Returns:
+        List[Portfolio]: Portfolios ordered by id, with holdings loaded
+    """
+    return (Portfolio.query
+            .filter_by(user_id=user_id)
+            .options(selectinload(Portfolio.holdings))
+            .order_by(Portfolio.id)
+            .all())
+
+
+def get_user_watchlists(user_id: int) -> List[Watchlist]:
+    """
+    Load a user's watchlists with their items.
+
+    Always issues two queries (watchlists, then all of their items),
+    however many watchlists the user has.
+
+    Args:
+        user_id (int): The owner of the watchlists
+
+    Returns:
+        List[Watchlist]: Watchlists ordered by id, with items loaded
+    """
+    return (Watchlist.query
+            .filter_by(user_id=user_id)
+            .options(selectinload(Watchlist.stocks))
+            .order_by(Watchlist.id)
+            .all())
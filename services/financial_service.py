@@ -1,9 +1,12 @@
 import os
+import asyncio
 import logging
-import requests
-from datetime import datetime, timedelta
-import json
-from typing import Dict, Any, List
+import contextvars
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, Any, List, Iterable
+from services import http_client
+from services.cache import TTLCache, make_backend
 
 # Set up logging
 logger = logging.getLogger(__name__)
@@ -12,8 +15,113 @@ logger = logging.getLogger(__name__)
 # For now, we'll create a simple mock implementation that would be replaced with real API calls
 # Get API key from environment variables
 ALPHA_VANTAGE_API_KEY = os.environ.get("ALPHA_VANTAGE_API_KEY", "")
+# Overridable so load tests can point at a local stand-in
+ALPHA_VANTAGE_URL = os.environ.get("ALPHA_VANTAGE_URL", "https://www.alphavantage.co/query")
+
+# Quote cache settings (seconds / entries)
+QUOTE_CACHE_TTL = float(os.environ.get("QUOTE_CACHE_TTL", "60"))
+QUOTE_CACHE_STALE_TTL = float(os.environ.get("QUOTE_CACHE_STALE_TTL", "300"))
+QUOTE_CACHE_MAX_ENTRIES = int(os.environ.get("QUOTE_CACHE_MAX_ENTRIES", "2048"))
+
+# Batch quote fan-out settings
+QUOTE_BATCH_WORKERS = int(os.environ.get("QUOTE_BATCH_WORKERS", "8"))
+QUOTE_BATCH_TIMEOUT = float(os.environ.get("QUOTE_BATCH_TIMEOUT", "10"))
+
+# ETFs tracking the major indices shown in the market summary
+MARKET_INDEX_SYMBOLS = ["SPY", "DIA", "QQQ"]
+MARKET_INDEX_NAMES = {
+    "SPY": "S&P 500",
+    "DIA": "Dow Jones Industrial Average",
+    "QQQ": "NASDAQ-100"
+}
+
+# Shared quote cache; failed lookups carry an "error" key and are not cached
+quote_cache = TTLCache(
+    name="quotes",
+    ttl=QUOTE_CACHE_TTL,
+    stale_ttl=QUOTE_CACHE_STALE_TTL,
+    backend=make_backend("quotes", max_entries=QUOTE_CACHE_MAX_ENTRIES),
+    should_cache=lambda quote: "error" not in quote
+)
+
+# Bounded pool shared by all batch requests so fan-out can't exhaust the upstream quota
+_quote_executor = ThreadPoolExecutor(max_workers=QUOTE_BATCH_WORKERS, thread_name_prefix="quote-fetch")
 
 def get_stock_data(symbol: str) -> Dict[str, Any]:
+    """
+    Get stock data for a given symbol, served from the quote cache when possible.
+    
+    Args:
+        symbol (str): The stock symbol to get data for.
+        
+    Returns:
+        Dict[str, Any]: Stock data including price, change, volume, etc.
+    """
+    return dict(quote_cache.get(symbol, lambda: _fetch_stock_data(symbol)))
+
+
+def get_stock_data_batch(symbols: Iterable[str], timeout: float = QUOTE_BATCH_TIMEOUT) -> Dict[str, Dict[str, Any]]:
+    """
+    Get stock data for several symbols at once.
+    
+    Symbols are upper-cased and deduplicated. Cached quotes are answered
+    directly; only the misses are fetched concurrently on the shared pool, so
+    one request with many cold symbols doesn't queue other requests' cache
+    hits behind it. Symbols that don't resolve within the timeout get an error entry.
+    
+    Args:
+        symbols (Iterable[str]): The stock symbols to get data for.
+        timeout (float): Seconds to wait for the whole batch.
+        
+    Returns:
+        Dict[str, Dict[str, Any]]: Stock data keyed by symbol.
+    """
+    unique_symbols = list(dict.fromkeys(s.strip().upper() for s in symbols if s and s.strip()))
+    if not unique_symbols:
+        return {}
+    
+    results = {}
+    misses = []
+    for symbol in unique_symbols:
+        quote = quote_cache.get_cached(symbol, lambda symbol=symbol: _fetch_stock_data(symbol))
+        if quote is not None:
+            results[symbol] = dict(quote)
+        else:
+            misses.append(symbol)
+    
+    # Each fetch runs in a copy of the caller's context so its upstream calls count for the caller's request
+    futures = {_quote_executor.submit(contextvars.copy_context().run, get_stock_data, symbol): symbol
+               for symbol in misses}
+    done, not_done = wait(futures, timeout=timeout) if futures else (set(), set())
+    for future in not_done:
+        # Drops fetches still queued behind other requests; running ones finish and fill the cache
+        future.cancel()
+    
+    for future, symbol in futures.items():
+        if future in done:
+            results[symbol] = future.result()
+        else:
+            logger.error(f"Timed out getting stock data for {symbol}")
+            results[symbol] = _empty_quote(symbol, "Timed out")
+    
+    return {symbol: results[symbol] for symbol in unique_symbols}
+
+
+def _empty_quote(symbol: str, error: str) -> Dict[str, Any]:
+    return {
+        "symbol": symbol,
+        "price": 0.0,
+        "change": 0.0,
+        "change_percent": 0.0,
+        "volume": 0,
+        "market_cap": 0.0,
+        "pe_ratio": 0.0,
+        "dividend_yield": 0.0,
+        "error": error
+    }
+
+
+def _fetch_stock_data(symbol: str) -> Dict[str, Any]:
     """
     Get stock data for a given symbol using Alpha Vantage API.
     
@@ -27,97 +135,207 @@ def get_stock_data(symbol: str) -> Dict[str, Any]:
         if not ALPHA_VANTAGE_API_KEY:
             logger.warning("ALPHA_VANTAGE_API_KEY is not set in environment variables")
             # Return dummy data for development/testing
-            return {
-                "symbol": symbol,
-                "price": 0.0,
-                "change": 0.0,
-                "change_percent": 0.0,
-                "volume": 0,
-                "market_cap": 0.0,
-                "pe_ratio": 0.0,
-                "dividend_yield": 0.0,
-                "error": "API key not configured"
-            }
+            return _empty_quote(symbol, "API key not configured")
         
         # Make request to Alpha Vantage API
-        url = f"https://www.alphavantage.co/query?function=GLOBAL_QUOTE&symbol={symbol}&apikey={ALPHA_VANTAGE_API_KEY}"
-        response = requests.get(url)
+        response = http_client.get(ALPHA_VANTAGE_URL, params=_quote_params(symbol))
         
         if response.status_code != 200:
             logger.error(f"Error fetching stock data: {response.status_code}")
-            return {
-                "symbol": symbol,
-                "price": 0.0,
-                "change": 0.0,
-                "change_percent": 0.0,
-                "volume": 0,
-                "market_cap": 0.0,
-                "pe_ratio": 0.0,
-                "dividend_yield": 0.0,
-                "error": f"API error: {response.status_code}"
-            }
+            return _empty_quote(symbol, f"API error: {response.status_code}")
         
-        data = response.json()
+        return _parse_global_quote(symbol, response.json())
+    
+    except Exception as e:
+        logger.error(f"Error getting stock data for {symbol}: {str(e)}")
+        return _empty_quote(symbol, str(e))
+
+
+def _quote_params(symbol: str) -> Dict[str, str]:
+    return {
+        "function": "GLOBAL_QUOTE",
+        "symbol": symbol,
+        "apikey": ALPHA_VANTAGE_API_KEY
+    }
+
+
+def _parse_global_quote(symbol: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    """Turn an Alpha Vantage GLOBAL_QUOTE response into a quote."""
+    # Check if we have data
+    if "Global Quote" not in data or not data["Global Quote"]:
+        logger.error(f"No data found for symbol: {symbol}")
+        return _empty_quote(symbol, "No data found")
+    
+    quote = data["Global Quote"]
+    
+    # Parse data
+    price = float(quote.get("05. price", 0))
+    change = float(quote.get("09. change", 0))
+    change_percent = float(quote.get("10. change percent", "0%").replace("%", ""))
+    volume = int(quote.get("06. volume", 0))
+    
+    # Get additional data - this would typically come from a different API call
+    # For now, we'll provide placeholder values
+    market_cap = 0.0
+    pe_ratio = 0.0
+    dividend_yield = 0.0
+    
+    return {
+        "symbol": symbol,
+        "price": price,
+        "change": change,
+        "change_percent": change_percent,
+        "volume": volume,
+        "market_cap": market_cap,
+        "pe_ratio": pe_ratio,
+        "dividend_yield": dividend_yield
+    }
+
+
+async def get_stock_data_async(symbol: str) -> Dict[str, Any]:
+    """
+    Async variant of get_stock_data, for the ASGI entrypoint.
+    
+    Shares the quote cache with get_stock_data; misses are fetched with the
+    async HTTP client, so waiting on Alpha Vantage doesn't hold a thread.
+    
+    Args:
+        symbol (str): The stock symbol to get data for.
         
-        # Check if we have data
-        if "Global Quote" not in data or not data["Global Quote"]:
-            logger.error(f"No data found for symbol: {symbol}")
-            return {
-                "symbol": symbol,
-                "price": 0.0,
-                "change": 0.0,
-                "change_percent": 0.0,
-                "volume": 0,
-                "market_cap": 0.0,
-                "pe_ratio": 0.0,
-                "dividend_yield": 0.0,
-                "error": "No data found"
-            }
+    Returns:
+        Dict[str, Any]: Stock data including price, change, volume, etc.
+    """
+    return dict(await quote_cache.get_async(symbol, lambda: _fetch_stock_data_async(symbol)))
+
+
+async def get_stock_data_batch_async(symbols: Iterable[str],
+                                     timeout: float = QUOTE_BATCH_TIMEOUT) -> Dict[str, Dict[str, Any]]:
+    """
+    Async variant of get_stock_data_batch.
+    
+    Every symbol is requested at once; the async client's connection pool,
+    not a thread pool, bounds how many calls reach Alpha Vantage together.
+    
+    Args:
+        symbols (Iterable[str]): The stock symbols to get data for.
+        timeout (float): Seconds to wait for the whole batch.
         
-        quote = data["Global Quote"]
+    Returns:
+        Dict[str, Dict[str, Any]]: Stock data keyed by symbol.
+    """
+    unique_symbols = list(dict.fromkeys(s.strip().upper() for s in symbols if s and s.strip()))
+    if not unique_symbols:
+        return {}
+    
+    tasks = {asyncio.ensure_future(get_stock_data_async(symbol)): symbol for symbol in unique_symbols}
+    done, not_done = await asyncio.wait(tasks, timeout=timeout)
+    for task in not_done:
+        # The fetch itself keeps running in the cache and fills it for the next request
+        task.cancel()
+    
+    results = {}
+    for task, symbol in tasks.items():
+        if task in done:
+            results[symbol] = task.result()
+        else:
+            logger.error(f"Timed out getting stock data for {symbol}")
+            results[symbol] = _empty_quote(symbol, "Timed out")
+    
+    return results
+
+
+async def _fetch_stock_data_async(symbol: str) -> Dict[str, Any]:
+    """Async variant of _fetch_stock_data."""
+    try:
+        if not ALPHA_VANTAGE_API_KEY:
+            logger.warning("ALPHA_VANTAGE_API_KEY is not set in environment variables")
+            return _empty_quote(symbol, "API key not configured")
         
-        # Parse data
-        price = float(quote.get("05. price", 0))
-        change = float(quote.get("09. change", 0))
-        change_percent = float(quote.get("10. change percent", "0%").replace("%", ""))
-        volume = int(quote.get("06. volume", 0))
+        response = await http_client.async_get(ALPHA_VANTAGE_URL, params=_quote_params(symbol))
         
-        # Get additional data - this would typically come from a different API call
-        # For now, we'll provide placeholder values
-        market_cap = 0.0
-        pe_ratio = 0.0
-        dividend_yield = 0.0
+        if response.status_code != 200:
+            logger.error(f"Error fetching stock data: {response.status_code}")
+            return _empty_quote(symbol, f"API error: {response.status_code}")
         
-        return {
-            "symbol": symbol,
-            "price": price,
-            "change": change,
-            "change_percent": change_percent,
-            "volume": volume,
-            "market_cap": market_cap,
-            "pe_ratio": pe_ratio,
-            "dividend_yield": dividend_yield
-        }
+        return _parse_global_quote(symbol, response.json())
     
     except Exception as e:
         logger.error(f"Error getting stock data for {symbol}: {str(e)}")
-        return {
-            "symbol": symbol,
-            "price": 0.0,
-            "change": 0.0,
-            "change_percent": 0.0,
-            "volume": 0,
-            "market_cap": 0.0,
-            "pe_ratio": 0.0,
-            "dividend_yield": 0.0,
-            "error": str(e)
-        }
-
-
-def get_market_summary() -> Dict[str, Any]:
+        return _empty_quote(symbol, str(e))
+
+
+def _index_entry(symbol: str, quote: Dict[str, Any]) -> Dict[str, Any]:
+    entry = {
+        "symbol": symbol,
+        "name": MARKET_INDEX_NAMES.get(symbol, symbol),
+        "price": quote.get("price", 0.0),
+        "change": quote.get("change", 0.0),
+        "change_percent": quote.get("change_percent", 0.0)
+    }
+    if "error" in quote:
+        entry["error"] = quote["error"]
+    return entry
+
+
+def _market_summary_without_key() -> Dict[str, Any]:
+    return {
+        "indices": [
+            {
+                "symbol": "SPY",
+                "name": "S&P 500",
+                "price": 0.0,
+                "change": 0.0,
+                "change_percent": 0.0
+            },
+            {
+                "symbol": "DIA",
+                "name": "Dow Jones Industrial Average",
+                "price": 0.0,
+                "change": 0.0,
+                "change_percent": 0.0
+            },
+            {
+                "symbol": "QQQ",
+                "name": "NASDAQ-100",
+                "price": 0.0,
+                "change": 0.0,
+                "change_percent": 0.0
+            }
+        ],
+        "sectors": [],
+        "timestamp": datetime.now().isoformat(),
+        "error": "API key not configured"
+    }
+
+
+def _market_summary_from_quotes(quotes: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    index_data = [_index_entry(symbol, quotes[symbol]) for symbol in MARKET_INDEX_SYMBOLS]
+    
+    # Add timestamp for cache control and display
+    return {
+        "indices": index_data,
+        "sectors": [],  # Would include sector performance data
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+def _market_summary_error(e: Exception) -> Dict[str, Any]:
+    logger.error(f"Error getting market summary: {str(e)}")
+    return {
+        "indices": [],
+        "sectors": [],
+        "timestamp": datetime.now().isoformat(),
+        "error": str(e)
+    }
+
+
+def get_market_summary(timeout: float = QUOTE_BATCH_TIMEOUT) -> Dict[str, Any]:
     """
     Get a summary of the market including major indices.
     
+    Args:
+        timeout (float): Seconds to wait for the index quotes
+    
     Returns:
         Dict[str, Any]: Market summary data
     """
@@ -125,107 +343,85 @@ def get_market_summary() -> Dict[str, Any]:
         if not ALPHA_VANTAGE_API_KEY:
             logger.warning("ALPHA_VANTAGE_API_KEY is not set in environment variables")
             # Return error for proper handling
-            return {
-                "indices": [
-                    {
-                        "symbol": "SPY",
-                        "name": "S&P 500",
-                        "price": 0.0,
-                        "change": 0.0,
-                        "change_percent": 0.0
-                    },
-                    {
-                        "symbol": "DIA",
-                        "name": "Dow Jones Industrial Average",
-                        "price": 0.0,
-                        "change": 0.0,
-                        "change_percent": 0.0
-                    },
-                    {
-                        "symbol": "QQQ",
-                        "name": "NASDAQ-100",
-                        "price": 0.0,
-                        "change": 0.0,
-                        "change_percent": 0.0
-                    }
-                ],
-                "sectors": [],
-                "timestamp": datetime.now().isoformat(),
-                "error": "API key not configured"
-            }
-        
-        # Get data for major indices
-        indices = ["SPY", "DIA", "QQQ"]
-        index_data = []
-        
-        # Use a 5-second timeout for requests to prevent hanging
-        # Map symbols to proper names
-        name_map = {
-            "SPY": "S&P 500",
-            "DIA": "Dow Jones Industrial Average",
-            "QQQ": "NASDAQ-100"
-        }
+            return _market_summary_without_key()
         
-        for symbol in indices:
-            try:
-                stock_data = get_stock_data(symbol)
-                
-                index_data.append({
-                    "symbol": symbol,
-                    "name": name_map.get(symbol, symbol),
-                    "price": stock_data["price"],
-                    "change": stock_data["change"],
-                    "change_percent": stock_data["change_percent"]
-                })
-            except Exception as symbol_error:
-                logger.error(f"Error getting data for symbol {symbol}: {str(symbol_error)}")
-                # Add placeholder with error for this symbol but continue with others
-                index_data.append({
-                    "symbol": symbol,
-                    "name": name_map.get(symbol, symbol),
-                    "price": 0.0,
-                    "change": 0.0,
-                    "change_percent": 0.0,
-                    "error": str(symbol_error)
-                })
+        # Fetch the major indices concurrently
+        return _market_summary_from_quotes(get_stock_data_batch(MARKET_INDEX_SYMBOLS, timeout=timeout))
+    
+    except Exception as e:
+        return _market_summary_error(e)
+
+
+async def get_market_summary_async(timeout: float = QUOTE_BATCH_TIMEOUT) -> Dict[str, Any]:
+    """
+    Async variant of get_market_summary.
+    
+    Args:
+        timeout (float): Seconds to wait for the index quotes
+    
+    Returns:
+        Dict[str, Any]: Market summary data
+    """
+    try:
+        if not ALPHA_VANTAGE_API_KEY:
+            logger.warning("ALPHA_VANTAGE_API_KEY is not set in environment variables")
+            return _market_summary_without_key()
         
-        # Add timestamp for cache control and display
-        return {
-            "indices": index_data,
-            "sectors": [],  # Would include sector performance data
-            "timestamp": datetime.now().isoformat()
-        }
+        return _market_summary_from_quotes(await get_stock_data_batch_async(MARKET_INDEX_SYMBOLS, timeout=timeout))
     
     except Exception as e:
-        logger.error(f"Error getting market summary: {str(e)}")
-        return {
-            "indices": [],
-            "sectors": [],
-            "timestamp": datetime.now().isoformat(),
-            "error": str(e)
-        }
+        return _market_summary_error(e)
 
 
 def get_historical_data(symbol: str, days: int = 30) -> List[Dict[str, Any]]:
     """
     Get historical price data for a stock.
     
+    Bars are served from the local price history store; only days missing
+    from the store are downloaded from Alpha Vantage.
+    
     Args:
         symbol (str): The stock symbol
         days (int): Number of days of historical data to return
         
     Returns:
-        List[Dict[str, Any]]: List of daily price data
+        List[Dict[str, Any]]: List of daily price data (newest first)
     """
+    # Imported here because the store needs the app's database session
+    from services import price_store
+    
     try:
-        if not ALPHA_VANTAGE_API_KEY:
+        if ALPHA_VANTAGE_API_KEY:
+            price_store.ensure_history(symbol, days, fetch=_fetch_daily_series)
+        else:
             logger.warning("ALPHA_VANTAGE_API_KEY is not set in environment variables")
-            # Return dummy data for development/testing
-            return []
         
+        return price_store.get_bars(symbol, limit=days)
+    
+    except Exception as e:
+        logger.error(f"Error getting historical data for {symbol}: {str(e)}")
+        return []
+
+
+def _fetch_daily_series(symbol: str, outputsize: str = "compact") -> List[Dict[str, Any]]:
+    """
+    Download daily bars for a stock from Alpha Vantage.
+    
+    Args:
+        symbol (str): The stock symbol
+        outputsize (str): "compact" (last 100 bars) or "full"
+        
+    Returns:
+        List[Dict[str, Any]]: List of daily price data (newest first)
+    """
+    try:
         # Make request to Alpha Vantage API
-        url = f"https://www.alphavantage.co/query?function=TIME_SERIES_DAILY&symbol={symbol}&outputsize=compact&apikey={ALPHA_VANTAGE_API_KEY}"
-        response = requests.get(url)
+        response = http_client.get(ALPHA_VANTAGE_URL, params={
+            "function": "TIME_SERIES_DAILY",
+            "symbol": symbol,
+            "outputsize": outputsize,
+            "apikey": ALPHA_VANTAGE_API_KEY
+        })
         
         if response.status_code != 200:
             logger.error(f"Error fetching historical data: {response.status_code}")
@@ -240,10 +436,9 @@ def get_historical_data(symbol: str, days: int = 30) -> List[Dict[str, Any]]:
         
         time_series = data["Time Series (Daily)"]
         
-        # Convert to list and limit to requested number of days
         historical_data = []
         
-        for date, values in list(time_series.items())[:days]:
+        for date, values in time_series.items():
             historical_data.append({
                 "date": date,
                 "open": float(values["1. open"]),
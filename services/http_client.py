@@ -0,0 +1,359 @@
+import os
+import time
+import asyncio
+import logging
+import random
+import threading
+import weakref
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import EmptyPoolError
+from urllib3.util.retry import Retry
+
+from services.metrics import registry
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Outbound HTTP settings
+HTTP_CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", "3.05"))
+HTTP_READ_TIMEOUT = float(os.environ.get("HTTP_READ_TIMEOUT", "10"))
+HTTP_POOL_MAXSIZE = int(os.environ.get("HTTP_POOL_MAXSIZE", "10"))  # Connections kept per host
+# Seconds a caller waits for a free pooled connection before failing, so a slow
+# upstream that ties up the whole pool can't hang every worker thread behind it
+HTTP_POOL_TIMEOUT = float(os.environ.get("HTTP_POOL_TIMEOUT", "5"))
+HTTP_MAX_RETRIES = int(os.environ.get("HTTP_MAX_RETRIES", "3"))
+HTTP_BACKOFF_FACTOR = float(os.environ.get("HTTP_BACKOFF_FACTOR", "0.5"))
+HTTP_BACKOFF_JITTER = float(os.environ.get("HTTP_BACKOFF_JITTER", "0.5"))
+# Async requests don't hold a thread each, so one loop can keep more connections open
+HTTP_ASYNC_POOL_MAXSIZE = int(os.environ.get("HTTP_ASYNC_POOL_MAXSIZE", "100"))
+
+_RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Metrics
+upstream_requests = registry.counter(
+    "upstream_requests_total", "Outbound HTTP requests", ("host", "status"))
+upstream_latency = registry.histogram(
+    "upstream_request_duration_seconds", "Outbound HTTP request latency", ("host",))
+upstream_connections = registry.counter(
+    "upstream_connections_opened_total", "New outbound TCP connections (the rest were reused)", ("host",))
+upstream_connection_reuse = registry.gauge(
+    "upstream_connection_reuse_ratio", "Share of outbound requests that reused a pooled connection, since start",
+    ("host",))
+
+# Upstream APIs by host, for per-request accounting
+UPSTREAM_SERVICES = {
+    "www.alphavantage.co": "alpha_vantage",
+    "api.tavily.com": "tavily",
+    "api.groq.com": "groq",
+}
+
+# Calls and seconds per service made while serving the current request; None outside requests
+_request_upstream: ContextVar[Optional[Dict[str, List[float]]]] = ContextVar("request_upstream", default=None)
+_request_upstream_lock = threading.Lock()
+
+
+def _record(host: str, status: str, elapsed: float) -> None:
+    upstream_latency.observe(elapsed, host=host)
+    upstream_requests.inc(host=host, status=status)
+    stats = _request_upstream.get()
+    if stats is not None:
+        # Batch fetches record from several threads into the same request's totals
+        with _request_upstream_lock:
+            entry = stats.setdefault(UPSTREAM_SERVICES.get(host, host), [0, 0.0])
+            entry[0] += 1
+            entry[1] += elapsed
+
+
+@contextmanager
+def track_upstream(host: str) -> Iterator[None]:
+    """
+    Record a call made by a vendor SDK with its own HTTP stack in the upstream metrics.
+
+    The status label is "ok" or "error", since the SDK hides the HTTP status.
+
+    Args:
+        host (str): The API host the SDK talks to, e.g. "api.tavily.com"
+    """
+    start = time.perf_counter()
+    status = "error"
+    try:
+        yield
+        status = "ok"
+    finally:
+        _record(host, status, time.perf_counter() - start)
+
+
+def reset_upstream_stats() -> None:
+    """Start counting upstream calls for the current request from zero."""
+    _request_upstream.set({})
+
+
+def get_upstream_stats() -> Dict[str, Dict[str, float]]:
+    """
+    Upstream calls made for the current request since the last reset.
+
+    Returns:
+        Dict[str, Dict[str, float]]: calls and time (seconds) per service
+    """
+    stats = _request_upstream.get() or {}
+    with _request_upstream_lock:
+        return {service: {"calls": calls, "time": elapsed} for service, (calls, elapsed) in stats.items()}
+
+
+class _CountingHTTPConnectionPool(HTTPConnectionPool):
+    def _new_conn(self):
+        upstream_connections.inc(host=self.host)
+        return super()._new_conn()
+
+    def _get_conn(self, timeout=None):
+        # requests never passes a pool timeout, which would block forever when the pool is exhausted
+        return super()._get_conn(timeout=HTTP_POOL_TIMEOUT if timeout is None else timeout)
+
+
+class _CountingHTTPSConnectionPool(HTTPSConnectionPool):
+    def _new_conn(self):
+        upstream_connections.inc(host=self.host)
+        return super()._new_conn()
+
+    def _get_conn(self, timeout=None):
+        return super()._get_conn(timeout=HTTP_POOL_TIMEOUT if timeout is None else timeout)
+
+
+class _InstrumentedAdapter(HTTPAdapter):
+    """HTTPAdapter that applies default timeouts and records metrics."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _CountingHTTPConnectionPool,
+            "https": _CountingHTTPSConnectionPool,
+        }
+
+    def send(self, request, timeout=None, **kwargs):
+        if timeout is None:
+            timeout = (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+
+        host = urlsplit(request.url).hostname or ""
+        start = time.perf_counter()
+        status = "error"
+        try:
+            response = super().send(request, timeout=timeout, **kwargs)
+            status = str(response.status_code)
+            return response
+        except EmptyPoolError as e:
+            status = "pool_timeout"
+            raise requests.exceptions.ConnectionError(
+                f"No free connection to {host} within {HTTP_POOL_TIMEOUT}s", request=request) from e
+        finally:
+            _record(host, status, time.perf_counter() - start)
+
+
+class _InstrumentedTransport(httpx.HTTPTransport):
+    """httpx transport that records the same metrics as the requests session."""
+
+    def handle_request(self, request):
+        host = request.url.host
+        start = time.perf_counter()
+        status = "error"
+        try:
+            response = super().handle_request(request)
+            status = str(response.status_code)
+            return response
+        finally:
+            _record(host, status, time.perf_counter() - start)
+
+
+class _InstrumentedAsyncTransport(httpx.AsyncHTTPTransport):
+    """Async httpx transport that records the same metrics as the requests session."""
+
+    async def handle_async_request(self, request):
+        host = request.url.host
+        start = time.perf_counter()
+        status = "error"
+        try:
+            response = await super().handle_async_request(request)
+            status = str(response.status_code)
+            return response
+        finally:
+            _record(host, status, time.perf_counter() - start)
+
+
+_session: Optional[requests.Session] = None
+_httpx_client: Optional[httpx.Client] = None
+# Async connections belong to the event loop that opened them
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """
+    Get the shared requests session for outbound calls.
+
+    The session keeps pooled keep-alive connections (HTTP_POOL_MAXSIZE per host),
+    applies connect/read timeouts to every request and retries connection errors,
+    429 and 5xx responses with jittered exponential backoff. When every pooled
+    connection to a host is busy, callers wait up to HTTP_POOL_TIMEOUT seconds
+    for one and then get a requests.ConnectionError.
+
+    Returns:
+        requests.Session: The process-wide session
+    """
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                retry = Retry(
+                    total=HTTP_MAX_RETRIES,
+                    backoff_factor=HTTP_BACKOFF_FACTOR,
+                    backoff_jitter=HTTP_BACKOFF_JITTER,
+                    status_forcelist=_RETRY_STATUSES,
+                    allowed_methods=frozenset(["GET", "HEAD"]),
+                    raise_on_status=False
+                )
+                adapter = _InstrumentedAdapter(
+                    pool_connections=HTTP_POOL_MAXSIZE,
+                    pool_maxsize=HTTP_POOL_MAXSIZE,
+                    pool_block=True,
+                    max_retries=retry
+                )
+                session = requests.Session()
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _session = session
+    return _session
+
+
+def get_httpx_client() -> httpx.Client:
+    """
+    Get the shared httpx client for SDKs that accept one (e.g. Groq).
+
+    Uses the same pool size and timeouts as get_session; retries are left to
+    the SDK's own retry logic.
+
+    Returns:
+        httpx.Client: The process-wide client
+    """
+    global _httpx_client
+    if _httpx_client is None:
+        with _lock:
+            if _httpx_client is None:
+                _httpx_client = httpx.Client(
+                    transport=_InstrumentedTransport(
+                        limits=httpx.Limits(
+                            max_connections=HTTP_POOL_MAXSIZE,
+                            max_keepalive_connections=HTTP_POOL_MAXSIZE
+                        ),
+                        retries=HTTP_MAX_RETRIES
+                    ),
+                    timeout=httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT, pool=HTTP_POOL_TIMEOUT)
+                )
+    return _httpx_client
+
+
+def get_async_httpx_client() -> httpx.AsyncClient:
+    """
+    Get the async httpx client for the running event loop.
+
+    One client is kept per loop, with the same timeouts and metrics as
+    get_httpx_client. Waiting requests don't hold a thread, so the pool allows
+    up to HTTP_ASYNC_POOL_MAXSIZE connections in flight. Must be called from
+    a coroutine.
+
+    Returns:
+        httpx.AsyncClient: The running loop's client
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = httpx.AsyncClient(
+            transport=_InstrumentedAsyncTransport(
+                limits=httpx.Limits(
+                    max_connections=HTTP_ASYNC_POOL_MAXSIZE,
+                    max_keepalive_connections=HTTP_POOL_MAXSIZE
+                ),
+                retries=HTTP_MAX_RETRIES
+            ),
+            timeout=httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT)
+        )
+        _async_clients[loop] = client
+    return client
+
+
+async def async_get(url: str, params: Optional[Dict[str, Any]] = None, **kwargs) -> httpx.Response:
+    """
+    Issue a GET request through the running loop's async client.
+
+    Connection errors are retried by the transport; 429 and 5xx responses are
+    retried here with the same jittered exponential backoff as get().
+
+    Args:
+        url (str): The URL to request
+        params (Dict[str, Any], optional): Query string parameters
+
+    Returns:
+        httpx.Response: The response
+    """
+    client = get_async_httpx_client()
+    for attempt in range(HTTP_MAX_RETRIES + 1):
+        response = await client.get(url, params=params, **kwargs)
+        if response.status_code not in _RETRY_STATUSES or attempt == HTTP_MAX_RETRIES:
+            return response
+        await response.aclose()
+        delay = HTTP_BACKOFF_FACTOR * (2 ** attempt) + random.uniform(0, HTTP_BACKOFF_JITTER)
+        await asyncio.sleep(delay)
+    return response
+
+
+def get(url: str, params: Optional[Dict[str, Any]] = None, **kwargs) -> requests.Response:
+    """
+    Issue a GET request through the shared session.
+
+    Args:
+        url (str): The URL to request
+        params (Dict[str, Any], optional): Query string parameters
+
+    Returns:
+        requests.Response: The response
+    """
+    return get_session().get(url, params=params, **kwargs)
+
+
+def connection_stats() -> Dict[str, Dict[str, float]]:
+    """
+    Summarize connection reuse per upstream host.
+
+    Only hosts reached through get_session are included, since httpx doesn't
+    expose when it opens a new connection.
+
+    Returns:
+        Dict[str, Dict[str, float]]: requests, connections opened and reuse ratio per host
+    """
+    requests_by_host: Dict[str, float] = {}
+    for (host, _status), count in upstream_requests.samples().items():
+        requests_by_host[host] = requests_by_host.get(host, 0) + count
+
+    stats = {}
+    for (host,), opened in upstream_connections.samples().items():
+        count = requests_by_host.get(host, 0)
+        stats[host] = {
+            "requests": count,
+            "connections_opened": opened,
+            "reuse_ratio": max(0.0, 1 - opened / count) if count else 0.0
+        }
+    return stats
+
+
+def _collect_connection_reuse() -> None:
+    for host, stats in connection_stats().items():
+        upstream_connection_reuse.set(stats["reuse_ratio"], host=host)
+
+
+registry.on_collect(_collect_connection_reuse)
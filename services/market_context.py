@@ -0,0 +1,192 @@
+import os
+import re
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set
+
+import numpy as np
+
+from services.cache import TTLCache, InMemoryBackend
+from services.financial_service import get_stock_data, get_historical_data
+from services.news_enrichment import get_known_symbols
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Snapshot settings
+MARKET_CONTEXT_INTERVAL = float(os.environ.get("MARKET_CONTEXT_INTERVAL", "300"))  # Seconds a snapshot is reused
+MARKET_CONTEXT_MAX_SYMBOLS = int(os.environ.get("MARKET_CONTEXT_MAX_SYMBOLS", "5"))
+MARKET_CONTEXT_DAYS = 30
+TRADING_DAYS_PER_YEAR = 252
+
+# $cashtags, or short words that may be a known symbol
+_TICKER_RE = re.compile(r"\$([A-Za-z]{1,5})\b|(?<![\w&$])([A-Za-z]{1,5})(?![\w&])")
+
+# Words common in finance questions that are only taken as tickers when written
+# as $cashtags, even if someone holds a symbol spelled that way
+_NOT_TICKERS = {
+    "BUY", "SELL", "HOLD", "SHORT", "LONG", "NOW", "WHY", "HOW", "WHAT", "WHEN", "AND", "OR", "THE",
+    "IS", "IT", "TO", "OF", "IN", "ON", "FOR", "NOT", "NO", "YES", "ALL", "AI", "CEO", "CFO", "ETF",
+    "ETFS", "IPO", "EPS", "GDP", "CPI", "FED", "USA", "US", "USD", "EUR", "GBP", "SEC", "FOMC",
+    "YOY", "QOQ", "ROI", "ROE", "PE", "DCF", "IRA", "FAQ", "OK", "TL", "DR", "EV", "EBIT", "API",
+    "UK", "EU", "NYSE", "ESG", "IMO", "VS", "ATH", "DD", "OTC",
+}
+
+# Symbols tagged on stored news, refreshed every few minutes
+news_symbols_cache = TTLCache(name="news-symbols", ttl=300, backend=InMemoryBackend(max_entries=1))
+
+# One snapshot per symbol per interval, shared by every user. Symbols without
+# data are cached too, so unknown words don't trigger repeated lookups.
+snapshot_cache = TTLCache(
+    name="market-snapshot",
+    ttl=MARKET_CONTEXT_INTERVAL,
+    backend=InMemoryBackend(max_entries=1024)
+)
+
+
+def _load_news_symbols() -> Set[str]:
+    # Imported here so ticker detection can run without the app (e.g. in scripts)
+    from app import db
+    from models import NewsSymbol
+
+    return {row[0].upper() for row in db.session.query(NewsSymbol.symbol).distinct() if row[0]}
+
+
+def get_context_symbols() -> Set[str]:
+    """Symbols worth fetching market data for: held, watched or tagged on stored news."""
+    try:
+        news_symbols = news_symbols_cache.get("symbols", _load_news_symbols)
+    except Exception as e:
+        logger.debug(f"News symbols unavailable: {str(e)}")
+        news_symbols = set()
+    return get_known_symbols() | news_symbols
+
+
+def detect_tickers(text: str, known_symbols: Optional[Set[str]] = None) -> List[str]:
+    """
+    Find ticker symbols mentioned in a question.
+
+    $cashtags always count. Any other word only counts when it is a known
+    symbol, so a shouted question ("SHOULD I BUY ABOUT NOW") doesn't spend
+    upstream quota on quote lookups for ordinary words. Known symbols match
+    in upper or lower case ("nvda"), except single letters and common words
+    ("NOW", "on"), which need the $.
+
+    Args:
+        text (str): The user's question
+        known_symbols (Set[str], optional): Upper-case symbols to recognize
+            without a $; defaults to get_context_symbols()
+
+    Returns:
+        List[str]: Up to MARKET_CONTEXT_MAX_SYMBOLS symbols in order of mention
+    """
+    known_symbols = known_symbols if known_symbols is not None else get_context_symbols()
+    found: List[str] = []
+    for cashtag, word in _TICKER_RE.findall(text or ""):
+        symbol = (cashtag or word).upper()
+        if word:
+            if symbol not in known_symbols or not (word.isupper() or word.islower()):
+                continue
+            if symbol in _NOT_TICKERS or len(word) == 1:
+                continue
+        if symbol not in found:
+            found.append(symbol)
+    return found[:MARKET_CONTEXT_MAX_SYMBOLS]
+
+
+def _build_snapshot(symbol: str) -> Optional[Dict[str, Any]]:
+    quote = get_stock_data(symbol)
+    if "error" in quote or not quote.get("price"):
+        return None
+
+    snapshot = {
+        "symbol": symbol,
+        "price": quote["price"],
+        "change_percent": quote.get("change_percent"),
+        "return_30d": None,
+        "volatility_30d": None,
+        "as_of": datetime.now().isoformat(timespec="minutes"),
+    }
+
+    bars = get_historical_data(symbol, days=MARKET_CONTEXT_DAYS + 1)
+    closes = np.array([bar["close"] for bar in reversed(bars)], dtype=float)
+    if len(closes) >= 2:
+        returns = closes[1:] / closes[:-1] - 1
+        snapshot["return_30d"] = float(closes[-1] / closes[0] - 1)
+        snapshot["volatility_30d"] = float(returns.std(ddof=1) * np.sqrt(TRADING_DAYS_PER_YEAR)) \
+            if len(returns) > 1 else None
+    return snapshot
+
+
+def get_snapshot(symbol: str) -> Optional[Dict[str, Any]]:
+    """
+    Get the shared market snapshot for a symbol, building it at most once per interval.
+
+    Args:
+        symbol (str): The stock symbol
+
+    Returns:
+        Optional[Dict[str, Any]]: Last price, day change, 30-day return and
+        annualized 30-day volatility, or None if there is no data
+    """
+    symbol = symbol.upper()
+    try:
+        return snapshot_cache.get(symbol, lambda: _build_snapshot(symbol))
+    except Exception as e:
+        logger.error(f"Error building market snapshot for {symbol}: {str(e)}")
+        return None
+
+
+def get_snapshot_time(symbols: List[str]) -> Optional[float]:
+    """
+    When the newest cached snapshot for any of these symbols was built.
+
+    Args:
+        symbols (List[str]): Stock symbols
+
+    Returns:
+        Optional[float]: Unix time, or None if none of them has a snapshot
+    """
+    built = []
+    for symbol in symbols:
+        try:
+            entry = snapshot_cache.backend.get(symbol.upper())
+        except Exception as e:
+            logger.debug(f"Snapshot time unavailable for {symbol}: {str(e)}")
+            continue
+        if entry is not None:
+            built.append(entry[1])
+    return max(built) if built else None
+
+
+def format_snapshot(snapshot: Dict[str, Any]) -> str:
+    parts = [f"{snapshot['symbol']}: last ${snapshot['price']:.2f}"]
+    if snapshot.get("change_percent") is not None:
+        parts[0] += f" ({snapshot['change_percent']:+.2f}% today)"
+    if snapshot.get("return_30d") is not None:
+        parts.append(f"30-day return {snapshot['return_30d'] * 100:+.1f}%")
+    if snapshot.get("volatility_30d") is not None:
+        parts.append(f"30-day volatility {snapshot['volatility_30d'] * 100:.0f}% annualized")
+    return ", ".join(parts) + f" (as of {snapshot['as_of']})"
+
+
+def get_market_context(query: str) -> str:
+    """
+    Compact market data for the tickers a question mentions.
+
+    Args:
+        query (str): The user's question
+
+    Returns:
+        str: One line per symbol with data, or an empty string
+    """
+    try:
+        lines = []
+        for symbol in detect_tickers(query):
+            snapshot = get_snapshot(symbol)
+            if snapshot is not None:
+                lines.append(format_snapshot(snapshot))
+        return "\n".join(lines)
+    except Exception as e:
+        logger.error(f"Error building market context: {str(e)}")
+        return ""
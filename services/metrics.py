@@ -0,0 +1,185 @@
+import bisect
+import math
+import threading
+from typing import Callable, Dict, List, Tuple
+
+# Default latency buckets in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelValues = Tuple[str, ...]
+
+
+class Counter:
+    """A monotonically increasing value, optionally split by labels."""
+
+    def __init__(self, name: str, description: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = tuple(str(labels.get(label, "")) for label in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        key = tuple(str(labels.get(label, "")) for label in self.labels)
+        with self._lock:
+            return self._values.get(key, 0)
+
+    def samples(self) -> Dict[LabelValues, float]:
+        with self._lock:
+            return dict(self._values)
+
+
+class Gauge:
+    """A value that can go up and down, optionally split by labels."""
+
+    def __init__(self, name: str, description: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def set(self, value: float, **labels) -> None:
+        key = tuple(str(labels.get(label, "")) for label in self.labels)
+        with self._lock:
+            self._values[key] = value
+
+    def samples(self) -> Dict[LabelValues, float]:
+        with self._lock:
+            return dict(self._values)
+
+
+class Histogram:
+    """Cumulative bucketed observations (e.g. latencies), optionally split by labels."""
+
+    def __init__(self, name: str, description: str, labels: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[LabelValues, Dict] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(str(labels.get(label, "")) for label in self.labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0}
+                self._series[key] = series
+            series["counts"][index] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def samples(self) -> Dict[LabelValues, Dict]:
+        """Return per-label series with cumulative bucket counts, sum and count."""
+        with self._lock:
+            snapshot = {key: {"counts": list(s["counts"]), "sum": s["sum"], "count": s["count"]}
+                        for key, s in self._series.items()}
+        for series in snapshot.values():
+            cumulative: List[int] = []
+            running = 0
+            for count in series["counts"]:
+                running += count
+                cumulative.append(running)
+            series["buckets"] = list(zip(self.buckets + (float("inf"),), cumulative))
+            del series["counts"]
+        return snapshot
+
+
+class Registry:
+    """Holds every metric so they can be exported together."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, description: str, labels: Tuple[str, ...] = ()) -> Counter:
+        return self._get_or_create(Counter, name, description, labels)
+
+    def gauge(self, name: str, description: str, labels: Tuple[str, ...] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, description, labels)
+
+    def histogram(self, name: str, description: str, labels: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, description, labels, buckets=buckets)
+
+    def on_collect(self, collector: Callable[[], None]) -> None:
+        """Register a callback that refreshes gauges right before each export."""
+        with self._lock:
+            self._collectors.append(collector)
+
+    def metrics(self) -> List:
+        with self._lock:
+            return list(self._metrics.values())
+
+    def render(self) -> str:
+        """
+        Export every metric in the Prometheus text exposition format (version 0.0.4).
+
+        Returns:
+            str: The exposition text
+        """
+        with self._lock:
+            collectors = list(self._collectors)
+        for collector in collectors:
+            collector()
+
+        lines: List[str] = []
+        for metric in sorted(self.metrics(), key=lambda metric: metric.name):
+            kind = {Counter: "counter", Gauge: "gauge", Histogram: "histogram"}[type(metric)]
+            lines.append(f"# HELP {metric.name} {_escape_help(metric.description)}")
+            lines.append(f"# TYPE {metric.name} {kind}")
+            for key, value in sorted(metric.samples().items()):
+                labels = list(zip(metric.labels, key))
+                if kind != "histogram":
+                    lines.append(f"{metric.name}{_format_labels(labels)} {_format_value(value)}")
+                    continue
+                for bound, count in value["buckets"]:
+                    bucket_labels = labels + [("le", _format_value(bound))]
+                    lines.append(f"{metric.name}_bucket{_format_labels(bucket_labels)} {count}")
+                lines.append(f"{metric.name}_sum{_format_labels(labels)} {_format_value(value['sum'])}")
+                lines.append(f"{metric.name}_count{_format_labels(labels)} {value['count']}")
+        return "\n".join(lines) + "\n"
+
+    def _get_or_create(self, cls, name, description, labels, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = cls(name, description, labels, **kwargs)
+                self._metrics[name] = metric
+            return metric
+
+
+def _escape_help(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: List[Tuple[str, str]]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label(value)}"' for name, value in labels) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+# Process-wide registry
+registry = Registry()
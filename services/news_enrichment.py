@@ -0,0 +1,190 @@
+import re
+import hashlib
+import logging
+from functools import lru_cache
+from itertools import combinations
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+import numpy as np
+
+from services.cache import TTLCache, InMemoryBackend
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Either a $cashtag or a plain word; one scan of the text yields both
+_TOKEN_RE = re.compile(r"\$([A-Za-z]{1,5})\b|([A-Za-z][A-Za-z']*)")
+
+# Sentiment lexicon matched on whole words, so "support" no longer counts as "up"
+_POSITIVE_WORDS = [
+    "gain", "gains", "gained", "rise", "rises", "rising", "rose", "up", "increase", "increases",
+    "increased", "profit", "profits", "profitable", "bull", "bullish", "growth", "positive",
+    "surge", "surges", "surged", "rally", "rallies", "rallied", "beat", "beats",
+]
+_NEGATIVE_WORDS = [
+    "loss", "losses", "fall", "falls", "falling", "fell", "down", "decrease", "decreases",
+    "decreased", "deficit", "bear", "bearish", "recession", "negative", "plunge", "plunges",
+    "plunged", "slump", "slumps", "slumped", "miss", "misses", "missed",
+]
+SENTIMENT_LEXICON = {**{w: 1 for w in _POSITIVE_WORDS}, **{w: -1 for w in _NEGATIVE_WORDS}}
+
+# Fingerprints within this many differing bits are treated as the same story.
+# News snippets are short, so small edits move more bits than on full pages;
+# unrelated texts differ in ~32 bits, making 7 a very safe margin.
+SIMHASH_BITS = 64
+NEAR_DUPLICATE_DISTANCE = 7
+_BIT_SHIFTS = np.arange(SIMHASH_BITS, dtype=np.uint64)
+_BIT_WEIGHTS = np.uint64(1) << _BIT_SHIFTS
+
+# Symbols users hold or watch, refreshed every few minutes
+known_symbols_cache = TTLCache(name="known-symbols", ttl=300, backend=InMemoryBackend(max_entries=1))
+
+
+@lru_cache(maxsize=65536)
+def _token_hash(token: str) -> int:
+    return int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), "little")
+
+
+def simhash(tokens: Iterable[str]) -> int:
+    """
+    64-bit SimHash fingerprint of a token sequence (weighted by frequency).
+
+    Args:
+        tokens (Iterable[str]): Normalized tokens
+
+    Returns:
+        int: Unsigned 64-bit fingerprint
+    """
+    counts: Dict[str, int] = {}
+    for token in tokens:
+        counts[token] = counts.get(token, 0) + 1
+    if not counts:
+        return 0
+
+    hashes = np.fromiter((_token_hash(t) for t in counts), dtype=np.uint64, count=len(counts))
+    weights = np.fromiter(counts.values(), dtype=np.int64, count=len(counts))
+    bits = ((hashes[:, None] >> _BIT_SHIFTS) & np.uint64(1)).astype(np.int64)
+    votes = ((bits * 2 - 1) * weights[:, None]).sum(axis=0)
+    return int(_BIT_WEIGHTS[votes > 0].sum())
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class SimHashIndex:
+    """
+    Finds fingerprints within NEAR_DUPLICATE_DISTANCE bits of each other.
+
+    Fingerprints are split into distance + 2 bit blocks. Two near duplicates
+    differ in at most `distance` blocks, so they agree exactly on at least two;
+    one lookup table per pair of blocks therefore finds every candidate while
+    keeping buckets small enough for large batches.
+    """
+
+    def __init__(self, distance: int = NEAR_DUPLICATE_DISTANCE):
+        self.distance = distance
+        blocks = distance + 2
+        bounds = [round(i * SIMHASH_BITS / blocks) for i in range(blocks + 1)]
+        self._masks = [((1 << (end - start)) - 1) << start for start, end in zip(bounds, bounds[1:])]
+        self._tables = [self._masks[a] | self._masks[b] for a, b in combinations(range(blocks), 2)]
+        self._buckets: Dict[tuple, List[int]] = {}
+
+    def find(self, fingerprint: int) -> Optional[int]:
+        """Return a stored fingerprint close to this one, if any."""
+        for table, mask in enumerate(self._tables):
+            for candidate in self._buckets.get((table, fingerprint & mask), ()):
+                if hamming_distance(candidate, fingerprint) <= self.distance:
+                    return candidate
+        return None
+
+    def add(self, fingerprint: int) -> None:
+        for table, mask in enumerate(self._tables):
+            self._buckets.setdefault((table, fingerprint & mask), []).append(fingerprint)
+
+
+def _load_known_symbols() -> Set[str]:
+    # Imported here so the pipeline can run without the app (e.g. in scripts)
+    from app import db
+    from models import Holding, WatchlistItem
+
+    symbols = {row[0] for row in db.session.query(Holding.symbol).distinct()}
+    symbols |= {row[0] for row in db.session.query(WatchlistItem.symbol).distinct()}
+    return {symbol.upper() for symbol in symbols if symbol}
+
+
+def get_known_symbols() -> Set[str]:
+    """Symbols held or watched by any user; empty outside an app context."""
+    try:
+        return known_symbols_cache.get("symbols", _load_known_symbols)
+    except Exception as e:
+        logger.debug(f"Known symbols unavailable: {str(e)}")
+        return set()
+
+
+def enrich_text(text: str, known_symbols: Optional[Set[str]] = None) -> Dict[str, Any]:
+    """
+    Extract tickers, sentiment and a near-duplicate fingerprint in one pass over the text.
+
+    Tickers are $cashtags plus upper-case words found in known_symbols.
+
+    Args:
+        text (str): Article text
+        known_symbols (Set[str], optional): Upper-case symbols to recognize without a $
+
+    Returns:
+        Dict[str, Any]: symbols (sorted list), sentiment, sentiment_score and simhash
+    """
+    known_symbols = known_symbols or set()
+    symbols = set()
+    score = 0
+    tokens = []
+
+    for match in _TOKEN_RE.finditer(text or ""):
+        cashtag, word = match.groups()
+        if cashtag:
+            symbols.add(cashtag.upper())
+            tokens.append(cashtag.lower())
+            continue
+        if len(word) > 1 and word.isupper() and word in known_symbols:
+            symbols.add(word)
+        lower = word.lower()
+        score += SENTIMENT_LEXICON.get(lower, 0)
+        tokens.append(lower)
+
+    if score > 0:
+        sentiment = "positive"
+    elif score < 0:
+        sentiment = "negative"
+    else:
+        sentiment = "neutral"
+
+    return {
+        "symbols": sorted(symbols),
+        "sentiment": sentiment,
+        "sentiment_score": score,
+        "simhash": simhash(tokens),
+    }
+
+
+def drop_near_duplicates(items: List[Dict[str, Any]], index: Optional[SimHashIndex] = None) -> List[Dict[str, Any]]:
+    """
+    Keep the first of every group of items with near-identical fingerprints.
+
+    Args:
+        items (List[Dict[str, Any]]): Items carrying a "simhash" key
+        index (SimHashIndex, optional): Previously seen fingerprints to dedupe against
+
+    Returns:
+        List[Dict[str, Any]]: Items without near duplicates, in their original order
+    """
+    index = index if index is not None else SimHashIndex()
+    unique = []
+    for item in items:
+        fingerprint = item.get("simhash")
+        if fingerprint:
+            if index.find(fingerprint) is not None:
+                continue
+            index.add(fingerprint)
+        unique.append(item)
+    return unique
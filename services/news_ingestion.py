@@ -0,0 +1,163 @@
+import os
+import time
+import logging
+import threading
+from typing import Dict, List, Optional
+
+from app import app, db
+from models import WatchlistItem
+from services.news_service import TAVILY_API_KEY, get_latest_news, search_news
+from services.news_store import ingest_news
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Scheduler settings
+NEWS_INGESTION_ENABLED = os.environ.get("NEWS_INGESTION_ENABLED", "true").lower() == "true"
+NEWS_INGESTION_INTERVAL = float(os.environ.get("NEWS_INGESTION_INTERVAL", "900"))  # Seconds between cycles
+NEWS_INGESTION_LATEST_RESULTS = int(os.environ.get("NEWS_INGESTION_LATEST_RESULTS", "20"))
+NEWS_INGESTION_SYMBOL_RESULTS = int(os.environ.get("NEWS_INGESTION_SYMBOL_RESULTS", "5"))
+NEWS_INGESTION_MAX_SYMBOLS = int(os.environ.get("NEWS_INGESTION_MAX_SYMBOLS", "25"))
+NEWS_INGESTION_RATE_PER_MINUTE = float(os.environ.get("NEWS_INGESTION_RATE_PER_MINUTE", "10"))  # Tavily calls
+NEWS_INGESTION_LOCK_FILE = os.environ.get("NEWS_INGESTION_LOCK_FILE", "/tmp/finance_news_ingestion.lock")
+
+
+class RateLimiter:
+    """Token bucket that blocks callers until a call is allowed."""
+
+    def __init__(self, rate_per_minute: float, burst: int = 1):
+        self.interval = 60.0 / rate_per_minute
+        self.capacity = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, stop_event: Optional[threading.Event] = None) -> bool:
+        """
+        Wait for a token.
+
+        Returns:
+            bool: False if stop_event was set while waiting
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) / self.interval)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) * self.interval
+            if stop_event is not None:
+                if stop_event.wait(wait):
+                    return False
+            else:
+                time.sleep(wait)
+
+
+class NewsIngestionWorker:
+    """
+    Periodically pulls latest market news and news for watched symbols into FinancialNews.
+    """
+
+    def __init__(self, interval: float = NEWS_INGESTION_INTERVAL,
+                 rate_per_minute: float = NEWS_INGESTION_RATE_PER_MINUTE):
+        self.interval = interval
+        self.rate_limiter = RateLimiter(rate_per_minute)
+        self.last_run: Optional[Dict[str, int]] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="news-ingestion", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            with app.app_context():
+                try:
+                    self.last_run = self.run_once()
+                    logger.info(f"News ingestion cycle: {self.last_run}")
+                except Exception as e:
+                    db.session.rollback()
+                    logger.error(f"Error in news ingestion cycle: {str(e)}")
+            self._stop.wait(self.interval)
+
+    def run_once(self) -> Dict[str, int]:
+        """
+        Run one ingestion cycle. Must be called inside an app context.
+
+        Returns:
+            Dict[str, int]: Totals of inserted and skipped items and symbols searched
+        """
+        totals = {"inserted": 0, "skipped": 0, "symbols": 0}
+
+        if not self.rate_limiter.acquire(self._stop):
+            return totals
+        self._add(totals, ingest_news(get_latest_news(max_results=NEWS_INGESTION_LATEST_RESULTS)))
+
+        for symbol in self._watched_symbols():
+            if not self.rate_limiter.acquire(self._stop):
+                break
+            self._add(totals, ingest_news(search_news(symbol, max_results=NEWS_INGESTION_SYMBOL_RESULTS)))
+            totals["symbols"] += 1
+
+        return totals
+
+    @staticmethod
+    def _add(totals: Dict[str, int], counts: Dict[str, int]) -> None:
+        totals["inserted"] += counts["inserted"]
+        totals["skipped"] += counts["skipped"]
+
+    @staticmethod
+    def _watched_symbols() -> List[str]:
+        """Most watched symbols first, capped per cycle to bound Tavily usage."""
+        rows = (db.session.query(WatchlistItem.symbol, db.func.count(WatchlistItem.id))
+                .group_by(WatchlistItem.symbol)
+                .order_by(db.func.count(WatchlistItem.id).desc())
+                .limit(NEWS_INGESTION_MAX_SYMBOLS)
+                .all())
+        return [symbol.upper() for symbol, _ in rows]
+
+
+news_ingestion_worker = NewsIngestionWorker()
+_lock_handle = None
+
+
+def start_news_ingestion() -> bool:
+    """
+    Start the background ingestion worker in at most one process per host.
+
+    Each gunicorn worker imports the app; a non-blocking file lock makes sure
+    only the first one polls Tavily.
+
+    Returns:
+        bool: True if this process runs the worker
+    """
+    global _lock_handle
+    if not NEWS_INGESTION_ENABLED:
+        return False
+    if not TAVILY_API_KEY:
+        logger.warning("TAVILY_API_KEY is not set; background news ingestion is disabled")
+        return False
+
+    try:
+        import fcntl
+        handle = open(NEWS_INGESTION_LOCK_FILE, "w")
+        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except ImportError:
+        handle = None  # No flock on this platform; run in every process
+    except OSError:
+        logger.info("News ingestion is running in another process")
+        return False
+
+    _lock_handle = handle  # Keep the lock for the life of the process
+    news_ingestion_worker.start()
+    logger.info(f"Started news ingestion every {NEWS_INGESTION_INTERVAL:.0f}s")
+    return True
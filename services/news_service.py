@@ -1,22 +1,176 @@
 import os
+import re
+import asyncio
 import logging
+import threading
 from datetime import datetime
 from tavily import TavilyClient
 from typing import List, Dict, Any
+from services import http_client
+from services.cache import TTLCache, make_backend
+from services.news_enrichment import enrich_text, drop_near_duplicates, get_known_symbols
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
 # Get API key from environment variable
 TAVILY_API_KEY = os.environ.get("TAVILY_API_KEY", "")
+TAVILY_HOST = "api.tavily.com"
+TAVILY_SEARCH_URL = f"https://{TAVILY_HOST}/search"
+
+# Tavily response cache settings (seconds / entries)
+TAVILY_LATEST_CACHE_TTL = float(os.environ.get("TAVILY_LATEST_CACHE_TTL", "300"))
+TAVILY_SEARCH_CACHE_TTL = float(os.environ.get("TAVILY_SEARCH_CACHE_TTL", "900"))
+TAVILY_CACHE_MAX_ENTRIES = int(os.environ.get("TAVILY_CACHE_MAX_ENTRIES", "512"))
+
+# Domains searched for financial news
+NEWS_DOMAINS = ["bloomberg.com", "cnbc.com", "reuters.com", "wsj.com",
+                "ft.com", "marketwatch.com", "investing.com", "finance.yahoo.com"]
+
+# Fields of a news item returned by the API; anything else is internal
+NEWS_RESPONSE_FIELDS = ("title", "url", "source", "published_at", "summary", "sentiment", "symbols")
+
+# Raw Tavily responses keyed by normalized query; each entry carries its own TTL
+tavily_cache = TTLCache(
+    name="tavily",
+    ttl=TAVILY_SEARCH_CACHE_TTL,
+    backend=make_backend("tavily", max_entries=TAVILY_CACHE_MAX_ENTRIES)
+)
+
+_tavily_client = None
+_tavily_client_lock = threading.Lock()
 
 # Function to get Tavily client
 def get_tavily_client():
+    global _tavily_client
     if not TAVILY_API_KEY:
         logger.warning("TAVILY_API_KEY is not set in environment variables")
         return None
     
-    return TavilyClient(api_key=TAVILY_API_KEY)
+    # One client is reused for every call
+    if _tavily_client is None:
+        with _tavily_client_lock:
+            if _tavily_client is None:
+                _tavily_client = TavilyClient(api_key=TAVILY_API_KEY)
+    return _tavily_client
+
+
+def normalize_query(query: str) -> str:
+    """Normalize a search query so trivially different spellings share a cache entry."""
+    return " ".join(re.findall(r"[\w$.&-]+", query.lower()))
+
+
+def _cached_search(tavily, query: str, max_results: int, ttl: float) -> Dict[str, Any]:
+    """Run an advanced Tavily search through the response cache."""
+    key = f"{max_results}:{normalize_query(query)}"
+    
+    def search():
+        # The SDK has its own HTTP stack, so time it for the upstream metrics here
+        with http_client.track_upstream(TAVILY_HOST):
+            return tavily.search(
+                query=query,
+                search_depth="advanced",
+                include_domains=NEWS_DOMAINS,
+                max_results=max_results
+            )
+    
+    return tavily_cache.get(key, search, ttl=ttl)
+
+async def _cached_search_async(query: str, max_results: int, ttl: float) -> Dict[str, Any]:
+    """
+    Async variant of _cached_search, sharing its cache entries.
+    
+    Posts through the pooled async HTTP client; the SDK's AsyncTavilyClient
+    opens a new connection for every call.
+    """
+    key = f"{max_results}:{normalize_query(query)}"
+    
+    async def search():
+        response = await http_client.get_async_httpx_client().post(
+            TAVILY_SEARCH_URL,
+            headers={"Authorization": f"Bearer {TAVILY_API_KEY}"},
+            json={
+                "query": query,
+                "search_depth": "advanced",
+                "include_domains": NEWS_DOMAINS,
+                "max_results": max_results
+            }
+        )
+        response.raise_for_status()
+        return response.json()
+    
+    return await tavily_cache.get_async(key, search, ttl=ttl)
+
+def _format_results(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Turn Tavily results into news items.
+    
+    Each article's text is scanned once for tickers, sentiment and a SimHash
+    fingerprint; near-duplicate articles (syndicated copies) are dropped.
+    
+    Args:
+        results (List[Dict[str, Any]]): The "results" list of a Tavily search
+    
+    Returns:
+        List[Dict[str, Any]]: News items, newest first
+    """
+    known_symbols = get_known_symbols()
+    
+    news_items = []
+    for result in results:
+        # Parse the published date
+        published_at = datetime.now()  # Default to now if not available
+        if 'published_date' in result:
+            try:
+                published_at = datetime.fromisoformat(result['published_date'])
+            except (ValueError, TypeError):
+                pass
+        
+        content = result.get('content', '')
+        enrichment = enrich_text(f"{result.get('title', '')}\n{content}", known_symbols)
+        
+        news_items.append({
+            "title": result['title'],
+            "url": result['url'],
+            "source": result.get('source', 'Unknown'),
+            "published_at": published_at,
+            "summary": content[:300] + '...' if 'content' in result else '',
+            "sentiment": enrichment['sentiment'],
+            "symbols": enrichment['symbols'],
+            "simhash": enrichment['simhash']
+        })
+    
+    news_items = drop_near_duplicates(news_items)
+    
+    # Sort by published date (newest first)
+    news_items.sort(key=lambda x: x['published_at'], reverse=True)
+    
+    return news_items
+
+
+def news_for_response(news_items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Shape news items for an API response.
+    
+    Items from Tavily and from the local store come out the same way: only
+    the public fields are kept (internal ones such as the 64-bit simhash,
+    which JavaScript can't represent exactly, are dropped) and published_at
+    is an ISO 8601 string.
+    
+    Args:
+        news_items (List[Dict[str, Any]]): News items from either source
+    
+    Returns:
+        List[Dict[str, Any]]: JSON-ready news items
+    """
+    shaped = []
+    for news in news_items:
+        item = {field: news.get(field) for field in NEWS_RESPONSE_FIELDS if field in news}
+        if isinstance(item.get('published_at'), datetime):
+            item['published_at'] = item['published_at'].isoformat()
+        shaped.append(item)
+    return shaped
+
 
 def get_latest_news(max_results: int = 10) -> List[Dict[str, Any]]:
     """
@@ -41,65 +195,10 @@ def get_latest_news(max_results: int = 10) -> List[Dict[str, Any]]:
                      "published_at": datetime.now(), "summary": "API key not configured"}]
                      
         # Query for financial news
-        search_results = tavily.search(
-            query="latest financial news stock market",
-            search_depth="advanced",
-            include_domains=["bloomberg.com", "cnbc.com", "reuters.com", "wsj.com", 
-                              "ft.com", "marketwatch.com", "investing.com", "finance.yahoo.com"],
-            max_results=max_results
-        )
-        
-        # Process and format results
-        news_items = []
-        for result in search_results['results']:
-            # Parse the published date
-            published_at = datetime.now()  # Default to now if not available
-            if 'published_date' in result:
-                try:
-                    published_at = datetime.fromisoformat(result['published_date'])
-                except (ValueError, TypeError):
-                    pass
-            
-            # Extract stock symbols from content if available
-            symbols = []
-            if 'content' in result:
-                # Simple regex-like check for ticker symbols
-                content = result['content']
-                words = content.split()
-                for word in words:
-                    if word.startswith('$') and len(word) > 1 and word[1:].isalpha():
-                        symbols.append(word[1:])
-            
-            # Calculate simple sentiment
-            sentiment = "neutral"
-            positive_words = ["gain", "rise", "up", "increase", "profit", "bull", "growth", "positive"]
-            negative_words = ["loss", "fall", "down", "decrease", "deficit", "bear", "recession", "negative"]
-            
-            if 'content' in result:
-                content_lower = result['content'].lower()
-                positive_count = sum(1 for word in positive_words if word in content_lower)
-                negative_count = sum(1 for word in negative_words if word in content_lower)
-                
-                if positive_count > negative_count:
-                    sentiment = "positive"
-                elif negative_count > positive_count:
-                    sentiment = "negative"
-            
-            # Add to news items
-            news_items.append({
-                "title": result['title'],
-                "url": result['url'],
-                "source": result.get('source', 'Unknown'),
-                "published_at": published_at,
-                "summary": result.get('content', '')[:300] + '...' if 'content' in result else '',
-                "sentiment": sentiment,
-                "symbols": list(set(symbols))  # Remove duplicates
-            })
-        
-        # Sort by published date (newest first)
-        news_items.sort(key=lambda x: x['published_at'], reverse=True)
+        search_results = _cached_search(tavily, "latest financial news stock market", max_results,
+                                        ttl=TAVILY_LATEST_CACHE_TTL)
         
-        return news_items
+        return _format_results(search_results['results'])
     
     except Exception as e:
         logger.error(f"Error fetching news from Tavily: {str(e)}")
@@ -134,65 +233,67 @@ def search_news(query: str, max_results: int = 10) -> List[Dict[str, Any]]:
                      "published_at": datetime.now(), "summary": "API key not configured"}]
         
         # Query for financial news
-        search_results = tavily.search(
-            query=financial_query,
-            search_depth="advanced",
-            include_domains=["bloomberg.com", "cnbc.com", "reuters.com", "wsj.com", 
-                              "ft.com", "marketwatch.com", "investing.com", "finance.yahoo.com"],
-            max_results=max_results
-        )
+        search_results = _cached_search(tavily, financial_query, max_results,
+                                        ttl=TAVILY_SEARCH_CACHE_TTL)
         
-        # Process and format results
-        news_items = []
-        for result in search_results['results']:
-            # Parse the published date
-            published_at = datetime.now()  # Default to now if not available
-            if 'published_date' in result:
-                try:
-                    published_at = datetime.fromisoformat(result['published_date'])
-                except (ValueError, TypeError):
-                    pass
-            
-            # Extract stock symbols from content if available
-            symbols = []
-            if 'content' in result:
-                # Simple regex-like check for ticker symbols
-                content = result['content']
-                words = content.split()
-                for word in words:
-                    if word.startswith('$') and len(word) > 1 and word[1:].isalpha():
-                        symbols.append(word[1:])
-            
-            # Calculate simple sentiment
-            sentiment = "neutral"
-            positive_words = ["gain", "rise", "up", "increase", "profit", "bull", "growth", "positive"]
-            negative_words = ["loss", "fall", "down", "decrease", "deficit", "bear", "recession", "negative"]
-            
-            if 'content' in result:
-                content_lower = result['content'].lower()
-                positive_count = sum(1 for word in positive_words if word in content_lower)
-                negative_count = sum(1 for word in negative_words if word in content_lower)
-                
-                if positive_count > negative_count:
-                    sentiment = "positive"
-                elif negative_count > positive_count:
-                    sentiment = "negative"
-            
-            # Add to news items
-            news_items.append({
-                "title": result['title'],
-                "url": result['url'],
-                "source": result.get('source', 'Unknown'),
-                "published_at": published_at,
-                "summary": result.get('content', '')[:300] + '...' if 'content' in result else '',
-                "sentiment": sentiment,
-                "symbols": list(set(symbols))  # Remove duplicates
-            })
+        return _format_results(search_results['results'])
+    
+    except Exception as e:
+        logger.error(f"Error searching news from Tavily: {str(e)}")
+        return [{"title": f"Error: {str(e)}", "url": "#", "source": "System", 
+                 "published_at": datetime.now(), "summary": "An error occurred while searching for financial news."}]
+
+
+async def get_latest_news_async(max_results: int = 10) -> List[Dict[str, Any]]:
+    """
+    Async variant of get_latest_news.
+    
+    Args:
+        max_results (int, optional): Maximum number of news items to return. Defaults to 10.
+    
+    Returns:
+        List[Dict[str, Any]]: List of news items with title, url, source, published_at, and summary.
+    """
+    try:
+        if not TAVILY_API_KEY:
+            logger.error("TAVILY_API_KEY is not set in environment variables")
+            return [{"title": "Error", "url": "#", "source": "System", 
+                     "published_at": datetime.now(), "summary": "API key not configured"}]
         
-        # Sort by published date (newest first)
-        news_items.sort(key=lambda x: x['published_at'], reverse=True)
+        search_results = await _cached_search_async("latest financial news stock market", max_results,
+                                                    ttl=TAVILY_LATEST_CACHE_TTL)
+        
+        # Known symbols may be read from the database; format off the event loop
+        return await asyncio.to_thread(_format_results, search_results['results'])
+    
+    except Exception as e:
+        logger.error(f"Error fetching news from Tavily: {str(e)}")
+        return [{"title": f"Error: {str(e)}", "url": "#", "source": "System", 
+                 "published_at": datetime.now(), "summary": "An error occurred while fetching financial news."}]
+
+
+async def search_news_async(query: str, max_results: int = 10) -> List[Dict[str, Any]]:
+    """
+    Async variant of search_news.
+    
+    Args:
+        query (str): The search query.
+        max_results (int, optional): Maximum number of news items to return. Defaults to 10.
+    
+    Returns:
+        List[Dict[str, Any]]: List of news items with title, url, source, published_at, and summary.
+    """
+    try:
+        if not TAVILY_API_KEY:
+            logger.error("TAVILY_API_KEY is not set in environment variables")
+            return [{"title": "Error", "url": "#", "source": "System", 
+                     "published_at": datetime.now(), "summary": "API key not configured"}]
+        
+        # Add financial context to the query
+        search_results = await _cached_search_async(f"{query} financial news stock market", max_results,
+                                                    ttl=TAVILY_SEARCH_CACHE_TTL)
         
-        return news_items
+        return await asyncio.to_thread(_format_results, search_results['results'])
     
     except Exception as e:
         logger.error(f"Error searching news from Tavily: {str(e)}")
@@ -0,0 +1,243 @@
+import re
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import insert, select, text
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app import app, db
+from models import FinancialNews, NewsSymbol
+from services.news_enrichment import SimHashIndex
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Ingestion runs on a single background thread so requests never wait on writes
+_ingest_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="news-ingest")
+
+# How far back stored news is checked for near duplicates of new items
+NEWS_DEDUPE_DAYS = 3
+
+# Dialects with INSERT ... ON CONFLICT DO NOTHING support
+_UPSERT_DIALECTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+
+def _to_signed(fingerprint: int) -> int:
+    return fingerprint - (1 << 64) if fingerprint >= (1 << 63) else fingerprint
+
+
+def _to_unsigned(fingerprint: int) -> int:
+    return fingerprint + (1 << 64) if fingerprint < 0 else fingerprint
+
+
+def _recent_fingerprints() -> SimHashIndex:
+    """Index of SimHashes of recently stored news."""
+    index = SimHashIndex()
+    since = datetime.now() - timedelta(days=NEWS_DEDUPE_DAYS)
+    for (fingerprint,) in db.session.query(FinancialNews.simhash).filter(
+            FinancialNews.published_at >= since, FinancialNews.simhash.isnot(None)):
+        index.add(_to_unsigned(fingerprint))
+    return index
+
+
+def _prepare_rows(news_items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Turn service news items into FinancialNews rows, dropping placeholders and duplicates."""
+    fingerprints = None
+    rows = {}
+    for news in news_items:
+        url = news.get("url")
+        if not url or url == "#" or url in rows:
+            continue
+        fingerprint = news.get("simhash")
+        if fingerprint:
+            # Same story under a different URL (e.g. syndicated copies)
+            if fingerprints is None:
+                fingerprints = _recent_fingerprints()
+            if fingerprints.find(fingerprint) is not None:
+                continue
+            fingerprints.add(fingerprint)
+        symbols = news.get("symbols", []) if isinstance(news.get("symbols", []), list) else []
+        symbols = sorted({symbol.upper()[:10] for symbol in symbols if symbol})
+        rows[url] = {
+            "title": (news.get("title") or "")[:256],
+            "url": url[:512],
+            "source": (news.get("source") or "Unknown")[:128],
+            "published_at": news.get("published_at") or datetime.now(),
+            "summary": news.get("summary", ""),
+            "sentiment": news.get("sentiment", "neutral"),
+            "symbols": ",".join(symbols)[:256],
+            "simhash": _to_signed(fingerprint) if fingerprint else None,
+        }
+    return list(rows.values())
+
+
+def ingest_news(news_items: List[Dict[str, Any]]) -> Dict[str, int]:
+    """
+    Store news items, skipping any whose URL is already stored.
+
+    Uses INSERT ... ON CONFLICT DO NOTHING on SQLite and PostgreSQL, so
+    concurrent ingestions can't insert duplicates; other databases dedupe
+    against existing URLs with a single lookup query. Items whose SimHash is
+    close to recently stored news are skipped as near duplicates.
+
+    Args:
+        news_items (List[Dict[str, Any]]): Items as returned by news_service
+
+    Returns:
+        Dict[str, int]: Number of items inserted and skipped
+    """
+    rows = _prepare_rows(news_items)
+    if not rows:
+        return {"inserted": 0, "skipped": len(news_items)}
+
+    try:
+        dialect_insert = _UPSERT_DIALECTS.get(db.engine.dialect.name)
+        if dialect_insert is not None:
+            statement = (dialect_insert(FinancialNews)
+                         .values(rows)
+                         .on_conflict_do_nothing(index_elements=["url"])
+                         .returning(FinancialNews.id, FinancialNews.url))
+            inserted = {url: news_id for news_id, url in db.session.execute(statement)}
+        else:
+            existing = set(db.session.scalars(
+                select(FinancialNews.url).where(FinancialNews.url.in_([row["url"] for row in rows]))
+            ))
+            new_rows = [row for row in rows if row["url"] not in existing]
+            inserted = {}
+            if new_rows:
+                result = db.session.execute(insert(FinancialNews).returning(FinancialNews.id, FinancialNews.url), new_rows)
+                inserted = {url: news_id for news_id, url in result}
+
+        links = [
+            {"news_id": inserted[row["url"]], "symbol": symbol}
+            for row in rows if row["url"] in inserted
+            for symbol in row["symbols"].split(",") if symbol
+        ]
+        if links:
+            db.session.execute(insert(NewsSymbol), links)
+
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return {"inserted": len(inserted), "skipped": len(news_items) - len(inserted)}
+
+
+def get_stored_news(limit: int = 10, symbol: str = None) -> List[Dict[str, Any]]:
+    """
+    Read the most recent stored news items.
+
+    Args:
+        limit (int): Maximum number of items to return
+        symbol (str, optional): Only return news mentioning this symbol
+
+    Returns:
+        List[Dict[str, Any]]: News items, newest first, in the news_service format
+    """
+    query = FinancialNews.query
+    if symbol:
+        query = query.join(NewsSymbol).filter(NewsSymbol.symbol == symbol.upper())
+    rows = query.order_by(FinancialNews.published_at.desc()).limit(limit).all()
+    return [row.to_dict() for row in rows]
+
+
+def _search_terms(query: str) -> List[str]:
+    return re.findall(r"\w+", query.lower())
+
+
+def _fts_available() -> bool:
+    if db.engine.dialect.name == "postgresql":
+        return True
+    if db.engine.dialect.name != "sqlite":
+        return False
+    return db.session.execute(text(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'financial_news_fts'"
+    )).first() is not None
+
+
+def search_stored_news(query: str, limit: int = 10, symbol: Optional[str] = None,
+                       since: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    """
+    Full-text search over stored news titles and summaries.
+
+    Ranks with BM25 on SQLite (FTS5, titles weighted double) and ts_rank_cd on
+    PostgreSQL; every query term must match. Falls back to LIKE matching when
+    no full-text index is available.
+
+    Args:
+        query (str): Free-text search query
+        limit (int): Maximum number of items to return
+        symbol (str, optional): Only return news mentioning this symbol
+        since (datetime, optional): Only return news published at or after this time
+
+    Returns:
+        List[Dict[str, Any]]: Matching news items, best match first
+    """
+    terms = _search_terms(query)
+    if not terms:
+        return []
+
+    params: Dict[str, Any] = {"limit": limit}
+    filters = []
+    if symbol:
+        filters.append("EXISTS (SELECT 1 FROM news_symbol s WHERE s.news_id = n.id AND s.symbol = :symbol)")
+        params["symbol"] = symbol.upper()
+    if since:
+        filters.append("n.published_at >= :since")
+        params["since"] = since
+
+    dialect = db.engine.dialect.name
+    if _fts_available() and dialect == "sqlite":
+        params["match"] = " ".join(f'"{term}"' for term in terms)
+        sql = ("SELECT n.id FROM financial_news_fts f JOIN financial_news n ON n.id = f.rowid "
+               "WHERE financial_news_fts MATCH :match")
+        order = "bm25(financial_news_fts, 2.0, 1.0)"
+    elif dialect == "postgresql":
+        params["match"] = " ".join(terms)
+        document = "to_tsvector('english', coalesce(n.title, '') || ' ' || coalesce(n.summary, ''))"
+        sql = f"SELECT n.id FROM financial_news n WHERE {document} @@ plainto_tsquery('english', :match)"
+        order = f"ts_rank_cd({document}, plainto_tsquery('english', :match)) DESC"
+    else:
+        conditions = []
+        for i, term in enumerate(terms):
+            params[f"term{i}"] = f"%{term}%"
+            conditions.append(f"(LOWER(n.title) LIKE :term{i} OR LOWER(n.summary) LIKE :term{i})")
+        sql = "SELECT n.id FROM financial_news n WHERE " + " AND ".join(conditions)
+        order = "n.published_at DESC"
+
+    for condition in filters:
+        sql += f" AND {condition}"
+    sql += f" ORDER BY {order}, n.published_at DESC LIMIT :limit"
+
+    ids = [row[0] for row in db.session.execute(text(sql), params)]
+    if not ids:
+        return []
+    rows = {row.id: row for row in FinancialNews.query.filter(FinancialNews.id.in_(ids))}
+    return [rows[news_id].to_dict() for news_id in ids if news_id in rows]
+
+
+def _ingest_in_background(news_items: List[Dict[str, Any]]) -> Dict[str, int]:
+    with app.app_context():
+        try:
+            counts = ingest_news(news_items)
+            logger.info(f"Ingested news: {counts['inserted']} inserted, {counts['skipped']} skipped")
+            return counts
+        except Exception as e:
+            logger.error(f"Error ingesting news: {str(e)}")
+            raise
+
+
+def submit_news_ingestion(news_items: List[Dict[str, Any]]) -> Future:
+    """
+    Queue news items for storage on the background ingestion thread.
+
+    Args:
+        news_items (List[Dict[str, Any]]): Items as returned by news_service
+
+    Returns:
+        Future: Resolves to the inserted/skipped counts
+    """
+    return _ingest_executor.submit(_ingest_in_background, list(news_items))
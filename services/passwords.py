@@ -0,0 +1,25 @@
+import os
+from functools import lru_cache
+
+from werkzeug.security import generate_password_hash
+
+# Werkzeug hash method for new and upgraded passwords, e.g. "scrypt",
+# "scrypt:16384:8:1" or "pbkdf2:sha256:600000". Stored hashes made with any
+# other method are replaced at the user's next successful login.
+PASSWORD_HASH_METHOD = os.environ.get("PASSWORD_HASH_METHOD", "scrypt")
+
+
+@lru_cache(maxsize=1)
+def _policy_method() -> str:
+    """The full method string werkzeug stores for the policy, with its default parameters filled in."""
+    return generate_password_hash("", method=PASSWORD_HASH_METHOD).split("$", 1)[0]
+
+
+def hash_password(password: str) -> str:
+    """Hash a password with the configured policy."""
+    return generate_password_hash(password, method=PASSWORD_HASH_METHOD)
+
+
+def needs_rehash(password_hash: str) -> bool:
+    """Whether a stored hash was made with a different method or cost than the policy."""
+    return password_hash.split("$", 1)[0] != _policy_method()
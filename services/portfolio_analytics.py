@@ -0,0 +1,175 @@
+import logging
+from typing import Any, Dict, List
+
+import numpy as np
+
+from services.data_access import get_user_portfolios
+from services.financial_service import get_stock_data_batch
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+
+def _to_json(value: float):
+    """Convert a NumPy scalar to a JSON-friendly float, mapping NaN to None."""
+    value = float(value)
+    return None if np.isnan(value) else value
+
+
+def _quote_value(quote: Dict[str, Any], field: str) -> float:
+    """A quote field as a float, NaN when the quote failed (its placeholder zeros aren't prices)."""
+    if "error" in quote:
+        return np.nan
+    value = quote.get(field)
+    return np.nan if value is None else float(value)
+
+
+def _safe_divide(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        result = numerator / denominator
+    result[~np.isfinite(result)] = np.nan
+    return result
+
+
+def value_holdings(portfolio_index: np.ndarray, quantities: np.ndarray, purchase_prices: np.ndarray,
+                   prices: np.ndarray, changes: np.ndarray, portfolio_count: int) -> Dict[str, np.ndarray]:
+    """
+    Value a set of holdings and roll them up per portfolio.
+
+    All inputs are aligned per holding; purchase_prices may contain NaN for
+    holdings without a known cost, which are then left out of cost basis and P&L.
+    prices is NaN for holdings without a usable quote; those get NaN value and
+    P&L and are left out of every portfolio total.
+
+    Args:
+        portfolio_index (np.ndarray): Position of each holding's portfolio (0..portfolio_count-1)
+        quantities (np.ndarray): Share counts
+        purchase_prices (np.ndarray): Purchase price per share (NaN if unknown)
+        prices (np.ndarray): Current price per share (NaN if unavailable)
+        changes (np.ndarray): Price change since previous close per share
+        portfolio_count (int): Number of portfolios
+
+    Returns:
+        Dict[str, np.ndarray]: Per-holding arrays (market_value, cost_basis, profit_loss,
+        return_percent, day_change, weight) and per-portfolio arrays prefixed "portfolio_",
+        including portfolio_unpriced (holdings left out for lack of a price)
+    """
+    market_value = quantities * prices
+    cost_basis = quantities * purchase_prices
+    profit_loss = market_value - cost_basis
+    day_change = quantities * changes
+    priced = ~np.isnan(market_value)
+    has_pnl = priced & ~np.isnan(cost_basis)
+
+    def rollup(values):
+        return np.bincount(portfolio_index, weights=values, minlength=portfolio_count)
+
+    portfolio_value = rollup(np.where(priced, market_value, 0.0))
+    portfolio_cost = rollup(np.where(has_pnl, cost_basis, 0.0))
+    portfolio_pnl = rollup(np.where(has_pnl, profit_loss, 0.0))
+    portfolio_day_change = rollup(np.where(np.isnan(day_change), 0.0, day_change))
+    portfolio_unpriced = rollup((~priced).astype(float))
+
+    return {
+        "market_value": market_value,
+        "cost_basis": cost_basis,
+        "profit_loss": profit_loss,
+        "return_percent": _safe_divide(profit_loss, cost_basis) * 100,
+        "day_change": day_change,
+        "weight": _safe_divide(market_value, portfolio_value[portfolio_index]),
+        "portfolio_market_value": portfolio_value,
+        "portfolio_cost_basis": portfolio_cost,
+        "portfolio_profit_loss": portfolio_pnl,
+        "portfolio_day_change": portfolio_day_change,
+        "portfolio_unpriced": portfolio_unpriced,
+    }
+
+
+def _summary(market_value, cost_basis, profit_loss, day_change, unpriced) -> Dict[str, Any]:
+    previous_value = market_value - day_change
+    return {
+        "unpriced_holdings": int(unpriced),
+        "market_value": _to_json(market_value),
+        "cost_basis": _to_json(cost_basis),
+        "profit_loss": _to_json(profit_loss),
+        "return_percent": _to_json(profit_loss / cost_basis * 100) if cost_basis else None,
+        "day_change": _to_json(day_change),
+        "day_change_percent": _to_json(day_change / previous_value * 100) if previous_value else None,
+    }
+
+
+def get_portfolio_report(user_id: int) -> Dict[str, Any]:
+    """
+    Value every portfolio a user owns.
+
+    Loads the user's portfolios and all of their holdings in two queries,
+    fetches quotes for the distinct symbols in one batch and computes the
+    valuation with vectorized NumPy operations. Holdings whose quote failed
+    carry the quote's error in price_error, report null price, value and P&L,
+    and are counted in unpriced_holdings instead of the totals.
+
+    Args:
+        user_id (int): The user whose portfolios to value
+
+    Returns:
+        Dict[str, Any]: "portfolios" (each with holdings and a summary) and "totals"
+    """
+    portfolios = get_user_portfolios(user_id)
+    rows = [holding for portfolio in portfolios for holding in portfolio.holdings]
+
+    position = {portfolio.id: i for i, portfolio in enumerate(portfolios)}
+    symbols = [row.symbol.upper() for row in rows]
+    quotes = get_stock_data_batch(symbols)
+
+    portfolio_index = np.fromiter((position[row.portfolio_id] for row in rows), dtype=np.intp, count=len(rows))
+    quantities = np.fromiter((row.quantity or 0.0 for row in rows), dtype=float, count=len(rows))
+    purchase_prices = np.fromiter(
+        (np.nan if row.purchase_price is None else row.purchase_price for row in rows), dtype=float, count=len(rows))
+    prices = np.fromiter((_quote_value(quotes[s], "price") for s in symbols), dtype=float, count=len(rows))
+    changes = np.fromiter((_quote_value(quotes[s], "change") for s in symbols), dtype=float, count=len(rows))
+
+    valuation = value_holdings(portfolio_index, quantities, purchase_prices, prices, changes, len(portfolios))
+
+    holdings_by_portfolio: List[List[Dict[str, Any]]] = [[] for _ in portfolios]
+    for i, row in enumerate(rows):
+        holdings_by_portfolio[portfolio_index[i]].append({
+            "id": row.id,
+            "symbol": row.symbol,
+            "quantity": row.quantity,
+            "purchase_price": row.purchase_price,
+            "current_price": _to_json(prices[i]),
+            "value": _to_json(valuation["market_value"][i]),
+            "cost_basis": _to_json(valuation["cost_basis"][i]),
+            "profit_loss": _to_json(valuation["profit_loss"][i]),
+            "return_percent": _to_json(valuation["return_percent"][i]),
+            "day_change": _to_json(valuation["day_change"][i]),
+            "weight": _to_json(valuation["weight"][i]),
+            "price_error": quotes[symbols[i]].get("error"),
+        })
+
+    result = []
+    for i, portfolio in enumerate(portfolios):
+        result.append({
+            "id": portfolio.id,
+            "name": portfolio.name,
+            "description": portfolio.description,
+            "holdings": holdings_by_portfolio[i],
+            "summary": _summary(
+                valuation["portfolio_market_value"][i],
+                valuation["portfolio_cost_basis"][i],
+                valuation["portfolio_profit_loss"][i],
+                valuation["portfolio_day_change"][i],
+                valuation["portfolio_unpriced"][i]
+            ),
+        })
+
+    totals = _summary(
+        valuation["portfolio_market_value"].sum(),
+        valuation["portfolio_cost_basis"].sum(),
+        valuation["portfolio_profit_loss"].sum(),
+        valuation["portfolio_day_change"].sum(),
+        valuation["portfolio_unpriced"].sum()
+    )
+    totals["holdings"] = len(rows)
+
+    return {"portfolios": result, "totals": totals}
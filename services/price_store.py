@@ -0,0 +1,169 @@
+import os
+import time
+import logging
+import threading
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from models import PriceBar
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Bars returned by Alpha Vantage's compact output size
+COMPACT_BARS = 100
+
+# Minimum seconds between upstream syncs of one symbol at the same depth
+# (covers holidays and symbols whose history is shorter than requested)
+PRICE_SYNC_INTERVAL = float(os.environ.get("PRICE_SYNC_INTERVAL", "3600"))
+
+# Per symbol: when it was last synced and how many trailing bars that sync
+# covered (compact fetches cover COMPACT_BARS, full fetches all history)
+_last_sync: Dict[str, Tuple[float, float]] = {}
+_sync_locks: Dict[str, threading.Lock] = {}
+_locks_guard = threading.Lock()
+
+# Fetches raw bars for (symbol, outputsize); returns dicts with a "date" string
+Fetcher = Callable[[str, str], List[Dict[str, Any]]]
+
+
+def _previous_weekday(day: date) -> date:
+    day -= timedelta(days=1)
+    while day.weekday() >= 5:
+        day -= timedelta(days=1)
+    return day
+
+
+def _symbol_lock(symbol: str) -> threading.Lock:
+    with _locks_guard:
+        lock = _sync_locks.get(symbol)
+        if lock is None:
+            lock = threading.Lock()
+            _sync_locks[symbol] = lock
+        return lock
+
+
+def ensure_history(symbol: str, days: int, fetch: Fetcher) -> None:
+    """
+    Make sure the store holds the last `days` daily bars for a symbol.
+
+    Only goes upstream when the newest stored bar is older than the previous
+    trading day or fewer than `days` bars are stored, and then only writes the
+    bars that are missing. The compact output size is used whenever it covers
+    the gap. A symbol isn't re-synced within PRICE_SYNC_INTERVAL unless the
+    request reaches deeper than the last sync did, so a compact sync doesn't
+    hold back a later request for a longer history.
+
+    Args:
+        symbol (str): The stock symbol
+        days (int): Number of trailing daily bars needed
+        fetch (Fetcher): Downloads bars for (symbol, outputsize)
+    """
+    with _symbol_lock(symbol):
+        synced_at, synced_depth = _last_sync.get(symbol, (0.0, 0))
+        if time.time() - synced_at < PRICE_SYNC_INTERVAL and synced_depth >= days:
+            return
+
+        latest, count = db.session.query(
+            func.max(PriceBar.date), func.count(PriceBar.id)
+        ).filter(PriceBar.symbol == symbol).one()
+
+        today = date.today()
+        is_stale = latest is None or latest < _previous_weekday(today)
+        needs_older = count < days
+        if not is_stale and not needs_older:
+            return
+
+        # Weekdays since the newest stored bar approximate the trading-day gap
+        gap = days if latest is None else int((today - latest).days * 5 / 7) + 1
+        outputsize = "compact" if max(gap, days if needs_older else 0) <= COMPACT_BARS else "full"
+
+        bars = fetch(symbol, outputsize)
+        if not bars:
+            # Rate limited or an "Information" reply; keep the last sync so the next request retries
+            return
+        store_bars(symbol, bars)
+        _last_sync[symbol] = (time.time(), COMPACT_BARS if outputsize == "compact" else float("inf"))
+
+
+def store_bars(symbol: str, bars: List[Dict[str, Any]]) -> int:
+    """
+    Insert bars that aren't stored yet and refresh the newest stored bar.
+
+    Args:
+        symbol (str): The stock symbol
+        bars (List[Dict[str, Any]]): Bars with date (YYYY-MM-DD), open, high, low, close, volume
+
+    Returns:
+        int: Number of bars inserted
+    """
+    parsed = {}
+    for bar in bars:
+        bar_date = datetime.strptime(bar["date"], "%Y-%m-%d").date()
+        parsed[bar_date] = bar
+    if not parsed:
+        return 0
+
+    existing = {
+        row.date: row for row in PriceBar.query.filter(
+            PriceBar.symbol == symbol,
+            PriceBar.date >= min(parsed)
+        ).all()
+    }
+    latest_stored = max(existing) if existing else None
+
+    inserted = 0
+    for bar_date, bar in parsed.items():
+        row = existing.get(bar_date)
+        if row is None:
+            row = PriceBar(symbol=symbol, date=bar_date)
+            db.session.add(row)
+            inserted += 1
+        elif bar_date != latest_stored:
+            # Settled bars don't change; only the newest one may have been partial
+            continue
+        row.open = bar["open"]
+        row.high = bar["high"]
+        row.low = bar["low"]
+        row.close = bar["close"]
+        row.volume = bar["volume"]
+
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Another worker stored the same bars first
+        db.session.rollback()
+        logger.info(f"Concurrent price history sync for {symbol}, keeping existing bars")
+        return 0
+
+    return inserted
+
+
+def get_bars(symbol: str, start: Optional[date] = None, end: Optional[date] = None,
+             limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Read stored daily bars for a symbol, newest first.
+
+    Args:
+        symbol (str): The stock symbol
+        start (date, optional): Earliest bar date to include
+        end (date, optional): Latest bar date to include
+        limit (int, optional): Maximum number of bars to return
+
+    Returns:
+        List[Dict[str, Any]]: Daily bars with date, open, high, low, close and volume
+    """
+    query = PriceBar.query.filter(PriceBar.symbol == symbol)
+    if start is not None:
+        query = query.filter(PriceBar.date >= start)
+    if end is not None:
+        query = query.filter(PriceBar.date <= end)
+    query = query.order_by(PriceBar.date.desc())
+    if limit is not None:
+        query = query.limit(limit)
+
+    return [bar.to_dict() for bar in query.all()]
@@ -0,0 +1,209 @@
+import os
+import sys
+import time
+import asyncio
+import logging
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Iterator, Optional
+
+from flask import g, request
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Flask endpoints (e.g. "portfolios,get_news,ai_analysis") and background
+# tasks ("ai_analysis_job") to profile; empty disables route profiling
+PROFILE_ENDPOINTS = {name.strip() for name in os.environ.get("PROFILE_ENDPOINTS", "").split(",") if name.strip()}
+# Requests sending this value in the X-Profile header are profiled whatever their route; empty disables it
+PROFILE_TOKEN = os.environ.get("PROFILE_TOKEN", "")
+PROFILE_HEADER = "X-Profile"
+PROFILE_THRESHOLD = float(os.environ.get("PROFILE_THRESHOLD_MS", "500")) / 1000  # Only slower runs are written
+PROFILE_INTERVAL = float(os.environ.get("PROFILE_INTERVAL_MS", "5")) / 1000  # Seconds between samples
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "profiles")
+PROFILE_MAX_FILES = int(os.environ.get("PROFILE_MAX_FILES", "200"))
+
+_SITE_DIRS = tuple(sorted({os.path.dirname(os.path.dirname(os.__file__))} |
+                          {path for path in sys.path if path.endswith("-packages")}, key=len, reverse=True))
+
+
+@lru_cache(maxsize=4096)
+def _short_path(filename: str) -> str:
+    for prefix in _SITE_DIRS + (os.getcwd(),):
+        if filename.startswith(prefix + os.sep):
+            return filename[len(prefix) + 1:]
+    return filename
+
+
+def _collapse(frame) -> str:
+    """One stack, root first, in the collapsed format flamegraph.pl and speedscope read."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_qualname} ({_short_path(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class ProfileSession:
+    """Stack samples taken from one thread while it runs one request or task."""
+
+    def __init__(self, name: str, thread_id: int, force: bool = False):
+        self.name = name
+        self.thread_id = thread_id
+        self.force = force
+        self.started = time.perf_counter()
+        self.samples: Counter = Counter()
+
+
+class SamplingProfiler:
+    """
+    Samples the Python stacks of threads that are being profiled.
+
+    While at least one session is open, a background thread reads every
+    profiled thread's current stack each interval; with no open sessions
+    the thread exits, so profiling costs nothing when nobody uses it.
+    Sessions that ran longer than the threshold (or were forced) are
+    written as collapsed stacks, one "frame;frame;frame count" line per
+    distinct stack, ready for flamegraph.pl or speedscope.
+    """
+
+    def __init__(self, interval: float = PROFILE_INTERVAL, threshold: float = PROFILE_THRESHOLD,
+                 output_dir: str = PROFILE_DIR, max_files: int = PROFILE_MAX_FILES):
+        self.interval = interval
+        self.threshold = threshold
+        self.output_dir = output_dir
+        self.max_files = max_files
+        self._sessions: Dict[int, ProfileSession] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, name: str, force: bool = False) -> ProfileSession:
+        """
+        Start sampling the calling thread.
+
+        Args:
+            name (str): Label for the output file, e.g. the endpoint
+            force (bool): Write the profile even if it ends under the threshold
+
+        Returns:
+            ProfileSession: Pass it to stop()
+        """
+        session = ProfileSession(name, threading.get_ident(), force)
+        with self._lock:
+            self._sessions[session.thread_id] = session
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+                self._thread.start()
+        return session
+
+    def stop(self, session: ProfileSession) -> Optional[str]:
+        """
+        Stop sampling and write the profile if it qualifies.
+
+        Returns:
+            Optional[str]: The file written, or None
+        """
+        with self._lock:
+            if self._sessions.get(session.thread_id) is session:
+                del self._sessions[session.thread_id]
+        elapsed = time.perf_counter() - session.started
+        if not session.samples or (not session.force and elapsed < self.threshold):
+            return None
+        try:
+            return self._write(session, elapsed)
+        except OSError as e:
+            logger.error(f"Could not write profile for {session.name}: {str(e)}")
+            return None
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                if not self._sessions:
+                    self._thread = None
+                    return
+                sessions = list(self._sessions.values())
+            frames = sys._current_frames()
+            stacks = [(session, _collapse(frames[session.thread_id]))
+                      for session in sessions if session.thread_id in frames]
+            del frames
+            with self._lock:
+                for session, stack in stacks:
+                    # stop() may have ended the session meanwhile and be writing its samples
+                    if self._sessions.get(session.thread_id) is session:
+                        session.samples[stack] += 1
+            time.sleep(self.interval)
+
+    def _write(self, session: ProfileSession, elapsed: float) -> str:
+        os.makedirs(self.output_dir, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        path = os.path.join(self.output_dir, f"{stamp}-{session.name}-{elapsed * 1000:.0f}ms.folded")
+        with open(path, "w") as f:
+            for stack, count in session.samples.most_common():
+                f.write(f"{stack} {count}\n")
+        logger.info(f"Profiled {session.name}: {elapsed * 1000:.0f} ms, "
+                    f"{sum(session.samples.values())} samples written to {path}")
+        self._prune()
+        return path
+
+    def _prune(self) -> None:
+        files = sorted(name for name in os.listdir(self.output_dir) if name.endswith(".folded"))
+        for name in files[:max(0, len(files) - self.max_files)]:
+            try:
+                os.remove(os.path.join(self.output_dir, name))
+            except OSError:
+                pass
+
+
+profiler = SamplingProfiler()
+
+
+@contextmanager
+def profile(name: str) -> Iterator[None]:
+    """Profile a block of background work when name is listed in PROFILE_ENDPOINTS."""
+    if name not in PROFILE_ENDPOINTS:
+        yield
+        return
+    session = profiler.start(name)
+    try:
+        yield
+    finally:
+        profiler.stop(session)
+
+
+def _on_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+        return True
+    except RuntimeError:
+        return False
+
+
+def start_request_profile() -> None:
+    """Start profiling the current request if its route or X-Profile header asks for it. Runs before each request."""
+    forced = bool(PROFILE_TOKEN) and request.headers.get(PROFILE_HEADER) == PROFILE_TOKEN
+    if not forced and request.endpoint not in PROFILE_ENDPOINTS:
+        return
+    if _on_event_loop():
+        # Async views share the loop thread, so its samples would mix requests
+        return
+    g.profile_session = profiler.start(request.endpoint or "unmatched", force=forced)
+
+
+def finish_request_profile() -> Optional[str]:
+    """
+    Stop profiling the current request, if it was being profiled.
+
+    Returns:
+        Optional[str]: The profile file written, if the request was forced with
+        the X-Profile token; None otherwise, so the file name is only shown to
+        token holders
+    """
+    session = g.pop("profile_session", None)
+    if session is None:
+        return None
+    path = profiler.stop(session)
+    return path if session.force else None
@@ -0,0 +1,223 @@
+import os
+import asyncio
+import logging
+import threading
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+from services.financial_service import get_stock_data_batch
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Stream settings
+QUOTE_STREAM_INTERVAL = float(os.environ.get("QUOTE_STREAM_INTERVAL", "60"))  # Seconds between refreshes
+QUOTE_STREAM_HEARTBEAT = float(os.environ.get("QUOTE_STREAM_HEARTBEAT", "20"))  # Seconds between keep-alives
+# Streams a process serves from worker threads (WSGI); each holds its thread while
+# open, so further clients get a 503 and poll instead. Async (ASGI) streams hold no thread.
+QUOTE_STREAM_MAX_THREADS = int(os.environ.get("QUOTE_STREAM_MAX_THREADS", "8"))
+
+# Quote fields pushed to clients; a symbol is re-sent only when one of them changes
+STREAM_FIELDS = ("price", "change", "change_percent", "volume")
+
+
+class Subscription:
+    """
+    One connected client's view of the stream.
+
+    Updates are merged per symbol until the client reads them, so a slow
+    client gets the latest quote for each symbol rather than a backlog.
+    """
+
+    def __init__(self, symbols: Set[str]):
+        self.symbols = symbols
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        # Event loop and event of a pending wait_async(), set from the refresh thread
+        self._async_waiter: Optional[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = None
+
+    def push(self, quotes: Dict[str, Dict[str, Any]]) -> None:
+        with self._lock:
+            for symbol, quote in quotes.items():
+                if symbol in self.symbols:
+                    self._pending[symbol] = quote
+            if self._pending:
+                self._ready.set()
+                if self._async_waiter is not None:
+                    loop, event = self._async_waiter
+                    try:
+                        loop.call_soon_threadsafe(event.set)
+                    except RuntimeError:
+                        # The loop has shut down; nobody is waiting any more
+                        self._async_waiter = None
+
+    def wait(self, timeout: float) -> Dict[str, Dict[str, Any]]:
+        """
+        Wait for updates.
+
+        Args:
+            timeout (float): Seconds to wait
+
+        Returns:
+            Dict[str, Dict[str, Any]]: Changed quotes by symbol, empty on timeout
+        """
+        self._ready.wait(timeout)
+        return self._take()
+
+    async def wait_async(self, timeout: float) -> Dict[str, Dict[str, Any]]:
+        """
+        Wait for updates without holding a thread; for streams served on the event loop.
+
+        Args:
+            timeout (float): Seconds to wait
+
+        Returns:
+            Dict[str, Dict[str, Any]]: Changed quotes by symbol, empty on timeout
+        """
+        event = asyncio.Event()
+        with self._lock:
+            if self._pending:
+                event.set()
+            else:
+                self._async_waiter = (asyncio.get_running_loop(), event)
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._lock:
+                self._async_waiter = None
+        return self._take()
+
+    def _take(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            updates, self._pending = self._pending, {}
+            self._ready.clear()
+        return updates
+
+
+class QuoteBroadcaster:
+    """
+    Refreshes the union of every subscriber's symbols and fans out changes.
+
+    A single background thread fetches each distinct symbol once per interval
+    (through the shared quote cache), so upstream calls scale with the number
+    of distinct symbols rather than with users and their refresh rate. The
+    thread runs only while someone is subscribed.
+    """
+
+    def __init__(self, interval: float = QUOTE_STREAM_INTERVAL):
+        self.interval = interval
+        self._subscriptions: Set[Subscription] = set()
+        self._last: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def subscribe(self, symbols: Iterable[str]) -> Subscription:
+        """
+        Start receiving updates for symbols. Known quotes are delivered immediately.
+
+        Args:
+            symbols (Iterable[str]): Symbols the client displays
+
+        Returns:
+            Subscription: Call unsubscribe() with it when the client goes away
+        """
+        subscription = Subscription({symbol.upper() for symbol in symbols if symbol})
+        with self._lock:
+            new_symbols = subscription.symbols - self._symbols()
+            self._subscriptions.add(subscription)
+            subscription.push({symbol: quote for symbol, quote in self._last.items()
+                               if symbol in subscription.symbols})
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="quote-stream", daemon=True)
+                self._thread.start()
+        if new_symbols:
+            # Fetch symbols nobody was watching without waiting for the next cycle
+            self._wake.set()
+        return subscription
+
+    def update(self, subscription: Subscription, symbols: Iterable[str]) -> None:
+        """
+        Change the symbols a subscription follows, e.g. after the user added a holding.
+
+        Args:
+            subscription (Subscription): A subscription from subscribe()
+            symbols (Iterable[str]): The symbols the client now displays
+        """
+        symbols = {symbol.upper() for symbol in symbols if symbol}
+        with self._lock:
+            added = symbols - subscription.symbols
+            if not added and symbols == subscription.symbols:
+                return
+            new_symbols = added - self._symbols()
+            subscription.symbols = symbols
+            subscription.push({symbol: quote for symbol, quote in self._last.items() if symbol in added})
+            watched = self._symbols()
+            self._last = {symbol: quote for symbol, quote in self._last.items() if symbol in watched}
+        if new_symbols:
+            self._wake.set()
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscriptions.discard(subscription)
+            # Forget quotes nobody watches any more so they are re-sent on resubscribe
+            watched = self._symbols()
+            self._last = {symbol: quote for symbol, quote in self._last.items() if symbol in watched}
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"subscribers": len(self._subscriptions), "symbols": len(self._symbols())}
+
+    def _symbols(self) -> Set[str]:
+        """Union of subscribed symbols. Caller holds the lock."""
+        symbols: Set[str] = set()
+        for subscription in self._subscriptions:
+            symbols |= subscription.symbols
+        return symbols
+
+    def refresh(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Fetch every subscribed symbol once and push the ones that changed.
+
+        Returns:
+            Dict[str, Dict[str, Any]]: The changed quotes
+        """
+        with self._lock:
+            symbols = self._symbols()
+        if not symbols:
+            return {}
+
+        quotes = get_stock_data_batch(symbols)
+        changed = {}
+        with self._lock:
+            for symbol, quote in quotes.items():
+                if "error" in quote:
+                    continue
+                update = {field: quote.get(field) for field in STREAM_FIELDS}
+                if self._last.get(symbol) != update:
+                    self._last[symbol] = update
+                    changed[symbol] = update
+            subscriptions = list(self._subscriptions)
+
+        if changed:
+            for subscription in subscriptions:
+                subscription.push(changed)
+        return changed
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                if not self._subscriptions:
+                    self._thread = None
+                    return
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Error refreshing streamed quotes: {str(e)}")
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+
+quote_broadcaster = QuoteBroadcaster()
@@ -0,0 +1,65 @@
+import time
+from typing import Any, Dict
+
+from flask import g, request
+
+from services.data_access import get_query_stats, reset_query_stats
+from services.http_client import get_upstream_stats, reset_upstream_stats
+from services.metrics import registry
+
+# Per-request counts; most requests run a handful of queries and upstream calls
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# Metrics, labelled with the Flask endpoint name rather than the path to keep
+# the series count bounded ("unmatched" for requests no route handles)
+http_requests = registry.counter(
+    "http_requests_total", "HTTP requests served", ("endpoint", "method", "status"))
+http_latency = registry.histogram(
+    "http_request_duration_seconds", "Time from request start until the response is ready",
+    ("endpoint", "method"))
+request_db_queries = registry.histogram(
+    "http_request_db_queries", "Database statements per request", ("endpoint",), buckets=COUNT_BUCKETS)
+request_db_time = registry.histogram(
+    "http_request_db_seconds", "Database time per request", ("endpoint",))
+request_upstream_calls = registry.histogram(
+    "http_request_upstream_calls", "Upstream API calls per request, by service", ("endpoint", "service"),
+    buckets=COUNT_BUCKETS)
+request_upstream_time = registry.histogram(
+    "http_request_upstream_seconds", "Upstream API time per request, by service", ("endpoint", "service"))
+
+
+def start_request() -> None:
+    """Reset the current request's counters and start its timer. Runs before each request."""
+    g.request_started = time.perf_counter()
+    reset_query_stats()
+    reset_upstream_stats()
+
+
+def finish_request(status_code: int) -> Dict[str, Any]:
+    """
+    Record the current request's latency, database use and upstream calls.
+
+    Streamed responses are timed until the first byte, since the body is
+    produced after this runs.
+
+    Args:
+        status_code (int): The response status
+
+    Returns:
+        Dict[str, Any]: duration (seconds), db (count and time) and upstream
+        (calls and time per service) for the request
+    """
+    duration = time.perf_counter() - g.get("request_started", time.perf_counter())
+    endpoint = request.endpoint or "unmatched"
+    db_stats = get_query_stats()
+    upstream = get_upstream_stats()
+
+    http_requests.inc(endpoint=endpoint, method=request.method, status=status_code)
+    http_latency.observe(duration, endpoint=endpoint, method=request.method)
+    request_db_queries.observe(db_stats["count"], endpoint=endpoint)
+    request_db_time.observe(db_stats["time"], endpoint=endpoint)
+    for service, stats in upstream.items():
+        request_upstream_calls.observe(stats["calls"], endpoint=endpoint, service=service)
+        request_upstream_time.observe(stats["time"], endpoint=endpoint, service=service)
+
+    return {"duration": duration, "db": db_stats, "upstream": upstream}
@@ -0,0 +1,213 @@
+import os
+import hashlib
+import logging
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from models import Holding
+from services.cache import TTLCache, InMemoryBackend
+from services.financial_service import get_historical_data, get_stock_data_batch
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Risk model settings
+RISK_LOOKBACK_DAYS = int(os.environ.get("RISK_LOOKBACK_DAYS", "252"))
+RISK_VOLATILITY_WINDOW = int(os.environ.get("RISK_VOLATILITY_WINDOW", "21"))
+RISK_BENCHMARK = os.environ.get("RISK_BENCHMARK", "SPY")
+TRADING_DAYS_PER_YEAR = 252
+
+# One-sided normal quantiles for parametric VaR
+VAR_Z_SCORES = {0.95: 1.6448536269514722, 0.99: 2.3263478740408408}
+
+# Results only change with the trading day or the holdings, so keep them for a day.
+# Partial results (history shorter than the lookback) aren't kept, so a later
+# request recomputes them once the full history has been backfilled.
+risk_cache = TTLCache(
+    name="portfolio-risk",
+    ttl=24 * 3600,
+    backend=InMemoryBackend(max_entries=512),
+    should_cache=lambda result: "error" not in result and not result.get("partial")
+)
+
+
+def _to_json(value) -> Optional[float]:
+    value = float(value)
+    return None if not np.isfinite(value) else value
+
+
+def align_closes(histories: Dict[str, List[Dict[str, Any]]]) -> Tuple[List[str], np.ndarray]:
+    """
+    Align daily closes for several symbols on their common dates.
+
+    Args:
+        histories (Dict[str, List[Dict[str, Any]]]): Daily bars per symbol
+
+    Returns:
+        Tuple[List[str], np.ndarray]: Sorted common dates and a (dates x symbols) close matrix
+    """
+    by_symbol = {symbol: {bar["date"]: bar["close"] for bar in bars} for symbol, bars in histories.items()}
+    common = set.intersection(*(set(closes) for closes in by_symbol.values())) if by_symbol else set()
+    dates = sorted(common)
+    matrix = np.array([[by_symbol[symbol][d] for symbol in histories] for d in dates], dtype=float)
+    return dates, matrix.reshape(len(dates), len(histories))
+
+
+def simple_returns(closes: np.ndarray) -> np.ndarray:
+    """Daily simple returns from a (dates x symbols) close matrix."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = closes[1:] / closes[:-1] - 1
+    returns[~np.isfinite(returns)] = 0.0
+    return returns
+
+
+def rolling_volatility(returns: np.ndarray, window: int) -> np.ndarray:
+    """
+    Annualized rolling standard deviation of returns.
+
+    Args:
+        returns (np.ndarray): 1-D or (dates x series) returns
+        window (int): Window length in trading days
+
+    Returns:
+        np.ndarray: Volatility for each full window (len(returns) - window + 1 rows)
+    """
+    if len(returns) < window:
+        return np.empty((0,) + returns.shape[1:])
+    windows = np.lib.stride_tricks.sliding_window_view(returns, window, axis=0)
+    return windows.std(axis=-1, ddof=1) * np.sqrt(TRADING_DAYS_PER_YEAR)
+
+
+def beta(returns: np.ndarray, benchmark_returns: np.ndarray) -> float:
+    variance = benchmark_returns.var(ddof=1)
+    if variance == 0:
+        return float("nan")
+    return float(np.cov(returns, benchmark_returns, ddof=1)[0, 1] / variance)
+
+
+def historical_var(returns: np.ndarray, confidence: float) -> float:
+    """One-day historical Value at Risk as a positive fraction of portfolio value."""
+    return float(-np.percentile(returns, (1 - confidence) * 100))
+
+
+def parametric_var(returns: np.ndarray, confidence: float) -> float:
+    """One-day Gaussian Value at Risk as a positive fraction of portfolio value."""
+    return float(-(returns.mean() - VAR_Z_SCORES[confidence] * returns.std(ddof=1)))
+
+
+def max_drawdown(returns: np.ndarray) -> float:
+    """Largest peak-to-trough decline of the compounded return series, as a positive fraction."""
+    wealth = np.cumprod(1 + returns)
+    peaks = np.maximum.accumulate(np.concatenate(([1.0], wealth)))[1:]
+    return float(-(wealth / peaks - 1).min()) if len(wealth) else 0.0
+
+
+def _holdings_signature(holdings) -> str:
+    parts = sorted(f"{h.symbol.upper()}:{h.quantity}" for h in holdings)
+    return hashlib.sha1("|".join(parts).encode()).hexdigest()
+
+
+def get_portfolio_risk(portfolio_id: int) -> Dict[str, Any]:
+    """
+    Compute risk metrics for a portfolio.
+
+    Results are memoized per (portfolio, as-of date, holdings) so repeated
+    dashboard loads on the same day don't recompute them. Holdings are
+    weighted by market value at the time of the first computation that day;
+    later intraday price moves don't change the cached weights.
+
+    When the aligned price history covers fewer than RISK_LOOKBACK_DAYS
+    days (e.g. a recently listed holding), the metrics are computed on what
+    is available, the result is marked partial and it isn't memoized.
+
+    Args:
+        portfolio_id (int): The portfolio to analyze
+
+    Returns:
+        Dict[str, Any]: Volatility, beta, correlation matrix, VaR and max drawdown,
+        plus lookback_days and partial
+    """
+    holdings = Holding.query.filter_by(portfolio_id=portfolio_id).all()
+    key = f"{portfolio_id}:{date.today().isoformat()}:{_holdings_signature(holdings)}"
+    return risk_cache.get(key, lambda: _compute_portfolio_risk(holdings))
+
+
+def _compute_portfolio_risk(holdings) -> Dict[str, Any]:
+    quantities: Dict[str, float] = {}
+    for holding in holdings:
+        symbol = holding.symbol.upper()
+        quantities[symbol] = quantities.get(symbol, 0.0) + (holding.quantity or 0.0)
+    symbols = list(quantities)
+
+    if not symbols:
+        return {"symbols": [], "error": "Portfolio has no holdings"}
+
+    histories = {symbol: get_historical_data(symbol, days=RISK_LOOKBACK_DAYS) for symbol in symbols}
+    histories[RISK_BENCHMARK] = get_historical_data(RISK_BENCHMARK, days=RISK_LOOKBACK_DAYS)
+    missing = [symbol for symbol, bars in histories.items() if not bars]
+    if missing:
+        return {"symbols": symbols, "error": f"No price history for: {', '.join(missing)}"}
+
+    series = list(histories)
+    dates, closes = align_closes(histories)
+    if len(dates) < 2:
+        return {"symbols": symbols, "error": "Not enough overlapping price history"}
+
+    partial = len(dates) < RISK_LOOKBACK_DAYS
+    if partial:
+        logger.warning(f"Risk for {', '.join(symbols)} computed on {len(dates)} of {RISK_LOOKBACK_DAYS} days")
+
+    returns = simple_returns(closes)
+    holding_returns = returns[:, :len(symbols)]
+    benchmark_returns = returns[:, series.index(RISK_BENCHMARK)]
+
+    # Weight by current market value, falling back to the latest close when quotes are unavailable
+    quotes = get_stock_data_batch(symbols)
+    prices = np.array([quotes[s].get("price") or 0.0 for s in symbols], dtype=float)
+    prices = np.where(prices > 0, prices, closes[-1, :len(symbols)])
+    values = np.array([quantities[s] for s in symbols], dtype=float) * prices
+    weights = values / values.sum() if values.sum() else np.full(len(symbols), 1 / len(symbols))
+
+    portfolio_returns = holding_returns @ weights
+    portfolio_vol = rolling_volatility(portfolio_returns, RISK_VOLATILITY_WINDOW)
+    holding_vol = rolling_volatility(holding_returns, RISK_VOLATILITY_WINDOW)
+    correlation = np.corrcoef(holding_returns, rowvar=False) if len(symbols) > 1 else np.ones((1, 1))
+    annualizer = np.sqrt(TRADING_DAYS_PER_YEAR)
+
+    return {
+        "as_of": dates[-1],
+        "observations": int(len(returns)),
+        "lookback_days": RISK_LOOKBACK_DAYS,
+        "partial": partial,
+        "benchmark": RISK_BENCHMARK,
+        "symbols": symbols,
+        "weights": [_to_json(w) for w in weights],
+        "volatility": {
+            "window": RISK_VOLATILITY_WINDOW,
+            "portfolio": _to_json(portfolio_vol[-1]) if len(portfolio_vol) else None,
+            "portfolio_annualized": _to_json(portfolio_returns.std(ddof=1) * annualizer),
+            "portfolio_rolling": [
+                {"date": d, "volatility": _to_json(v)}
+                for d, v in zip(dates[RISK_VOLATILITY_WINDOW:], portfolio_vol)
+            ],
+            "holdings": {
+                s: _to_json(holding_vol[-1, i]) if len(holding_vol) else None
+                for i, s in enumerate(symbols)
+            },
+        },
+        "beta": {
+            "portfolio": _to_json(beta(portfolio_returns, benchmark_returns)),
+            "holdings": {s: _to_json(beta(holding_returns[:, i], benchmark_returns)) for i, s in enumerate(symbols)},
+        },
+        "correlation": [[_to_json(c) for c in row] for row in correlation],
+        "var": {
+            f"{int(confidence * 100)}": {
+                "historical": _to_json(historical_var(portfolio_returns, confidence)),
+                "parametric": _to_json(parametric_var(portfolio_returns, confidence)),
+            }
+            for confidence in VAR_Z_SCORES
+        },
+        "max_drawdown": _to_json(max_drawdown(portfolio_returns)),
+    }
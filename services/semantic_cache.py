@@ -0,0 +1,301 @@
+import os
+import re
+import time
+import hashlib
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from services.ai_service import get_ai_analysis, is_error_response
+from services.market_context import MARKET_CONTEXT_INTERVAL, detect_tickers, get_snapshot_time
+from services.metrics import registry
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Cache settings
+SEMANTIC_CACHE_ENABLED = os.environ.get("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+SEMANTIC_CACHE_THRESHOLD = float(os.environ.get("SEMANTIC_CACHE_THRESHOLD", "0.9"))  # Cosine similarity
+SEMANTIC_CACHE_MAX_AGE = float(os.environ.get("SEMANTIC_CACHE_MAX_AGE", "21600"))  # Seconds an answer stays reusable
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.environ.get("SEMANTIC_CACHE_MAX_ENTRIES", "2000"))
+
+semantic_cache_lookups = registry.counter(
+    "ai_semantic_cache_lookups_total", "AI analysis semantic cache lookups", ("result",))
+
+# Words that carry no intent ("Should I buy NVDA?" ~ "is NVDA a buy")
+_STOPWORDS = {
+    "a", "an", "the", "is", "are", "am", "be", "was", "were", "i", "me", "my", "we", "our", "you",
+    "your", "it", "its", "this", "that", "these", "those", "should", "would", "could", "can", "will",
+    "do", "does", "did", "to", "of", "for", "in", "on", "at", "about", "what", "whats", "how",
+    "please", "tell", "think", "right", "now", "currently", "s",
+}
+_WORD_RE = re.compile(r"[a-z0-9$]+")
+
+
+class HashingEmbedder:
+    """
+    Deterministic local embedding of short queries.
+
+    Content words and their character trigrams are hashed into a fixed number
+    of signed dimensions, so word order and filler words don't matter and
+    small spelling differences still overlap. Needs no model download, which
+    also makes it a stable stand-in for tests.
+    """
+
+    def __init__(self, dim: int = 512, trigram_weight: float = 0.3):
+        self.dim = dim
+        self.trigram_weight = trigram_weight
+
+    def _features(self, text: str) -> Dict[str, float]:
+        features: Dict[str, float] = {}
+        for word in _WORD_RE.findall(text.lower()):
+            if word in _STOPWORDS:
+                continue
+            features[f"w:{word}"] = features.get(f"w:{word}", 0.0) + 1.0
+            padded = f"^{word}$"
+            for i in range(len(padded) - 2):
+                key = f"t:{padded[i:i + 3]}"
+                features[key] = features.get(key, 0.0) + self.trigram_weight
+        return features
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed texts as L2-normalized vectors.
+
+        Args:
+            texts (List[str]): Texts to embed
+
+        Returns:
+            np.ndarray: Array of shape (len(texts), dim)
+        """
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature, weight in self._features(text).items():
+                digest = int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "little")
+                sign = 1.0 if digest >> 63 else -1.0
+                vectors[row, digest % self.dim] += sign * weight
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+
+class InMemoryVectorIndex:
+    """
+    Brute-force cosine index over a fixed-size ring buffer.
+
+    Once full, new vectors overwrite the oldest. A matrix product over a few
+    thousand rows takes well under a millisecond, so no ANN structure is needed.
+    """
+
+    def __init__(self, dim: int, max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES):
+        self._vectors = np.zeros((max_entries, dim), dtype=np.float32)
+        self._payloads: List[Optional[Dict[str, Any]]] = [None] * max_entries
+        self._size = 0
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def add(self, vector: np.ndarray, payload: Dict[str, Any]) -> None:
+        with self._lock:
+            self._vectors[self._next] = vector
+            self._payloads[self._next] = payload
+            self._next = (self._next + 1) % len(self._payloads)
+            self._size = min(self._size + 1, len(self._payloads))
+
+    def search(self, vector: np.ndarray, k: int = 5) -> List[Tuple[float, Dict[str, Any]]]:
+        """Return up to k (similarity, payload) pairs, most similar first."""
+        with self._lock:
+            if not self._size:
+                return []
+            scores = self._vectors[:self._size] @ vector
+            k = min(k, self._size)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [(float(scores[i]), self._payloads[i]) for i in top]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._payloads = [None] * len(self._payloads)
+            self._size = 0
+            self._next = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+
+class SemanticCache:
+    """
+    Reuses AI answers for queries that mean the same thing.
+
+    A lookup embeds the query and returns the most similar stored answer if it
+    is at least `threshold` similar and younger than `max_age` seconds.
+    Answers to questions about tickers were built on a market snapshot, so they
+    are only reused for MARKET_CONTEXT_INTERVAL seconds at most, and not at all
+    once a newer snapshot of those tickers exists. The
+    embedder needs `dim` and `embed(texts)`; the index needs `add`, `search`,
+    `clear` and `__len__`, so either can be swapped for a real model or vector
+    store.
+    """
+
+    def __init__(self, embedder=None, index=None, threshold: float = SEMANTIC_CACHE_THRESHOLD,
+                 max_age: float = SEMANTIC_CACHE_MAX_AGE):
+        self.embedder = embedder if embedder is not None else HashingEmbedder()
+        self.index = index if index is not None else InMemoryVectorIndex(self.embedder.dim)
+        self.threshold = threshold
+        self.max_age = max_age
+        self._stats = {"hits": 0, "misses": 0}
+        self._lock = threading.Lock()
+
+    def lookup(self, query: str) -> Optional[str]:
+        """
+        Find a fresh cached answer for a similar query.
+
+        Args:
+            query (str): The user's query
+
+        Returns:
+            Optional[str]: The cached response, or None on a miss
+        """
+        vector = self.embedder.embed([query])[0]
+        now = time.time()
+        for score, payload in self.index.search(vector):
+            if score < self.threshold:
+                break
+            if payload["created_at"] >= now - payload["max_age"] and not self._snapshot_is_outdated(payload):
+                self._count("hits")
+                logger.debug(f"Semantic cache hit ({score:.3f}) for {query!r} ~ {payload['query']!r}")
+                return payload["response"]
+        self._count("misses")
+        return None
+
+    def store(self, query: str, response: str, created_at: Optional[float] = None) -> None:
+        self.warm([(query, response, created_at if created_at is not None else time.time())])
+
+    def warm(self, entries: Iterable[Tuple[str, str, float]]) -> int:
+        """
+        Add (query, response, created_at) entries, embedding them in one batch.
+
+        Returns:
+            int: Number of entries added
+        """
+        entries = [entry for entry in entries if not is_error_response(entry[1])]
+        if not entries:
+            return 0
+        vectors = self.embedder.embed([query for query, _, _ in entries])
+        for vector, (query, response, created_at) in zip(vectors, entries):
+            payload = {"query": query, "response": response, "created_at": created_at,
+                       "max_age": self.max_age, "symbols": detect_tickers(query)}
+            if payload["symbols"]:
+                # The prompt carried market data for these tickers, which goes stale with the snapshot
+                payload["max_age"] = min(self.max_age, MARKET_CONTEXT_INTERVAL)
+                # A snapshot built after the answer can't have been in its prompt
+                snapshot_at = get_snapshot_time(payload["symbols"])
+                payload["snapshot_at"] = min(snapshot_at, created_at) if snapshot_at is not None else created_at
+            self.index.add(vector, payload)
+        return len(entries)
+
+    def _snapshot_is_outdated(self, payload: Dict[str, Any]) -> bool:
+        """Whether the tickers' current snapshot is newer than the one the answer used."""
+        if not payload["symbols"]:
+            return False
+        current = get_snapshot_time(payload["symbols"])
+        return current is not None and current > payload["snapshot_at"]
+
+    def clear(self) -> None:
+        self.index.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = stats["hits"] / lookups if lookups else 0.0
+        stats["entries"] = len(self.index)
+        return stats
+
+    def _count(self, stat: str) -> None:
+        with self._lock:
+            self._stats[stat] += 1
+        semantic_cache_lookups.inc(result=stat[:-1])
+
+
+semantic_cache = SemanticCache()
+_warmed = False
+_warm_lock = threading.Lock()
+
+
+def _warm_from_history() -> None:
+    """Load recent AIAnalysis rows into the cache once per process. Needs an app context."""
+    global _warmed
+    if _warmed:
+        return
+    with _warm_lock:
+        if _warmed:
+            return
+        # Imported here so the cache can be used without the app (e.g. in tests)
+        from app import db
+        from models import AIAnalysis
+
+        since = datetime.utcnow() - timedelta(seconds=semantic_cache.max_age)
+        rows = (db.session.query(AIAnalysis.query, AIAnalysis.response, AIAnalysis.created_at)
+                .filter(AIAnalysis.created_at >= since, AIAnalysis.status == "completed")
+                .order_by(AIAnalysis.created_at)
+                .limit(SEMANTIC_CACHE_MAX_ENTRIES)
+                .all())
+        count = semantic_cache.warm(
+            (query, response, created_at.replace(tzinfo=timezone.utc).timestamp())
+            for query, response, created_at in rows
+        )
+        logger.info(f"Loaded {count} recent AI analyses into the semantic cache")
+        _warmed = True
+
+
+def lookup_ai_analysis(query: str) -> Optional[str]:
+    """
+    Return a recent answer to an equivalent query, if any.
+
+    Args:
+        query (str): The financial query to analyze
+
+    Returns:
+        Optional[str]: The cached analysis, or None on a miss
+    """
+    if not SEMANTIC_CACHE_ENABLED:
+        return None
+    try:
+        _warm_from_history()
+    except Exception as e:
+        logger.warning(f"Could not load AI analysis history into the semantic cache: {str(e)}")
+    return semantic_cache.lookup(query)
+
+
+def remember_ai_analysis(query: str, response: str) -> None:
+    """Make a fresh answer available to later equivalent queries."""
+    if SEMANTIC_CACHE_ENABLED:
+        semantic_cache.store(query, response)
+
+
+def get_cached_ai_analysis(query: str, history: str = "") -> Tuple[str, bool]:
+    """
+    Get financial analysis, reusing a recent answer to an equivalent query.
+
+    Follow-up questions depend on the conversation, so the cache is only used
+    when there is no history.
+
+    Args:
+        query (str): The financial query to analyze
+        history (str, optional): Earlier conversation to include in the prompt
+
+    Returns:
+        Tuple[str, bool]: The analysis and whether it came from the cache
+    """
+    if history:
+        return get_ai_analysis(query, history), False
+
+    cached = lookup_ai_analysis(query)
+    if cached is not None:
+        return cached, True
+
+    response = get_ai_analysis(query)
+    remember_ai_analysis(query, response)
+    return response, False
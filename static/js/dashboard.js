@@ -20,6 +20,10 @@ let watchlists = [];
 let newsItems = [];
 let marketData = {};
 
+// Quote polling, used when the quote stream is unavailable
+const QUOTE_POLL_INTERVAL = 60000;  // Matches the server's stream refresh interval
+const QUOTE_POLLS_BEFORE_STREAM_RETRY = 5;
+
 // Initialize Dashboard
 document.addEventListener('DOMContentLoaded', () => {
     // Initialize components
@@ -29,6 +33,7 @@ document.addEventListener('DOMContentLoaded', () => {
     initializeNews();
     initializeAIChat();
     initializeSearch();
+    initializeQuoteStream();
     
     // Add event listeners
     setupEventListeners();
@@ -152,15 +157,12 @@ function renderPortfolios() {
     let html = '';
     
     portfolios.forEach(portfolio => {
-        // Calculate total value and performance
-        let totalValue = 0;
-        let totalCost = 0;
+        // Totals and performance are computed server-side
+        const summary = portfolio.summary || {};
+        const totalValue = summary.market_value || 0;
         let holdingsHtml = '';
         
         portfolio.holdings.forEach(holding => {
-            totalValue += holding.value;
-            totalCost += holding.purchase_price * holding.quantity;
-            
             const profitLossClass = holding.profit_loss >= 0 ? 'text-success' : 'text-danger';
             const changeIcon = holding.profit_loss >= 0 ? 
                 '<svg xmlns="http://www.w3.org/2000/svg" width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><polyline points="18 15 12 9 6 15"></polyline></svg>' : 
@@ -173,18 +175,22 @@ function renderPortfolios() {
                         <div class="text-muted">${holding.quantity} shares</div>
                     </div>
                     <div class="text-right">
+                        ${holding.current_price === null ? `
+                        <div class="text-muted" title="${holding.price_error || ''}">Price unavailable</div>
+                        ` : `
                         <div>${formatCurrency(holding.current_price)}</div>
                         <div class="${profitLossClass} d-flex align-items-center justify-content-end">
                             ${changeIcon}
-                            ${formatCurrency(holding.profit_loss)} (${formatPercentage((holding.current_price / holding.purchase_price - 1) * 100)})
+                            ${formatCurrency(holding.profit_loss || 0)} (${formatPercentage(holding.return_percent || 0)})
                         </div>
+                        `}
                     </div>
                 </div>
             `;
         });
         
-        const totalProfitLoss = totalValue - totalCost;
-        const totalProfitLossPercentage = totalCost > 0 ? ((totalValue / totalCost - 1) * 100) : 0;
+        const totalProfitLoss = summary.profit_loss || 0;
+        const totalProfitLossPercentage = summary.return_percent || 0;
         const profitLossClass = totalProfitLoss >= 0 ? 'text-success' : 'text-danger';
         const changeIcon = totalProfitLoss >= 0 ? 
             '<svg xmlns="http://www.w3.org/2000/svg" width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><polyline points="18 15 12 9 6 15"></polyline></svg>' : 
@@ -612,8 +618,8 @@ function initializeAIChat() {
         // Scroll to bottom
         aiChatMessages.scrollTop = aiChatMessages.scrollHeight;
         
-        // Send query to AI
-        sendAIQuery(query)
+        // Send query to AI; the user is waiting on the answer
+        sendAIQuery(query, 'high')
             .then(response => {
                 // Remove loading indicator
                 aiChatMessages.removeChild(loadingEl);
@@ -652,22 +658,166 @@ function initializeAIChat() {
 }
 
 /**
- * Sends a query to the AI service
+ * Sends a query to the AI service and waits for the queued job's result
+ * @param {string} query - The question to analyze
+ * @param {string} priority - 'high' for questions a user is waiting on;
+ *     prefetch and background analysis keep the default 'low' so they never
+ *     queue ahead of typed questions
  */
-function sendAIQuery(query) {
+function sendAIQuery(query, priority = 'low') {
     return fetch('/api/ai-analysis', {
         method: 'POST',
         headers: {
             'Content-Type': 'application/json'
         },
-        body: JSON.stringify({ query })
+        body: JSON.stringify({ query, priority })
     })
     .then(response => {
         if (!response.ok) {
             throw new Error('Network response was not ok');
         }
         return response.json();
+    })
+    .then(job => pollAIResult(job.result_url));
+}
+
+/**
+ * Polls an AI analysis job until it has finished
+ */
+function pollAIResult(resultUrl, delay = 1000) {
+    return new Promise(resolve => setTimeout(resolve, delay))
+        .then(() => fetch(resultUrl))
+        .then(response => {
+            if (response.status === 202) {
+                // Still queued or running; back off gently up to 5 seconds
+                return pollAIResult(resultUrl, Math.min(delay * 1.5, 5000));
+            }
+            if (!response.ok) {
+                throw new Error('Network response was not ok');
+            }
+            return response.json().then(result => {
+                if (result.status === 'failed') {
+                    throw new Error(result.details || result.error);
+                }
+                return result;
+            });
+        });
+}
+
+/**
+ * Subscribes to live quote updates pushed by the server
+ */
+function initializeQuoteStream() {
+    if (!window.EventSource) {
+        pollQuotes();
+        return;
+    }
+    
+    // EventSource reconnects by itself if the connection drops
+    const source = new EventSource('/api/quotes/stream');
+    source.addEventListener('quotes', (e) => {
+        applyQuoteUpdates(JSON.parse(e.data));
+    });
+    source.onerror = () => {
+        if (source.readyState === EventSource.CLOSED) {
+            // Refused (e.g. 503 when the server has too many open streams); poll instead
+            console.warn('Quote stream unavailable; polling for quotes');
+            pollQuotes(QUOTE_POLLS_BEFORE_STREAM_RETRY);
+        } else {
+            console.warn('Quote stream interrupted; reconnecting');
+        }
+    };
+}
+
+/**
+ * Polls /api/quotes for the displayed symbols, then tries the stream again
+ */
+function pollQuotes(remaining = Infinity) {
+    if (remaining <= 0) {
+        initializeQuoteStream();
+        return;
+    }
+    setTimeout(() => {
+        const symbols = new Set();
+        (marketData.indices || []).forEach(index => symbols.add(index.symbol));
+        portfolios.forEach(portfolio => portfolio.holdings.forEach(holding => symbols.add(holding.symbol.toUpperCase())));
+        watchlists.forEach(watchlist => watchlist.stocks.forEach(stock => symbols.add(stock.symbol.toUpperCase())));
+        if (symbols.size === 0) {
+            pollQuotes(remaining - 1);
+            return;
+        }
+        
+        fetch(`/api/quotes?symbols=${encodeURIComponent([...symbols].slice(0, 100).join(','))}`)
+            .then(response => response.ok ? response.json() : {})
+            .then(quotes => {
+                const priced = {};
+                Object.entries(quotes).forEach(([symbol, quote]) => {
+                    if (!quote.error) priced[symbol.toUpperCase()] = quote;
+                });
+                applyQuoteUpdates(priced);
+            })
+            .catch(error => console.error('Error polling quotes:', error))
+            .finally(() => pollQuotes(remaining - 1));
+    }, QUOTE_POLL_INTERVAL);
+}
+
+/**
+ * Applies changed quotes to market, portfolio and watchlist state and re-renders
+ */
+function applyQuoteUpdates(quotes) {
+    let marketChanged = false;
+    (marketData.indices || []).forEach(index => {
+        const quote = quotes[index.symbol];
+        if (quote) {
+            Object.assign(index, {price: quote.price, change: quote.change, change_percent: quote.change_percent});
+            marketChanged = true;
+        }
+    });
+    if (marketChanged) renderMarketSummary();
+    
+    let portfoliosChanged = false;
+    portfolios.forEach(portfolio => {
+        const quoted = portfolio.holdings.filter(holding => quotes[holding.symbol.toUpperCase()]);
+        if (quoted.length === 0) return;
+        portfoliosChanged = true;
+        
+        quoted.forEach(holding => {
+            const quote = quotes[holding.symbol.toUpperCase()];
+            holding.current_price = quote.price;
+            holding.price_error = null;
+            holding.value = holding.quantity * quote.price;
+            holding.day_change = holding.quantity * quote.change;
+            if (holding.cost_basis !== null && holding.cost_basis !== undefined) {
+                holding.profit_loss = holding.value - holding.cost_basis;
+                holding.return_percent = holding.cost_basis ? holding.profit_loss / holding.cost_basis * 100 : 0;
+            }
+        });
+        
+        // Keep the summary consistent with the updated holdings (same rules as the server)
+        const summary = portfolio.summary || (portfolio.summary = {});
+        const sum = (field, holdings) => holdings.reduce((total, holding) => total + (holding[field] || 0), 0);
+        const priced = portfolio.holdings.filter(holding => holding.current_price !== null);
+        const withCost = priced.filter(holding => holding.cost_basis !== null && holding.cost_basis !== undefined);
+        summary.market_value = sum('value', priced);
+        summary.day_change = sum('day_change', priced);
+        summary.cost_basis = sum('cost_basis', withCost);
+        summary.profit_loss = sum('profit_loss', withCost);
+        summary.return_percent = summary.cost_basis ? summary.profit_loss / summary.cost_basis * 100 : null;
+        summary.unpriced_holdings = portfolio.holdings.length - priced.length;
+    });
+    if (portfoliosChanged) renderPortfolios();
+    
+    let watchlistsChanged = false;
+    watchlists.forEach(watchlist => {
+        watchlist.stocks.forEach(stock => {
+            const quote = quotes[stock.symbol.toUpperCase()];
+            if (quote) {
+                Object.assign(stock, {price: quote.price, change: quote.change, change_percent: quote.change_percent});
+                watchlistsChanged = true;
+            }
+        });
     });
+    if (watchlistsChanged) renderWatchlists();
 }
 
 /**
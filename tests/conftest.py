@@ -0,0 +1,51 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Run against a private in-memory database, before the app reads its config
+os.environ["DATABASE_URL"] = "sqlite://"
+os.environ.setdefault("SESSION_SECRET", "test-secret")
+
+from app import app as flask_app, db  # noqa: E402
+from models import User  # noqa: E402
+from services.auth_service import user_cache  # noqa: E402
+
+
+@pytest.fixture
+def app():
+    flask_app.config.update(TESTING=True)
+    with flask_app.app_context():
+        yield flask_app
+        db.session.remove()
+        # Empty every table so each test starts from a clean database
+        for table in reversed(db.metadata.sorted_tables):
+            db.session.execute(table.delete())
+        db.session.commit()
+        # Row ids are reused once the tables are emptied
+        user_cache.clear()
+
+
+@pytest.fixture
+def client(app):
+    app.config.update(WTF_CSRF_ENABLED=False)
+    yield app.test_client()
+    app.config.update(WTF_CSRF_ENABLED=True)
+
+
+@pytest.fixture
+def user(app):
+    user = User(username="alice", email="alice@example.com")
+    user.set_password("password")
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+@pytest.fixture
+def logged_in_client(client, user):
+    response = client.post("/login", data={"username": "alice", "password": "password"})
+    assert response.status_code == 302
+    return client
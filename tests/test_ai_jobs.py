@@ -0,0 +1,84 @@
+from datetime import datetime, timedelta
+
+from app import db
+from models import AIAnalysis
+from services import ai_jobs
+from services.ai_jobs import AIJobQueue
+
+
+def _job(user, status, created_minutes_ago, started_minutes_ago=None):
+    now = datetime.utcnow()
+    analysis = AIAnalysis(
+        query=f"{status} {created_minutes_ago}", response="", user_id=user.id, status=status,
+        created_at=now - timedelta(minutes=created_minutes_ago),
+        started_at=None if started_minutes_ago is None else now - timedelta(minutes=started_minutes_ago))
+    db.session.add(analysis)
+    db.session.commit()
+    return analysis.id
+
+
+def test_recover_uses_claim_time_not_creation_time(app, user):
+    # Waited 30 minutes behind the per-user cap, claimed a minute ago: still running elsewhere
+    recently_claimed = _job(user, "running", created_minutes_ago=30, started_minutes_ago=1)
+    lost = _job(user, "running", created_minutes_ago=30, started_minutes_ago=20)
+    queued = _job(user, "queued", created_minutes_ago=5)
+
+    queue = AIJobQueue(workers=0)
+    assert queue.recover() == 2
+
+    statuses = dict(db.session.query(AIAnalysis.id, AIAnalysis.status))
+    assert statuses == {recently_claimed: "running", lost: "queued", queued: "queued"}
+    assert {job.id for job in queue._pending} == {lost, queued}
+
+
+def test_result_of_a_job_taken_over_elsewhere_is_discarded(app, user, monkeypatch):
+    job_id = _job(user, "queued", created_minutes_ago=1)
+    job = ai_jobs._Job(job_id, user.id, "query", 0, 0)
+
+    def analysis_taken_over(query, history):
+        # Another process requeues and reclaims the job while this one waits on the model
+        db.session.query(AIAnalysis).filter(AIAnalysis.id == job_id).update(
+            {"status": "running", "started_at": datetime.utcnow() + timedelta(seconds=1)})
+        db.session.commit()
+        return "stale answer", False
+
+    monkeypatch.setattr(ai_jobs, "build_history", lambda user_id: [])
+    monkeypatch.setattr(ai_jobs, "get_cached_ai_analysis", analysis_taken_over)
+    AIJobQueue._run(job)
+
+    analysis = db.session.get(AIAnalysis, job_id)
+    db.session.refresh(analysis)
+    assert (analysis.status, analysis.response) == ("running", "")
+
+
+def test_failed_claim_marks_the_job_failed(app, user, monkeypatch):
+    job_id = _job(user, "queued", created_minutes_ago=1)
+    job = ai_jobs._Job(job_id, user.id, "query", 0, 0)
+    real_commit = db.session.commit
+    calls = []
+
+    def commit_failing_once():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("connection lost")
+        real_commit()
+
+    monkeypatch.setattr(db.session, "commit", commit_failing_once)
+    AIJobQueue._run(job)
+    monkeypatch.undo()
+
+    analysis = db.session.get(AIAnalysis, job_id)
+    db.session.refresh(analysis)
+    assert analysis.status == "failed"
+    assert "connection lost" in analysis.response
+
+
+def test_identical_submissions_share_one_job(app, user):
+    queue = AIJobQueue(workers=0)
+
+    first, reused_first = queue.submit(user.id, "Outlook for  NVDA?")
+    second, reused_second = queue.submit(user.id, "outlook for nvda?")
+
+    assert (reused_first, reused_second) == (False, True)
+    assert first == second
+    assert db.session.query(AIAnalysis).count() == 1
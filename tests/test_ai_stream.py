@@ -0,0 +1,47 @@
+import routes
+
+
+def _post_stream(client):
+    return client.post("/api/ai-analysis/stream", json={"query": "How is AAPL doing?"}, buffered=False)
+
+
+def test_stream_opens_before_history_is_built(logged_in_client, monkeypatch):
+    calls = []
+    monkeypatch.setattr(routes, "build_history", lambda user_id: calls.append("history") or "")
+    monkeypatch.setattr(routes, "lookup_ai_analysis", lambda query: "Cached answer")
+
+    response = _post_stream(logged_in_client)
+    chunks = iter(response.response)
+
+    assert next(chunks) == b": started\n\n"
+    assert calls == []
+    assert b"Cached answer" in next(chunks)
+    assert calls == ["history"]
+    response.close()
+
+
+def test_disconnect_cancels_the_token_stream(logged_in_client, monkeypatch):
+    streams = []
+
+    def fake_stream(query, history, cancel_event=None):
+        streams.append(cancel_event)
+        try:
+            while not cancel_event.is_set():
+                yield "token "
+        finally:
+            streams.append("closed")
+
+    monkeypatch.setattr(routes, "build_history", lambda user_id: "")
+    monkeypatch.setattr(routes, "lookup_ai_analysis", lambda query: None)
+    monkeypatch.setattr(routes, "stream_ai_analysis", fake_stream)
+
+    response = _post_stream(logged_in_client)
+    chunks = iter(response.response)
+    next(chunks)
+    assert b"token" in next(chunks)
+    # The client goes away mid-answer
+    response.close()
+
+    cancel_event = streams[0]
+    assert cancel_event.is_set()
+    assert streams[-1] == "closed"
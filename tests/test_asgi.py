@@ -0,0 +1,96 @@
+import asyncio
+import threading
+
+import httpx
+import pytest
+
+import async_routes
+from asgi import application
+from services import auth_service, news_service
+
+
+def _request(method, path, **kwargs):
+    """Send one request through the ASGI bridge and return the response with its cookies."""
+    async def send():
+        transport = httpx.ASGITransport(app=application)
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            if "cookies" in kwargs:
+                client.cookies = kwargs.pop("cookies")
+            return await client.request(method, path, **kwargs)
+    return asyncio.run(send())
+
+
+def _login():
+    response = _request("POST", "/login", data={"username": "alice", "password": "password"})
+    assert response.status_code == 302
+    return response.cookies
+
+
+@pytest.fixture
+def no_csrf(app):
+    app.config.update(WTF_CSRF_ENABLED=False)
+    yield
+    app.config.update(WTF_CSRF_ENABLED=True)
+
+
+@pytest.mark.parametrize("path", ["/api/market-summary", "/api/portfolios"])
+def test_anonymous_requests_redirect_to_login(app, path):
+    # One async view and one sync view
+    response = _request("GET", path)
+
+    assert response.status_code == 302
+    assert response.headers["location"].startswith("/login")
+
+
+def test_post_without_csrf_token_is_rejected(app, user):
+    response = _request("POST", "/login", data={"username": "alice", "password": "password"})
+
+    assert response.status_code == 400
+
+
+def test_session_cookie_authenticates_async_views(app, user, no_csrf, monkeypatch):
+    async def summary():
+        return {"indices": [], "sectors": []}
+    monkeypatch.setattr(async_routes, "get_market_summary_async", summary)
+
+    cookies = _login()
+    assert "session" in cookies
+
+    response = _request("GET", "/api/market-summary", cookies=cookies)
+    assert response.status_code == 200
+    assert response.json() == {"indices": [], "sectors": []}
+
+
+def test_unknown_path_is_404(app):
+    assert _request("GET", "/no-such-page").status_code == 404
+
+
+def test_session_user_is_loaded_off_the_event_loop(app, user, no_csrf, monkeypatch):
+    async def summary():
+        return {"indices": [], "sectors": []}
+    monkeypatch.setattr(async_routes, "get_market_summary_async", summary)
+    cookies = _login()
+    auth_service.user_cache.clear()
+
+    threads = []
+    load_identity = auth_service._load_identity
+    monkeypatch.setattr(auth_service, "_load_identity",
+                        lambda user_id: threads.append(threading.current_thread()) or load_identity(user_id))
+
+    # asyncio.run drives the event loop on this thread
+    assert _request("GET", "/api/market-summary", cookies=cookies).status_code == 200
+    assert threads and threading.current_thread() not in threads
+
+
+def test_fetched_news_is_formatted_off_the_event_loop(app, monkeypatch):
+    async def search(query, max_results, ttl):
+        return {"results": [{"title": "Chipmakers rally", "url": "https://news.example.com/1", "content": "..."}]}
+    threads = []
+    monkeypatch.setattr(news_service, "TAVILY_API_KEY", "test-key")
+    monkeypatch.setattr(news_service, "_cached_search_async", search)
+    monkeypatch.setattr(news_service, "get_known_symbols", lambda: threads.append(threading.current_thread()) or set())
+
+    news = asyncio.run(news_service.get_latest_news_async(max_results=1))
+
+    assert news[0]["url"] == "https://news.example.com/1"
+    assert threads and threading.current_thread() not in threads
@@ -0,0 +1,71 @@
+import threading
+import time
+
+from services import cache as cache_module
+from services.cache import InMemoryBackend, TTLCache, make_backend
+
+
+def test_concurrent_misses_share_one_load():
+    cache = TTLCache(name="test-single-flight", ttl=60)
+    release = threading.Event()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        release.wait(5)
+        return "value"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get("key", loader))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["value"] * 5
+    assert len(calls) == 1
+    assert cache.stats()["coalesced"] == 4
+
+
+def test_stale_entry_is_served_while_one_refresh_runs():
+    cache = TTLCache(name="test-stale", ttl=0.01, stale_ttl=60)
+    cache.get("key", lambda: "old")
+    time.sleep(0.02)
+
+    release = threading.Event()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        release.wait(5)
+        return "new"
+
+    # Stale reads return at once; the refresh is queued only once
+    assert [cache.get("key", loader) for _ in range(3)] == ["old"] * 3
+    release.set()
+    deadline = time.time() + 5
+    while cache._refreshing and time.time() < deadline:
+        time.sleep(0.01)
+
+    assert cache.backend.get("key")[0] == "new"
+    assert len(calls) == 1
+
+
+def test_falls_back_to_in_process_backend_when_redis_is_unusable(monkeypatch):
+    monkeypatch.setattr(cache_module, "CACHE_REDIS_URL", "not-a-redis-url")
+    assert isinstance(make_backend("test"), InMemoryBackend)
+
+
+class _BrokenBackend:
+    def get(self, key):
+        raise ConnectionError("redis is down")
+
+    def set(self, key, value, stored_at, expire_in):
+        raise ConnectionError("redis is down")
+
+
+def test_backend_errors_fall_through_to_the_loader():
+    cache = TTLCache(name="test-broken", ttl=60, backend=_BrokenBackend())
+    assert cache.get("key", lambda: "value") == "value"
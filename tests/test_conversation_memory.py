@@ -0,0 +1,82 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db
+from models import AIAnalysis, ConversationSummary
+from services import conversation_memory
+from services.conversation_memory import build_history
+
+
+@pytest.fixture
+def summaries(app, monkeypatch):
+    calls = []
+
+    def summarize(summary, turns, max_words=200):
+        calls.append((summary, turns))
+        return f"summary {len(calls)}"
+
+    monkeypatch.setattr(conversation_memory, "summarize_conversation", summarize)
+    monkeypatch.setattr(conversation_memory, "AI_HISTORY_TOKEN_BUDGET", 300)
+    return calls
+
+
+def _add_turns(user, count, start, answer_words=40):
+    for i in range(count):
+        db.session.add(AIAnalysis(query=f"Question {i}", response=" ".join(["word"] * answer_words),
+                                  user_id=user.id, created_at=start + timedelta(minutes=i)))
+    db.session.commit()
+
+
+def test_no_history_for_a_new_user(user, summaries):
+    assert build_history(user.id) == ""
+
+
+def test_short_session_is_kept_verbatim(user, summaries):
+    _add_turns(user, 2, datetime.utcnow() - timedelta(minutes=5), answer_words=5)
+
+    history = build_history(user.id)
+
+    assert history.index("User: Question 0") < history.index("User: Question 1")
+    assert summaries == []
+
+
+def test_idle_gap_starts_a_new_session(user, summaries):
+    _add_turns(user, 1, datetime.utcnow() - timedelta(hours=3), answer_words=5)
+    _add_turns(user, 1, datetime.utcnow() - timedelta(minutes=5), answer_words=5)
+
+    history = build_history(user.id)
+
+    # Both turns are "Question 0"; only the recent one is in this session
+    assert history.count("User: Question 0") == 1
+    assert history.startswith("User: ")
+
+
+def test_overflow_is_folded_into_a_rolling_summary_once(user, summaries):
+    _add_turns(user, 6, datetime.utcnow() - timedelta(minutes=10))
+
+    history = build_history(user.id)
+
+    assert len(summaries) == 1
+    assert "User: Question 0" in summaries[0][1]
+    assert history.startswith("Summary of earlier conversation: summary 1")
+    assert "User: Question 5" in history and "User: Question 0" not in history
+    assert conversation_memory.estimate_tokens(history) <= conversation_memory.AI_HISTORY_TOKEN_BUDGET
+    record = db.session.get(ConversationSummary, user.id)
+    assert record.summary == "summary 1"
+
+    # Already summarized turns are not summarized again
+    assert build_history(user.id) == history
+    assert len(summaries) == 1
+
+
+def test_summarizer_failure_keeps_the_recent_turns(user, summaries, monkeypatch):
+    def fail(summary, turns, max_words=200):
+        raise RuntimeError("LLM unavailable")
+    monkeypatch.setattr(conversation_memory, "summarize_conversation", fail)
+    _add_turns(user, 6, datetime.utcnow() - timedelta(minutes=10))
+
+    history = build_history(user.id)
+
+    assert "User: Question 5" in history
+    assert conversation_memory.estimate_tokens(history) <= conversation_memory.AI_HISTORY_TOKEN_BUDGET
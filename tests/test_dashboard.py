@@ -0,0 +1,15 @@
+from services.data_access import count_queries
+
+
+def test_dashboard_loads_no_data_server_side(logged_in_client, monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("the dashboard page should not call upstream APIs")
+    monkeypatch.setattr("services.financial_service.get_stock_data_batch", fail)
+
+    with count_queries() as stats:
+        response = logged_in_client.get("/dashboard")
+
+    assert response.status_code == 200
+    assert b"Welcome back, alice" in response.data
+    # Only the login's user lookup
+    assert stats["count"] <= 1
@@ -0,0 +1,70 @@
+import pytest
+
+from app import db
+from models import Holding, Portfolio, User, Watchlist, WatchlistItem
+from services.data_access import count_queries, get_user_portfolios, get_user_watchlists
+
+
+def _make_user(username: str, collections: int, items: int) -> int:
+    user = User(username=username, email=f"{username}@example.com")
+    user.set_password("password")
+    db.session.add(user)
+    db.session.flush()
+    for i in range(collections):
+        portfolio = Portfolio(name=f"Portfolio {i}", user_id=user.id)
+        portfolio.holdings = [Holding(symbol=f"S{j}", quantity=j + 1, purchase_price=10.0) for j in range(items)]
+        watchlist = Watchlist(name=f"Watchlist {i}", user_id=user.id)
+        watchlist.stocks = [WatchlistItem(symbol=f"S{j}") for j in range(items)]
+        db.session.add_all([portfolio, watchlist])
+    db.session.commit()
+    user_id = user.id
+    # Load from the database in the checks below, not from the identity map
+    db.session.expunge_all()
+    return user_id
+
+
+def _portfolio_queries(user_id: int) -> int:
+    with count_queries() as queries:
+        portfolios = get_user_portfolios(user_id)
+        # Touch everything the portfolio views read
+        for portfolio in portfolios:
+            for holding in portfolio.holdings:
+                holding.symbol, holding.quantity, holding.purchase_price
+    db.session.expunge_all()
+    return queries["count"]
+
+
+def _watchlist_queries(user_id: int) -> int:
+    with count_queries() as queries:
+        watchlists = get_user_watchlists(user_id)
+        for watchlist in watchlists:
+            for item in watchlist.stocks:
+                item.symbol
+    db.session.expunge_all()
+    return queries["count"]
+
+
+@pytest.mark.parametrize("collections, items", [(5, 1), (20, 10)])
+def test_portfolio_queries_independent_of_portfolio_count(app, collections, items):
+    one = _make_user("one", 1, 1)
+    many = _make_user("many", collections, items)
+
+    assert _portfolio_queries(one) == _portfolio_queries(many) == 2
+
+
+@pytest.mark.parametrize("collections, items", [(5, 1), (20, 10)])
+def test_watchlist_queries_independent_of_watchlist_count(app, collections, items):
+    one = _make_user("one", 1, 1)
+    many = _make_user("many", collections, items)
+
+    assert _watchlist_queries(one) == _watchlist_queries(many) == 2
+
+
+def test_loaders_return_only_the_users_rows(app):
+    one = _make_user("one", 1, 2)
+    many = _make_user("many", 3, 2)
+
+    portfolios = get_user_portfolios(many)
+    assert [p.name for p in portfolios] == ["Portfolio 0", "Portfolio 1", "Portfolio 2"]
+    assert all(p.user_id == many for p in portfolios)
+    assert [len(w.stocks) for w in get_user_watchlists(one)] == [2]
@@ -0,0 +1,62 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from services import financial_service
+from services.financial_service import get_stock_data_batch, quote_cache
+
+
+def _quote(symbol):
+    return {"symbol": symbol, "price": 100.0, "change": 1.0, "change_percent": "1%", "volume": 10}
+
+
+@pytest.fixture(autouse=True)
+def empty_quote_cache():
+    quote_cache.clear()
+    yield
+    quote_cache.clear()
+
+
+class _RecordingExecutor(ThreadPoolExecutor):
+    def __init__(self):
+        super().__init__(max_workers=1)
+        self.symbols = []
+
+    def submit(self, fn, *args):
+        self.symbols.append(args[-1])
+        return super().submit(fn, *args)
+
+
+def test_cache_hits_skip_the_fetch_pool(monkeypatch):
+    monkeypatch.setattr(financial_service, "_fetch_stock_data", _quote)
+    executor = _RecordingExecutor()
+    monkeypatch.setattr(financial_service, "_quote_executor", executor)
+    quote_cache.get("AAPL", lambda: _quote("AAPL"))
+
+    results = get_stock_data_batch(["aapl", "MSFT"])
+
+    assert list(results) == ["AAPL", "MSFT"]
+    assert executor.symbols == ["MSFT"]
+
+
+def test_timed_out_fetches_still_queued_are_cancelled(monkeypatch):
+    release = threading.Event()
+    fetched = []
+
+    def slow_fetch(symbol):
+        fetched.append(symbol)
+        release.wait(5)
+        return _quote(symbol)
+
+    monkeypatch.setattr(financial_service, "_fetch_stock_data", slow_fetch)
+    monkeypatch.setattr(financial_service, "_quote_executor", ThreadPoolExecutor(max_workers=1))
+
+    results = get_stock_data_batch(["AAA", "BBB"], timeout=0.1)
+    release.set()
+    time.sleep(0.1)
+
+    assert all(quote["error"] == "Timed out" for quote in results.values())
+    # BBB was still queued behind AAA and never reached the upstream
+    assert fetched == ["AAA"]
@@ -0,0 +1,63 @@
+import pytest
+
+import routes
+from services.auth_service import LoginThrottle
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("services.auth_service.time.time", lambda: now[0])
+    return now
+
+
+def test_lockout_is_per_ip_and_username(clock):
+    throttle = LoginThrottle(max_failures=3, max_failures_per_ip=100, window=60)
+    for _ in range(3):
+        assert throttle.retry_after("10.0.0.1", "alice") == 0
+        throttle.record_failure("10.0.0.1", "alice")
+
+    assert throttle.retry_after("10.0.0.1", "alice") == 60
+    assert throttle.retry_after("10.0.0.1", " ALICE ") == 60
+    # The owner, from another address, is not locked out
+    assert throttle.retry_after("10.0.0.2", "alice") == 0
+    assert throttle.retry_after("10.0.0.1", "bob") == 0
+
+    clock[0] += 60
+    assert throttle.retry_after("10.0.0.1", "alice") == 0
+
+
+def test_per_ip_limit_covers_every_username(clock):
+    throttle = LoginThrottle(max_failures=3, max_failures_per_ip=5, window=60)
+    for i in range(5):
+        clock[0] += 1
+        throttle.record_failure("10.0.0.1", f"user{i}")
+
+    assert throttle.retry_after("10.0.0.1", "someone-else") == 56
+    assert throttle.retry_after("10.0.0.2", "someone-else") == 0
+
+
+def test_reset_clears_the_username_but_not_the_ip_count(clock):
+    throttle = LoginThrottle(max_failures=3, max_failures_per_ip=4, window=60)
+    for _ in range(3):
+        throttle.record_failure("10.0.0.1", "alice")
+    throttle.reset("10.0.0.1", "alice")
+
+    assert throttle.retry_after("10.0.0.1", "alice") == 0
+    throttle.record_failure("10.0.0.1", "alice")
+    assert throttle.retry_after("10.0.0.1", "alice") == 60
+
+
+def _login(client, password, ip):
+    return client.post("/login", data={"username": "alice", "password": password},
+                       environ_base={"REMOTE_ADDR": ip})
+
+
+def test_login_route_locks_out_one_client_only(client, user, monkeypatch):
+    monkeypatch.setattr(routes, "login_throttle", LoginThrottle(max_failures=2, max_failures_per_ip=10, window=60))
+
+    assert _login(client, "wrong", "10.0.0.1").status_code == 200
+    assert _login(client, "wrong", "10.0.0.1").status_code == 200
+    # Throttled even with the right password
+    assert _login(client, "password", "10.0.0.1").status_code == 429
+    assert _login(client, "password", "10.0.0.2").status_code == 302
@@ -0,0 +1,17 @@
+import pytest
+
+from services.market_context import detect_tickers
+
+KNOWN = {"NVDA", "AAPL", "NOW", "F"}
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("SHOULD I BUY ABOUT NOW", []),
+    ("WHAT ABOUT MSFT", []),
+    ("should i buy nvda?", ["NVDA"]),
+    ("Is $TSLA better than AAPL?", ["TSLA", "AAPL"]),
+    ("Ford (F) or $F?", ["F"]),
+    ("how is $now doing", ["NOW"]),
+])
+def test_detect_tickers(text, expected):
+    assert detect_tickers(text, KNOWN) == expected
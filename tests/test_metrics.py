@@ -0,0 +1,39 @@
+import routes
+
+
+def test_metrics_hidden_without_token(client, monkeypatch):
+    monkeypatch.setattr(routes, "METRICS_TOKEN", "")
+    assert client.get("/metrics").status_code == 404
+
+
+def test_metrics_require_token(client, monkeypatch):
+    monkeypatch.setattr(routes, "METRICS_TOKEN", "secret")
+
+    assert client.get("/metrics").status_code == 401
+    response = client.get("/metrics", headers={"Authorization": "Bearer secret"})
+    assert response.status_code == 200
+    assert b"http_requests_total" in response.data
+
+
+def test_db_headers_off_by_default(client):
+    response = client.get("/")
+
+    assert "X-DB-Query-Count" not in response.headers
+    assert "X-DB-Query-Time" not in response.headers
+
+
+def test_db_headers_when_enabled(client, monkeypatch):
+    monkeypatch.setattr(routes, "DB_STATS_HEADERS", True)
+    assert "X-DB-Query-Count" in client.get("/").headers
+
+
+def test_connection_reuse_is_exported(client, monkeypatch):
+    from services.http_client import upstream_connections, upstream_requests
+    monkeypatch.setattr(routes, "METRICS_TOKEN", "secret")
+    for _ in range(4):
+        upstream_requests.inc(host="reuse.example.com", status="200")
+    upstream_connections.inc(host="reuse.example.com")
+
+    body = client.get("/metrics", headers={"Authorization": "Bearer secret"}).data.decode()
+
+    assert 'upstream_connection_reuse_ratio{host="reuse.example.com"} 0.75' in body
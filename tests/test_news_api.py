@@ -0,0 +1,42 @@
+from datetime import datetime
+
+import routes
+from app import db
+from models import FinancialNews
+from services.news_service import NEWS_RESPONSE_FIELDS, news_for_response
+
+
+def _live_item():
+    return {
+        "title": "Chipmakers rally",
+        "url": "https://news.example.com/live",
+        "source": "Example",
+        "published_at": datetime(2026, 10, 16, 14, 30),
+        "summary": "Shares rose...",
+        "sentiment": "positive",
+        "symbols": ["NVDA"],
+        "simhash": 0xF0F0F0F0F0F0F0F0,
+    }
+
+
+def test_news_for_response_drops_internal_fields_and_uses_iso_dates():
+    [item] = news_for_response([_live_item()])
+
+    assert set(item) == set(NEWS_RESPONSE_FIELDS)
+    assert item["published_at"] == "2026-10-16T14:30:00"
+
+
+def test_live_and_stored_news_have_the_same_shape(logged_in_client, monkeypatch):
+    monkeypatch.setattr(routes, "get_latest_news", lambda max_results: [_live_item()])
+    monkeypatch.setattr(routes, "submit_news_ingestion", lambda news_items: None)
+    live = logged_in_client.get("/api/news?limit=1").get_json()
+
+    db.session.add(FinancialNews(title="Stored", url="https://news.example.com/stored", source="Example",
+                                 published_at=datetime(2026, 10, 15, 9, 0), summary="...", sentiment="neutral",
+                                 symbols="AAPL", simhash=-12345))
+    db.session.commit()
+    stored = logged_in_client.get("/api/news?limit=1").get_json()
+
+    assert set(live[0]) == set(stored[0]) == set(NEWS_RESPONSE_FIELDS)
+    assert live[0]["published_at"] == "2026-10-16T14:30:00"
+    assert stored[0]["published_at"] == "2026-10-15T09:00:00"
@@ -0,0 +1,82 @@
+import pytest
+
+from services import news_service
+from services.news_service import normalize_query, search_news, tavily_cache
+
+
+class _FakeTavily:
+    def __init__(self, api_key=None):
+        self.queries = []
+
+    def search(self, query, **kwargs):
+        self.queries.append(query)
+        return {"results": [{"title": f"Result for {query}", "url": f"https://news.example.com/{len(self.queries)}",
+                             "published_date": "2026-10-16T14:30:00", "content": "Shares rose after earnings."}]}
+
+
+@pytest.fixture
+def tavily(app, monkeypatch):
+    fake = _FakeTavily()
+    monkeypatch.setattr(news_service, "TAVILY_API_KEY", "test-key")
+    monkeypatch.setattr(news_service, "get_tavily_client", lambda: fake)
+    tavily_cache.clear()
+    yield fake
+    tavily_cache.clear()
+
+
+def test_normalize_query():
+    assert normalize_query("AAPL earnings") == normalize_query("  aapl   earnings? ") == "aapl earnings"
+    assert normalize_query("$BRK.B & S&P-500") == "$brk.b & s&p-500"
+
+
+def test_repeated_searches_share_one_tavily_call(tavily):
+    before = tavily_cache.stats()
+
+    first = search_news("AAPL earnings")
+    second = search_news("aapl  earnings ")
+
+    assert len(tavily.queries) == 1
+    assert second == first
+    after = tavily_cache.stats()
+    assert after["misses"] - before["misses"] == 1
+    assert after["hits"] - before["hits"] == 1
+
+
+def test_entries_are_keyed_by_result_count(tavily):
+    search_news("AAPL earnings", max_results=5)
+    search_news("AAPL earnings", max_results=10)
+
+    assert len(tavily.queries) == 2
+
+
+def test_expired_entries_are_searched_again(tavily, monkeypatch):
+    monkeypatch.setattr(news_service, "TAVILY_SEARCH_CACHE_TTL", 0)
+    monkeypatch.setattr(tavily_cache, "stale_ttl", 0)
+
+    search_news("AAPL earnings")
+    search_news("AAPL earnings")
+
+    assert len(tavily.queries) == 2
+
+
+def test_failed_searches_are_not_cached(tavily, monkeypatch):
+    def fail(query, **kwargs):
+        raise ConnectionError("Tavily is down")
+    monkeypatch.setattr(tavily, "search", fail)
+    assert search_news("AAPL earnings")[0]["url"] == "#"
+
+    monkeypatch.undo()
+    monkeypatch.setattr(news_service, "TAVILY_API_KEY", "test-key")
+    monkeypatch.setattr(news_service, "get_tavily_client", lambda: tavily)
+    assert search_news("AAPL earnings")[0]["url"] == "https://news.example.com/1"
+
+
+def test_one_client_is_reused(monkeypatch):
+    monkeypatch.setattr(news_service, "TAVILY_API_KEY", "test-key")
+    monkeypatch.setattr(news_service, "TavilyClient", _FakeTavily)
+    monkeypatch.setattr(news_service, "_tavily_client", None)
+
+    client = news_service.get_tavily_client()
+
+    assert isinstance(client, _FakeTavily)
+    assert news_service.get_tavily_client() is client
@@ -0,0 +1,82 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import db
+from models import FinancialNews, NewsSymbol
+from services import news_store
+from services.news_store import ingest_news, search_stored_news
+
+
+def _item(url, title, summary="", symbols=(), simhash=None, days_ago=0):
+    return {
+        "title": title,
+        "url": url,
+        "source": "Example",
+        "published_at": datetime(2026, 10, 16, 12, 0) - timedelta(days=days_ago),
+        "summary": summary,
+        "sentiment": "neutral",
+        "symbols": list(symbols),
+        "simhash": simhash,
+    }
+
+
+@pytest.fixture
+def stored_news(app):
+    ingest_news([
+        _item("https://news.example.com/1", "Fed holds rates", "Chipmakers were flat", days_ago=1),
+        _item("https://news.example.com/2", "Chipmakers rally on earnings", "Nvidia leads chipmakers higher",
+              symbols=["NVDA"], days_ago=3),
+        _item("https://news.example.com/3", "Oil slides", "Energy stocks fall as crude drops", symbols=["XOM"]),
+    ])
+
+
+def test_fts_index_is_built_on_sqlite(app):
+    assert news_store._fts_available()
+
+
+def test_search_ranks_title_matches_first(stored_news):
+    results = search_stored_news("chipmakers")
+
+    # The older story mentions chipmakers in its title and summary, so it outranks the newer one
+    assert [news["url"] for news in results] == ["https://news.example.com/2", "https://news.example.com/1"]
+
+
+def test_search_requires_every_term_and_applies_filters(stored_news):
+    assert [news["url"] for news in search_stored_news("chipmakers nvidia")] == ["https://news.example.com/2"]
+    # Stemmed: "falling" matches "fall"
+    assert [news["url"] for news in search_stored_news("falling crude")] == ["https://news.example.com/3"]
+    assert search_stored_news("chipmakers", symbol="XOM") == []
+    since = datetime(2026, 10, 15, 0, 0)
+    assert [news["url"] for news in search_stored_news("chipmakers", since=since)] == ["https://news.example.com/1"]
+    assert search_stored_news("!!!") == []
+
+
+def test_like_fallback_when_fts_is_unavailable(stored_news, monkeypatch):
+    monkeypatch.setattr(news_store, "_fts_available", lambda: False)
+
+    results = search_stored_news("chipmakers")
+
+    # Without a rank, matches come newest first
+    assert [news["url"] for news in results] == ["https://news.example.com/1", "https://news.example.com/2"]
+    assert search_stored_news("chipmakers nvidia", symbol="NVDA")[0]["url"] == "https://news.example.com/2"
+
+
+def test_ingest_skips_known_urls_and_near_duplicates(app):
+    fingerprint = 0xF0F0F0F0F0F0F0F0
+    first = ingest_news([_item("https://news.example.com/a", "Chipmakers rally", symbols=["NVDA", "amd"],
+                               simhash=fingerprint)])
+    again = ingest_news([
+        _item("https://news.example.com/a", "Chipmakers rally"),
+        # Syndicated copy: new URL, fingerprint one bit away
+        _item("https://mirror.example.com/a", "Chipmakers rally", simhash=fingerprint ^ 1),
+        _item("https://news.example.com/b", "Oil slides"),
+        _item("#", "Placeholder"),
+    ])
+
+    assert first == {"inserted": 1, "skipped": 0}
+    assert again == {"inserted": 1, "skipped": 3}
+    assert db.session.query(FinancialNews).count() == 2
+    assert sorted(link.symbol for link in db.session.query(NewsSymbol)) == ["AMD", "NVDA"]
+    # Newly ingested rows are searchable through the FTS triggers
+    assert [news["url"] for news in search_stored_news("oil")] == ["https://news.example.com/b"]
@@ -0,0 +1,54 @@
+from datetime import date, timedelta
+
+import pytest
+
+from models import PriceBar
+from services import price_store
+from services.price_store import ensure_history
+
+
+@pytest.fixture(autouse=True)
+def forget_syncs():
+    price_store._last_sync.clear()
+    yield
+    price_store._last_sync.clear()
+
+
+def _bars(count):
+    bars = []
+    day = date.today()
+    while len(bars) < count:
+        day -= timedelta(days=1)
+        if day.weekday() < 5:
+            bars.append({"date": day.isoformat(), "open": 1.0, "high": 1.0, "low": 1.0, "close": 1.0, "volume": 1})
+    return bars
+
+
+def test_empty_fetch_is_retried_on_the_next_request(app):
+    replies = [[], _bars(5)]
+    calls = []
+
+    def fetch(symbol, outputsize):
+        calls.append(outputsize)
+        return replies.pop(0)
+
+    ensure_history("AAPL", 5, fetch)
+    assert PriceBar.query.filter_by(symbol="AAPL").count() == 0
+    assert "AAPL" not in price_store._last_sync
+
+    ensure_history("AAPL", 5, fetch)
+    assert calls == ["compact", "compact"]
+    assert PriceBar.query.filter_by(symbol="AAPL").count() == 5
+
+
+def test_short_history_is_not_refetched_within_the_interval(app):
+    calls = []
+
+    def fetch(symbol, outputsize):
+        calls.append(outputsize)
+        # A recent listing: fewer bars exist than were asked for
+        return _bars(5)
+
+    ensure_history("NEWCO", 10, fetch)
+    ensure_history("NEWCO", 10, fetch)
+    assert calls == ["compact"]
@@ -0,0 +1,43 @@
+import threading
+import time
+
+import pytest
+
+from services import profiler as profiler_module
+from services.profiler import SamplingProfiler
+
+
+def test_no_samples_are_added_after_stop(tmp_path):
+    sampler = SamplingProfiler(interval=0.001, threshold=0, output_dir=str(tmp_path))
+    done = threading.Event()
+    sessions = []
+
+    def busy():
+        sessions.append(sampler.start("busy", force=True))
+        while not done.is_set():
+            sum(range(1000))
+
+    thread = threading.Thread(target=busy)
+    thread.start()
+    time.sleep(0.05)
+    sampler.stop(sessions[0])
+    stopped = dict(sessions[0].samples)
+    time.sleep(0.05)
+    done.set()
+    thread.join()
+
+    assert stopped
+    assert dict(sessions[0].samples) == stopped
+
+
+@pytest.fixture
+def profiled_index(monkeypatch):
+    monkeypatch.setattr(profiler_module, "PROFILE_TOKEN", "secret")
+    monkeypatch.setattr(profiler_module, "PROFILE_ENDPOINTS", {"index"})
+    monkeypatch.setattr(profiler_module.profiler, "stop", lambda session: "profiles/index.folded")
+
+
+def test_profile_output_only_for_the_token(client, profiled_index):
+    assert "X-Profile-Output" not in client.get("/", headers={"X-Profile": "guess"}).headers
+    assert "X-Profile-Output" not in client.get("/").headers
+    assert client.get("/", headers={"X-Profile": "secret"}).headers["X-Profile-Output"] == "index.folded"
@@ -0,0 +1,43 @@
+import asyncio
+import threading
+
+import routes
+from services.quote_stream import QuoteBroadcaster, Subscription
+
+
+def test_wait_async_wakes_on_push_from_another_thread():
+    subscription = Subscription({"AAPL"})
+
+    async def wait():
+        threading.Timer(0.05, subscription.push, args=({"AAPL": {"price": 1.0}},)).start()
+        return await subscription.wait_async(5)
+
+    assert asyncio.run(wait()) == {"AAPL": {"price": 1.0}}
+
+
+def test_wait_async_times_out_empty():
+    subscription = Subscription({"AAPL"})
+    assert asyncio.run(subscription.wait_async(0.01)) == {}
+
+
+def test_update_follows_added_symbols():
+    broadcaster = QuoteBroadcaster()
+    broadcaster._last = {"MSFT": {"price": 2.0}}
+    subscription = Subscription({"AAPL"})
+    broadcaster._subscriptions.add(subscription)
+
+    broadcaster.update(subscription, {"AAPL", "MSFT"})
+
+    assert subscription.symbols == {"AAPL", "MSFT"}
+    # The known quote for the added symbol is delivered without waiting for a refresh
+    assert subscription.wait(0) == {"MSFT": {"price": 2.0}}
+
+
+def test_stream_refused_when_threads_are_used_up(logged_in_client, monkeypatch):
+    monkeypatch.setattr(routes, "quote_stream_slots", threading.BoundedSemaphore(1))
+    routes.quote_stream_slots.acquire()
+
+    response = logged_in_client.get("/api/quotes/stream")
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"]
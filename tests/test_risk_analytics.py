@@ -0,0 +1,85 @@
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from app import db
+from models import Holding, Portfolio
+from services import risk_analytics
+from services.risk_analytics import (beta, get_portfolio_risk, historical_var, max_drawdown, parametric_var,
+                                     rolling_volatility, simple_returns)
+
+
+def test_simple_returns():
+    closes = np.array([[100.0, 50.0], [110.0, 50.0], [99.0, 0.0]])
+    np.testing.assert_allclose(simple_returns(closes), [[0.1, 0.0], [-0.1, -1.0]])
+
+
+def test_rolling_volatility_is_annualized_sample_std():
+    returns = np.array([0.01, -0.01, 0.01, -0.01])
+    expected = np.std([0.01, -0.01], ddof=1) * np.sqrt(252)
+    np.testing.assert_allclose(rolling_volatility(returns, 2), [expected] * 3)
+    assert rolling_volatility(returns, 5).shape == (0,)
+
+
+def test_beta_of_a_levered_series():
+    benchmark = np.array([0.01, -0.02, 0.015, 0.0, -0.005])
+    assert beta(2 * benchmark, benchmark) == pytest.approx(2.0)
+    assert np.isnan(beta(benchmark, np.zeros(5)))
+
+
+def test_value_at_risk():
+    returns = np.arange(-10, 10) / 100
+    # 5th percentile with linear interpolation: -0.10 + 0.95 * 0.01
+    assert historical_var(returns, 0.95) == pytest.approx(0.0905)
+    returns = np.array([0.01, -0.01])
+    assert parametric_var(returns, 0.95) == pytest.approx(1.6448536269514722 * np.std(returns, ddof=1))
+
+
+def test_max_drawdown():
+    # Wealth 1.1 -> 0.55 -> 0.66: the trough is half the peak
+    assert max_drawdown(np.array([0.1, -0.5, 0.2])) == pytest.approx(0.5)
+    assert max_drawdown(np.array([0.01, 0.02])) == 0.0
+
+
+def _history(closes):
+    start = date(2026, 1, 1)
+    return [{"date": (start + timedelta(days=i)).isoformat(), "close": close} for i, close in enumerate(closes)]
+
+
+@pytest.fixture
+def portfolio(app, user):
+    portfolio = Portfolio(name="Core", user_id=user.id)
+    db.session.add(portfolio)
+    db.session.commit()
+    risk_analytics.risk_cache.clear()
+    yield portfolio
+    risk_analytics.risk_cache.clear()
+
+
+def test_benchmark_can_also_be_a_holding(portfolio, monkeypatch):
+    spy = [100.0, 101.0, 99.0, 102.0, 100.0, 103.0]
+    spy_returns = np.diff(spy) / spy[:-1]
+    # Twice SPY's daily moves, so its beta is 2
+    levered = [50.0]
+    for r in spy_returns:
+        levered.append(levered[-1] * (1 + 2 * r))
+    histories = {"SPY": _history(spy), "LEV": _history(levered)}
+    monkeypatch.setattr(risk_analytics, "get_historical_data", lambda symbol, days: histories[symbol])
+    monkeypatch.setattr(risk_analytics, "get_stock_data_batch",
+                        lambda symbols: {s: {"price": histories[s][-1]["close"]} for s in symbols})
+    db.session.add_all([Holding(symbol="SPY", quantity=1, portfolio_id=portfolio.id),
+                        Holding(symbol="LEV", quantity=2, portfolio_id=portfolio.id)])
+    db.session.commit()
+
+    risk = get_portfolio_risk(portfolio.id)
+
+    assert risk["symbols"] == ["SPY", "LEV"]
+    assert risk["observations"] == 5
+    assert risk["partial"] is True
+    assert risk["beta"]["holdings"]["SPY"] == pytest.approx(1.0)
+    assert risk["beta"]["holdings"]["LEV"] == pytest.approx(2.0)
+    weights = np.array(risk["weights"])
+    assert weights.sum() == pytest.approx(1.0)
+    assert risk["beta"]["portfolio"] == pytest.approx(weights @ [1.0, 2.0])
+    assert risk["correlation"][0][1] == pytest.approx(1.0)
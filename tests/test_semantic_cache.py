@@ -0,0 +1,60 @@
+import time
+
+import pytest
+
+from services.market_context import snapshot_cache
+from services.semantic_cache import SemanticCache
+
+
+@pytest.fixture
+def snapshots():
+    snapshot_cache.clear()
+    yield snapshot_cache
+    snapshot_cache.clear()
+
+
+def test_similar_query_reuses_a_fresh_answer():
+    cache = SemanticCache()
+    cache.store("Is diversification a good idea?", "Usually, yes.")
+
+    assert cache.lookup("is diversification a good idea") == "Usually, yes."
+    assert cache.lookup("What is a bond ladder?") is None
+
+
+def test_answers_with_market_context_expire_with_the_snapshot():
+    cache = SemanticCache(max_age=21600)
+    ten_minutes_ago = time.time() - 600
+    cache.store("Should I buy $NVDA?", "NVDA is up 3% today...", created_at=ten_minutes_ago)
+    cache.store("Is diversification a good idea?", "Usually, yes.", created_at=ten_minutes_ago)
+
+    # The NVDA answer quoted prices from a snapshot older than MARKET_CONTEXT_INTERVAL
+    assert cache.lookup("should I buy $NVDA") is None
+    assert cache.lookup("is diversification a good idea") == "Usually, yes."
+
+    cache.store("Should I buy $NVDA?", "NVDA is flat today...")
+    assert cache.lookup("should I buy $NVDA") == "NVDA is flat today..."
+
+
+def test_answers_built_on_an_older_snapshot_are_not_reused(snapshots):
+    cache = SemanticCache()
+    built_at = time.time() - 60
+    snapshots.backend.set("NVDA", {"symbol": "NVDA", "price": 100.0}, built_at, 300)
+    cache.store("Should I buy $NVDA?", "NVDA is at $100...")
+    cache.store("Is diversification a good idea?", "Usually, yes.")
+
+    assert cache.lookup("should I buy $NVDA") == "NVDA is at $100..."
+
+    # The next interval's snapshot replaces the one the answer quoted
+    snapshots.backend.set("NVDA", {"symbol": "NVDA", "price": 105.0}, time.time(), 300)
+    assert cache.lookup("should I buy $NVDA") is None
+    assert cache.lookup("is diversification a good idea") == "Usually, yes."
+
+
+def test_history_answers_predating_the_snapshot_are_not_reused(snapshots):
+    cache = SemanticCache()
+    snapshots.backend.set("NVDA", {"symbol": "NVDA", "price": 105.0}, time.time(), 300)
+
+    # Answered two minutes ago, before the current snapshot was built
+    cache.warm([("Should I buy $NVDA?", "NVDA is at $100...", time.time() - 120)])
+
+    assert cache.lookup("should I buy $NVDA") is None